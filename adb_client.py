@@ -0,0 +1,702 @@
+#---------------------------------------------------------------------------------
+# -*- coding: utf-8 -*-
+# Python: 3.12.0
+# Author: Killian Nallet
+# Date: 17/10/2026
+#---------------------------------------------------------------------------------
+
+
+# imports
+import os
+import uuid
+import shlex
+import stat
+import socket
+import select
+import struct
+import threading
+import contextvars
+from contextlib import contextmanager
+from subprocess import CompletedProcess
+
+from telemetry import get_telemetry, timed
+
+
+# define constants
+ADB_HOST = os.getenv("ADB_SERVER_HOST", "127.0.0.1")
+ADB_PORT = int(os.getenv("ADB_SERVER_PORT", "5037"))
+
+SYNC_DATA_MAX = 64 * 1024 # max size of a sync DATA packet
+SHELL_DATA_MAX = 4096 - 5 # max payload of a shell v2 packet (buffer of the android 7 adbd)
+
+# shell v2 packet ids
+SHELL_ID_STDIN = 0
+SHELL_ID_STDOUT = 1
+SHELL_ID_STDERR = 2
+SHELL_ID_EXIT = 3
+SHELL_ID_CLOSE_STDIN = 4
+
+
+# define variables
+cancel_event = contextvars.ContextVar("cancel_event", default=None) # cancel event of the current background job
+
+
+# define classes
+class AdbError(Exception):
+    """Error returned by the adb server (FAIL response or protocol error)"""
+
+    pass
+
+
+class JobCancelled(AdbError):
+    """Raised in the streams of a cancelled background job"""
+
+    pass
+
+
+class ShellNotSent(AdbError):
+    """The shell session could not be opened, the command was not sent (it can be run another way)"""
+
+    pass
+
+
+class AdbConnection:
+    """A socket connected to the adb server, speaking the smart-socket protocol"""
+
+    def __init__(self, host:str=ADB_HOST, port:int=ADB_PORT, timeout:float=None):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.serial = None # set when the connection is bound to a device transport
+
+    def close(self):
+        """Close the connection"""
+
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # low level io
+    def send(self, data:bytes):
+        """Send raw bytes"""
+
+        self.sock.sendall(data)
+
+    def recv_exact(self, size:int) -> bytes:
+        """Read exactly size bytes (raise if the stream is closed before)"""
+
+        buf = bytearray()
+        while len(buf) < size:
+            chunk = self.sock.recv(size - len(buf))
+            if not chunk:
+                raise AdbError(f"connection closed ({len(buf)}/{size} bytes read)")
+            buf += chunk
+        return bytes(buf)
+
+    def recv_all(self) -> bytes:
+        """Read until the server closes the stream"""
+
+        buf = bytearray()
+        while True:
+            chunk = self.sock.recv(SYNC_DATA_MAX)
+            if not chunk:
+                return bytes(buf)
+            buf += chunk
+
+    def recv_hex_string(self) -> str:
+        """Read a string prefixed by its 4 hex digits length"""
+
+        size = int(self.recv_exact(4), 16)
+        return self.recv_exact(size).decode("utf-8", errors="replace")
+
+    # smart-socket requests
+    def request(self, service:str):
+        """Send a service request and check the OKAY / FAIL status"""
+
+        payload = service.encode("utf-8")
+        self.send(b"%04x" % len(payload) + payload)
+
+        status = self.recv_exact(4)
+        if status == b"OKAY":
+            return
+        elif status == b"FAIL":
+            raise AdbError(self.recv_hex_string())
+        else:
+            raise AdbError(f"unexpected adb server status {status!r}")
+
+    def transport(self, serial:str):
+        """Bind the connection to a device"""
+
+        self.request(f"host:transport:{serial}")
+        self.serial = serial
+
+
+class SyncConnection:
+    """A device connection switched to the sync: service (file transfers)"""
+
+    def __init__(self, conn:AdbConnection):
+        self.conn = conn
+        self.serial = conn.serial
+        self.conn.request("sync:")
+
+    def close(self, quit=True):
+        """Close the sync session"""
+
+        if quit:
+            try:
+                self._send_packet(b"QUIT", b"")
+            except (OSError, AdbError):
+                pass
+        self.conn.close()
+
+    def _send_packet(self, packet_id:bytes, data:bytes):
+        self.conn.send(packet_id + struct.pack("<I", len(data)) + data)
+
+    def _recv_header(self):
+        packet = self.conn.recv_exact(8)
+        return packet[:4], struct.unpack("<I", packet[4:])[0]
+
+    def _raise_fail(self, packet_id:bytes, size:int):
+        if packet_id == b"FAIL":
+            raise AdbError(self.conn.recv_exact(size).decode("utf-8", errors="replace"))
+        raise AdbError(f"unexpected sync packet {packet_id!r}")
+
+    def stat(self, remote_path:str):
+        """Return (mode, size, mtime) of a remote path (mode is 0 if the path don't exists)"""
+
+        self._send_packet(b"STAT", remote_path.encode("utf-8"))
+        packet = self.conn.recv_exact(16)
+        if packet[:4] != b"STAT":
+            raise AdbError(f"unexpected sync packet {packet[:4]!r}")
+        return struct.unpack("<III", packet[4:])
+
+    def list(self, remote_dir:str) -> list:
+        """List a remote directory, return a list of (name, mode, size, mtime)"""
+
+        self._send_packet(b"LIST", remote_dir.encode("utf-8"))
+        entries = []
+        while True:
+            packet = self.conn.recv_exact(20)
+            packet_id = packet[:4]
+            mode, size, mtime, name_len = struct.unpack("<IIII", packet[4:])
+            if packet_id == b"DONE":
+                return entries
+            if packet_id != b"DENT":
+                raise AdbError(f"unexpected sync packet {packet_id!r}")
+            name = self.conn.recv_exact(name_len).decode("utf-8", errors="replace")
+            if name not in (".", ".."):
+                entries.append((name, mode, size, mtime))
+
+    def push_stream(self, stream, remote_path:str, mode:int=0o644, mtime:int=0, progress=None) -> int:
+        """Send a file-like object to a remote path, return the number of bytes sent"""
+
+        with get_telemetry().span("transfer.sync_push") as span:
+            self._send_packet(b"SEND", f"{remote_path},{stat.S_IFREG | mode}".encode("utf-8"))
+
+            sent = 0
+            while True:
+                check_cancelled()
+                data = stream.read(SYNC_DATA_MAX)
+                if not data:
+                    break
+                self._send_packet(b"DATA", data)
+                sent += len(data)
+                if progress is not None:
+                    progress(len(data))
+
+            self.conn.send(b"DONE" + struct.pack("<I", mtime))
+            packet_id, size = self._recv_header()
+            if packet_id != b"OKAY":
+                self._raise_fail(packet_id, size)
+            span.bytes = sent
+            return sent
+
+    def pull_stream(self, remote_path:str, stream, progress=None) -> int:
+        """Receive a remote file into a file-like object, return the number of bytes received"""
+
+        with get_telemetry().span("transfer.sync_pull") as span:
+            self._send_packet(b"RECV", remote_path.encode("utf-8"))
+
+            received = 0
+            while True:
+                check_cancelled()
+                packet_id, size = self._recv_header()
+                if packet_id == b"DONE":
+                    span.bytes = received
+                    return received
+                if packet_id != b"DATA":
+                    self._raise_fail(packet_id, size)
+                stream.write(self.conn.recv_exact(size))
+                received += size
+                if progress is not None:
+                    progress(size)
+
+
+class AdbShellSession:
+    """A long-lived shell stream on a device, commands are delimited with sentinel markers"""
+
+    def __init__(self, client, serial:str):
+        self.client = client
+        self.serial = serial
+        self.conn = None
+        self.shell_v2 = None
+        self._lock = threading.Lock()
+        self._stdout = bytearray()
+        self._stderr = bytearray()
+
+    def open(self):
+        """Open (or reopen) the shell stream"""
+
+        self.close()
+        if self.shell_v2 is None:
+            try:
+                self.shell_v2 = "shell_v2" in self.client.features(self.serial)
+            except AdbError:
+                self.shell_v2 = False
+
+        # shell v2 : interactive shell without pty, stdout / stderr are separated
+        if self.shell_v2:
+            self.conn = self.client.open_service(self.serial, "shell,v2,raw:")
+
+        # legacy : raw sh stream, stderr is redirected to stdout
+        else:
+            self.conn = self.client.open_service(self.serial, "exec:sh")
+            self.conn.send(b"exec 2>&1\n")
+
+        self._stdout.clear()
+        self._stderr.clear()
+
+    def close(self):
+        """Close the shell stream"""
+
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def _write(self, data:bytes):
+        if self.shell_v2:
+            data = bytes([SHELL_ID_STDIN]) + struct.pack("<I", len(data)) + data
+        self.conn.send(data)
+
+    def _read(self):
+        """Read the next chunk of the stream into the stdout / stderr buffers"""
+
+        if self.shell_v2:
+            header = self.conn.recv_exact(5)
+            packet_id, size = header[0], struct.unpack("<I", header[1:])[0]
+            data = self.conn.recv_exact(size)
+            if packet_id == SHELL_ID_STDOUT:
+                self._stdout += data
+            elif packet_id == SHELL_ID_STDERR:
+                self._stderr += data
+            elif packet_id == SHELL_ID_EXIT:
+                raise AdbError("shell session exited")
+        else:
+            data = self.conn.sock.recv(SYNC_DATA_MAX)
+            if not data:
+                raise AdbError("shell session closed")
+            self._stdout += data
+
+    def _run_once(self, command:str) -> CompletedProcess:
+        marker = uuid.uuid4().hex.encode()
+        out_marker = marker + b":"
+        err_marker = marker + b"\n"
+
+        # each command runs in its own sh (a syntax error must not kill the session)
+        script = f"sh -c {shlex.quote(command)} </dev/null\n"
+        script += f"printf '{marker.decode()}:%d\\n' $?\n"
+        if self.shell_v2:
+            script += f"echo {marker.decode()} >&2\n"
+        self._write(script.encode("utf-8"))
+
+        # read until the exit code marker (and the stderr marker)
+        while True:
+            out_pos = self._stdout.find(out_marker)
+            if out_pos != -1:
+                end = self._stdout.find(b"\n", out_pos + len(out_marker))
+                if end != -1 and (not self.shell_v2 or self._stderr.endswith(err_marker)):
+                    break
+            self._read()
+
+        returncode = int(self._stdout[out_pos + len(out_marker):end])
+        stdout = bytes(self._stdout[:out_pos])
+        stderr = bytes(self._stderr[:-len(err_marker)]) if self.shell_v2 else b""
+        self._stdout.clear()
+        self._stderr.clear()
+
+        return CompletedProcess(
+            command,
+            returncode,
+            stdout.decode("utf-8", errors="replace"),
+            stderr.decode("utf-8", errors="replace")
+        )
+
+    def _is_alive(self) -> bool:
+        """Check that the idle stream was not closed by the device (without blocking)"""
+
+        try:
+            readable, _, _ = select.select([self.conn.sock], [], [], 0)
+            return not readable or self.conn.sock.recv(1, socket.MSG_PEEK) != b""
+        except OSError:
+            return False
+
+    @timed("device.session")
+    def run(self, command:str) -> CompletedProcess:
+        """Run a command in the session (a dropped idle stream is reopened before the command is sent)"""
+
+        with self._lock:
+            try:
+                if self.conn is None or not self._is_alive():
+                    self.open()
+            except (OSError, AdbError) as e:
+                self.close()
+                raise ShellNotSent(str(e) or type(e).__name__) from e
+
+            # once sent, the command is never sent again (input events and other commands are not idempotent)
+            try:
+                return self._run_once(command)
+            except (OSError, AdbError):
+                self.close()
+                raise
+
+
+class AdbShellStream:
+    """A shell command whose output is passed to callbacks as it arrives, it can be interrupted from another thread"""
+
+    def __init__(self, client, serial:str, command:str):
+        self.client = client
+        self.serial = serial
+        self.command = command
+        self.pid = None # pid of the remote shell (read from the first line of the output)
+        self.conn = None
+        self._marker = uuid.uuid4().hex.encode()
+
+    def _open(self):
+        # the shell prints its pid then becomes the command (same pid)
+        script = f"echo {self._marker.decode()}$$; exec sh -c {shlex.quote(self.command)}"
+
+        # shell v2 : stdout / stderr are separated and the exit code is returned
+        try:
+            self.conn = self.client.open_service(self.serial, f"shell,v2,raw:{script}")
+            return True
+        except AdbError:
+            pass
+
+        # legacy shell : stderr is mixed with stdout, no exit code
+        self.conn = self.client.open_service(self.serial, f"shell:{script} 2>&1")
+        return False
+
+    def _read_pid(self, buffer:bytearray) -> bytes:
+        """Remove the pid line from the start of the stdout, return the output after it"""
+
+        end = buffer.find(b"\n")
+        if end == -1:
+            return b""
+        line = bytes(buffer[:end]).strip()
+        self.pid = int(line[len(self._marker):]) if line.startswith(self._marker) and line[len(self._marker):].isdigit() else 0
+        data = bytes(buffer[end + 1:])
+        buffer.clear()
+        return data
+
+    @timed("device.stream")
+    def run(self, on_stdout, on_stderr) -> int:
+        """Run the command, on_stdout(bytes) / on_stderr(bytes) are called for each chunk, return the exit code (None if the stream was closed)"""
+
+        shell_v2 = self._open()
+        conn = self.conn
+        head = bytearray() # stdout before the pid line
+        try:
+            while True:
+                if shell_v2:
+                    header = conn.recv_exact(5)
+                    packet_id, size = header[0], struct.unpack("<I", header[1:])[0]
+                    data = conn.recv_exact(size)
+                    if packet_id == SHELL_ID_EXIT:
+                        return data[0]
+                else:
+                    packet_id, data = SHELL_ID_STDOUT, conn.sock.recv(SYNC_DATA_MAX)
+                    if not data:
+                        return 0 if self.conn is not None else None
+
+                if packet_id == SHELL_ID_STDOUT and self.pid is None:
+                    head += data
+                    data = self._read_pid(head)
+                if data and packet_id == SHELL_ID_STDOUT:
+                    on_stdout(data)
+                elif data and packet_id == SHELL_ID_STDERR:
+                    on_stderr(data)
+
+        except (OSError, AdbError):
+            if self.conn is None: # closed by close()
+                return None
+            raise
+        finally:
+            self.close()
+
+    def interrupt(self) -> bool:
+        """Send SIGINT to the command and its children (from another shell stream), return False if the pid is not known yet"""
+
+        if not self.pid:
+            return False
+        self.client.shell(self.serial, f"pkill -INT -P {self.pid}; kill -INT {self.pid}")
+        return True
+
+    def close(self):
+        """Close the stream (the device sends SIGHUP to the command)"""
+
+        conn, self.conn = self.conn, None
+        if conn is not None:
+            try:
+                conn.sock.shutdown(socket.SHUT_RDWR) # wake up the read of run()
+            except OSError:
+                pass
+            conn.close()
+
+
+class AdbClient:
+    """Client of the adb server, keeps a pool of idle sync connections for each device"""
+
+    def __init__(self, host:str=ADB_HOST, port:int=ADB_PORT, pool_size:int=4, timeout:float=None):
+        self.host = host
+        self.port = port
+        self.pool_size = pool_size
+        self.timeout = timeout
+
+        self._pool = {} # serial -> idle SyncConnection list
+        self._pool_lock = threading.Lock()
+        self._shell_sessions = {} # serial -> AdbShellSession
+
+    @timed("connect.server")
+    def connect(self) -> AdbConnection:
+        """Open a new connection to the adb server"""
+
+        return AdbConnection(self.host, self.port, self.timeout)
+
+    @timed("connect.transport")
+    def device_connect(self, serial:str) -> AdbConnection:
+        """Open a new connection bound to a device"""
+
+        conn = self.connect()
+        try:
+            conn.transport(serial)
+        except Exception:
+            conn.close()
+            raise
+        return conn
+
+    # host services
+    def host_query(self, service:str) -> str:
+        """Execute a host service and return its (length prefixed) answer"""
+
+        with self.connect() as conn:
+            conn.request(service)
+            return conn.recv_hex_string()
+
+    def version(self) -> int:
+        """Return the adb server internal version"""
+
+        return int(self.host_query("host:version"), 16)
+
+    def devices(self) -> list:
+        """Return the list of (serial, state) known by the adb server"""
+
+        devices = []
+        for line in self.host_query("host:devices").splitlines():
+            if "\t" in line:
+                serial, state = line.split("\t", 1)
+                devices.append((serial, state))
+        return devices
+
+    def features(self, serial:str) -> list:
+        """Return the features supported by a device and the adb server"""
+
+        return self.host_query(f"host-serial:{serial}:features").split(",")
+
+    def connect_device(self, address:str) -> str:
+        """Connect a device over tcp/ip (like adb connect), return the server message"""
+
+        return self.host_query(f"host:connect:{address}")
+
+    # device services
+    def open_service(self, serial:str, service:str) -> AdbConnection:
+        """Open a device service stream (shell:, exec:, ...), the caller must close it"""
+
+        conn = self.device_connect(serial)
+        try:
+            conn.request(service)
+        except Exception:
+            conn.close()
+            raise
+        return conn
+
+    @timed("device.exec")
+    def exec_out(self, serial:str, command:str, stdin=None, size:int=None) -> bytes:
+        """Run a command with the exec: service and return its raw output, stdin is sent as exactly size bytes (the command reads a known length)"""
+
+        with self.open_service(serial, f"exec:{command}") as conn:
+            if stdin is not None:
+                # no half-close : the adb server closes the whole stream on the end of stdin (the answer would be lost)
+                left = size
+                while left > 0:
+                    check_cancelled()
+                    data = stdin.read(min(SYNC_DATA_MAX, left))
+                    if not data:
+                        raise AdbError(f"stdin ended {left} bytes before its size")
+                    conn.send(data)
+                    left -= len(data)
+            return conn.recv_all()
+
+    @timed("device.shell")
+    def shell(self, serial:str, command:str, stdin=None) -> CompletedProcess:
+        """Run a shell command on a device and return its result (like subprocess.run), stdin is streamed until its end (shell v2 only)"""
+
+        # shell v2 : separate stdout / stderr and return the exit code
+        try:
+            conn = self.open_service(serial, f"shell,v2,raw:{command}")
+        except AdbError:
+            if stdin is not None: # adb streams have no half-close, only shell v2 can signal the end of stdin
+                raise
+            conn = None
+
+        # legacy shell : no exit code, stderr is mixed with stdout
+        if conn is None:
+            with self.open_service(serial, f"shell:{command}") as conn:
+                stdout = conn.recv_all().decode("utf-8", errors="replace")
+            return CompletedProcess(command, 0, stdout, "")
+
+        with conn:
+            # the output is read after the end of stdin (commands with a small output while they read)
+            if stdin is not None:
+                while data := stdin.read(SYNC_DATA_MAX):
+                    check_cancelled()
+                    conn.send(b"".join(
+                        bytes([SHELL_ID_STDIN]) + struct.pack("<I", len(chunk)) + chunk
+                        for chunk in (data[index:index + SHELL_DATA_MAX] for index in range(0, len(data), SHELL_DATA_MAX))
+                    ))
+                conn.send(bytes([SHELL_ID_CLOSE_STDIN]) + struct.pack("<I", 0))
+
+            stdout, stderr, returncode = bytearray(), bytearray(), None
+            while True:
+                try:
+                    header = conn.recv_exact(5)
+                except AdbError: # stream closed
+                    break
+                packet_id, size = header[0], struct.unpack("<I", header[1:])[0]
+                data = conn.recv_exact(size)
+
+                if packet_id == SHELL_ID_STDOUT:
+                    stdout += data
+                elif packet_id == SHELL_ID_STDERR:
+                    stderr += data
+                elif packet_id == SHELL_ID_EXIT:
+                    returncode = data[0]
+                    break
+
+        return CompletedProcess(
+            command,
+            returncode if returncode is not None else 1,
+            stdout.decode("utf-8", errors="replace"),
+            stderr.decode("utf-8", errors="replace")
+        )
+
+    def shell_stream(self, serial:str, command:str) -> AdbShellStream:
+        """Return a shell stream of a command (started by its run method)"""
+
+        return AdbShellStream(self, serial, command)
+
+    def shell_session(self, serial:str) -> AdbShellSession:
+        """Return the persistent shell session of a device"""
+
+        with self._pool_lock:
+            session = self._shell_sessions.get(serial)
+            if session is None:
+                session = self._shell_sessions[serial] = AdbShellSession(self, serial)
+        return session
+
+    def close_shell_session(self, serial:str=None):
+        """Close the persistent shell session (of a device or of all devices)"""
+
+        with self._pool_lock:
+            serials = [serial] if serial is not None else list(self._shell_sessions)
+            sessions = [self._shell_sessions.pop(s) for s in serials if s in self._shell_sessions]
+        for session in sessions:
+            session.close()
+
+    # sync service (pooled)
+    def _acquire_sync(self, serial:str) -> SyncConnection:
+        with self._pool_lock:
+            idle = self._pool.get(serial)
+            if idle:
+                return idle.pop()
+        return SyncConnection(self.device_connect(serial))
+
+    def _release_sync(self, sync_conn:SyncConnection):
+        with self._pool_lock:
+            idle = self._pool.setdefault(sync_conn.serial, [])
+            if len(idle) < self.pool_size:
+                idle.append(sync_conn)
+                return
+        sync_conn.close()
+
+    @contextmanager
+    def sync(self, serial:str):
+        """Borrow a sync connection from the pool (a broken connection is not given back)"""
+
+        sync_conn = self._acquire_sync(serial)
+        try:
+            yield sync_conn
+        except BaseException: # any error (interrupt, generator closed, ...) may leave a request in progress
+            sync_conn.close(quit=False)
+            raise
+        else:
+            self._release_sync(sync_conn)
+
+    def close_pool(self, serial:str=None):
+        """Close the idle sync connections (of a device or of all devices)"""
+
+        with self._pool_lock:
+            serials = [serial] if serial is not None else list(self._pool)
+            to_close = [c for s in serials for c in self._pool.pop(s, [])]
+        for sync_conn in to_close:
+            sync_conn.close()
+
+    def push_file(self, serial:str, local_path:str, remote_path:str, progress=None) -> int:
+        """Push a local file to a device, return the number of bytes sent"""
+
+        file_stat = os.stat(local_path)
+        with open(local_path, "rb") as file, self.sync(serial) as sync_conn:
+            return sync_conn.push_stream(
+                file, remote_path, stat.S_IMODE(file_stat.st_mode), int(file_stat.st_mtime), progress
+            )
+
+    def pull_file(self, serial:str, remote_path:str, local_path:str, progress=None) -> int:
+        """Pull a remote file from a device, return the number of bytes received"""
+
+        with open(local_path, "wb") as file, self.sync(serial) as sync_conn:
+            return sync_conn.pull_stream(remote_path, file, progress)
+
+
+# define functions
+def check_cancelled():
+    """Stop the current stream if its background job is cancelled"""
+
+    event = cancel_event.get()
+    if event is not None and event.is_set():
+        raise JobCancelled("job cancelled")
+
+
+_client = None
+
+def get_adb_client() -> AdbClient:
+    """Return the shared adb client"""
+
+    global _client
+    if _client is None:
+        _client = AdbClient()
+    return _client
@@ -8,34 +8,63 @@
 
 # imports
 import os
+import re
 import sys
+import uuid
+import stat
+import json
+import time
+import shutil
+import asyncio
 import logging
-from subprocess import run
+import threading
+from contextlib import contextmanager
+from subprocess import run, CompletedProcess
 import zipfile
 
 from keyevents import KeyMap
+from macros import compile_macro
+from adb_client import AdbClient, AdbError, JobCancelled, ShellNotSent, get_adb_client
+from apk_manifest import ManifestError, read_apk_info, read_bundle_info
+from extract_cache import ExtractCache
+from split_select import parse_device_spec, select_splits
+from transfer import default_transfer_streams, parallel_pull, parallel_push, remote_file_size
+from compression import should_compress
+from resumable import TransferState, resumable_pull, resumable_push
+from telemetry import get_telemetry, timed
+from device_cache import DeviceCache, device_fields, field_commands, parse_field
+from log_pipeline import start_log_pipeline
+from text_input import HELPER_ADBKEYBOARD, HELPER_CLIPPER, adbkeyboard_ime, clipper_package, is_typable, max_typed_text, text_input_script
 
 
 # define constants
 current_dir_path = os.path.dirname(__file__)
 temp_extract_path = os.path.join(current_dir_path, ".temp", "extract")
+bundle_exts = [".apkm", ".xapk"]
+default_extract_cache_mb = 4096
+default_resumable_min_mb = 64 # files from this size are transferred with resume support
+adb_probe_timeout = 2 # seconds to wait the answer of a running adb server
+transfer_state_path = os.path.join(current_dir_path, "data", "transfers_state.json")
+device_cache_path = os.path.join(current_dir_path, "data", "device_cache.json")
 
 
 # variables
 _log = None
+_extract_cache = None
+_device_cache = None
+_thread_device = threading.local() # device used by the current thread (fleet mode)
+_wait_reconnect = None # function waiting the device after a disconnection
 
 
 # define functions
-def configure_logger(log_path:str):
-    """Configure and return a logger for the tool"""
+def configure_logger(log_path:str, json_format=False, level:str="DEBUG"):
+    """Configure and return a logger for the tool (written by a background thread, rotated and compressed)"""
 
     global _log
 
     logger = logging.getLogger(__name__)
-    logger.setLevel("DEBUG")
-    fh = logging.FileHandler(log_path)
-    fh.setLevel(logging.DEBUG)
-    logger.addHandler(fh)
+    logger.setLevel(level)
+    start_log_pipeline(logger, log_path, json_format)
 
     _log = logger
     return logger
@@ -49,6 +78,12 @@ def adb_fncts_set_conf(conf):
     _conf = conf
 
 
+def adb_fncts_set_wait_reconnect(wait_reconnect):
+    """Set the function used by the transfers to wait the reconnection of the device"""
+    global _wait_reconnect
+    _wait_reconnect = wait_reconnect
+
+
 def _get_encoding():
     """Return correct subprocess encoding for a platform"""
 
@@ -57,18 +92,56 @@ def _get_encoding():
     else:
         return "utf-8"
 
+def _log_command(kind:str, command, returncode:int, seconds:float):
+    """Log a finished command (formatted by the log thread, structured fields for the json format)"""
+
+    _log.info(
+        "%s %s -> %s (%.3fs)", kind, command, returncode, seconds,
+        extra={"command": command, "returncode": returncode, "seconds": round(seconds, 6)}
+    )
+
 def exec_cmd(command:list, get_result=False, nolog=False):
     """Executes a command and returns whether it was executed successfully (or its result)."""
 
+    start = time.perf_counter()
+    with get_telemetry().span(f"spawn.{os.path.basename(command[0])}"):
+        result = run(
+            command, 
+            encoding=_get_encoding(),
+            text=True,
+            capture_output=True
+        )
+
     if not nolog:
-        _log.info(f"exec {command}")
+        _log_command("exec", command, result.returncode, time.perf_counter() - start)
 
-    result = run(
-        command, 
-        encoding=_get_encoding(),
-        text=True,
-        capture_output=True
+    if get_result:
+        return result
+    else:
+        return result.returncode == 0
+
+
+async def exec_cmd_async(command:list, get_result=False, nolog=False):
+    """Executes a command without blocking the event loop and returns whether it was executed successfully (or its result)."""
+
+    start = time.perf_counter()
+    with get_telemetry().span(f"spawn.{os.path.basename(command[0])}"):
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            stdout, stderr = await process.communicate()
+        except asyncio.CancelledError:
+            process.kill()
+            raise
+
+    result = CompletedProcess(
+        command, process.returncode, stdout.decode(_get_encoding(), errors="replace"), stderr.decode(_get_encoding(), errors="replace")
     )
+    if not nolog:
+        _log_command("exec", command, result.returncode, time.perf_counter() - start)
 
     if get_result:
         return result
@@ -83,21 +156,78 @@ def restart_adb():
     return exec_cmd(["adb", "start-server"])
 
 
+def start_adb(adb_version:str=None):
+    """Reuse the running adb server if it is healthy (restart it if its version differs from adb_version), start it otherwise ; return True if it was reused"""
+
+    # "Android Debug Bridge version 1.0.41" : the server reports the last number
+    match = re.search(r"\d+\.\d+\.(\d+)", adb_version or "")
+    client = get_adb_client()
+    try:
+        with get_telemetry().span("connect.probe"):
+            server_version = AdbClient(client.host, client.port, timeout=adb_probe_timeout).version()
+    except (OSError, AdbError, ValueError):
+        _log.info("no adb server running")
+        exec_cmd(["adb", "start-server"])
+        return False
+
+    if match is not None and int(match.group(1)) != server_version:
+        _log.warning("adb server version %s differs from adb %s, restarting it", server_version, match.group(1))
+        restart_adb()
+        return False
+
+    _log.info("reusing the adb server (version %s)", server_version)
+    return True
+
+
 def ping_host(host_ip:str):
     """Ping a host ip on the current network"""
 
     return exec_cmd(["ping", host_ip, "-w", "550", "-n", "2"])
 
 
+async def ping_host_async(host_ip:str):
+    """Ping a host ip on the current network (without blocking the event loop)"""
+
+    return await exec_cmd_async(["ping", host_ip, "-w", "550", "-n", "2"])
+
+
 def cmd_adb_device():
     """Return a basic adb command with the current connected adb device ip"""
 
-    return ["adb", "-s", _conf["ip"]]
+    return ["adb", "-s", getattr(_thread_device, "serial", None) or _conf["ip"]]
+
+
+@contextmanager
+def using_device(serial:str):
+    """Run the adb functions of the current thread on another device"""
+
+    previous = getattr(_thread_device, "serial", None)
+    _thread_device.serial = serial
+    try:
+        yield
+    finally:
+        _thread_device.serial = previous
+
+
+def device_serial():
+    """Return the adb serial of the selected device (ip:port)"""
+
+    if getattr(_thread_device, "serial", None):
+        return _thread_device.serial
+    if _conf.get("port"):
+        return f"{_conf['ip']}:{_conf['port']}"
+    return _conf["ip"]
 
 
 def get_connected_devices():
     """Retrieve the list of currently connected adb devices"""
 
+    # get adb devices from the adb server
+    try:
+        return [serial for serial, state in get_adb_client().devices() if state == "device"]
+    except (OSError, AdbError):
+        pass # adb server not reachable, use the adb program
+
     # get adb devices
     result = exec_cmd(["adb", "devices"], get_result=True, nolog=True)
     
@@ -120,55 +250,148 @@ def check_conn():
 def adb_shell_cmd(command:list, get_result=False):
     """Execute a command in the adb shell on a connected adb device"""
 
-    return exec_cmd(cmd_adb_device() + ["shell"] + command, get_result)
+    # run the command in the persistent shell session (args are joined like the adb program does)
+    start = time.perf_counter()
+    try:
+        result = get_adb_client().shell_session(device_serial()).run(" ".join(command))
+    except ShellNotSent:
+        return exec_cmd(cmd_adb_device() + ["shell"] + command, get_result)
+    except (OSError, AdbError) as e: # the command may have run, it is not run again
+        _log.warning("shell session lost during %s (%s)", " ".join(command), e)
+        result = CompletedProcess(command, 1, "", f"shell session lost ({e})")
+    _log_command("shell", command, result.returncode, time.perf_counter() - start)
+
+    if get_result:
+        return result
+    else:
+        return result.returncode == 0
+
+
+def _input_key_args(*keyevents:str, keycombination=False) -> list:
+    """Return the shell args to send keyevent(s) on the device"""
+
+    if keycombination:
+        sendkeys_mode = "keycombination"
+        if len(keyevents) < 2:
+            raise ValueError("keycombination needs at least 2 keys to send")
+    else:
+        sendkeys_mode = "keyevent"
+
+    return ["input", sendkeys_mode, *keyevents]
+
+
+def adb_text_helper():
+    """Return the text helper of the connected adb device (conf 'text_helper', else detected once : ADBKeyBoard input method or Clipper)"""
+
+    helper = _conf.get("text_helper", "auto")
+    if helper != "auto":
+        return None if helper == "none" else helper
+
+    fields = adb_device_fields("input_method", "packages")
+    if fields["input_method"] == adbkeyboard_ime:
+        return HELPER_ADBKEYBOARD
+    if clipper_package in fields["packages"]:
+        return HELPER_CLIPPER
+    return None
+
+
+def _send_text_script(text:str, enter=False):
+    """Send a text (short ascii texts are typed, the others are sent in one event by the text helper)"""
+
+    helper = adb_text_helper() if len(text) > max_typed_text or not is_typable(text) else None
+    try:
+        script = text_input_script(text, helper, enter)
+    except ValueError as e:
+        print(f"[!] {e}")
+        return False
+    return adb_shell_cmd([script])
 
 
 def adb_send_text(command:str):
     """Send text input to a connected adb device"""
     
-    return adb_shell_cmd(["input", "text", f"'{command}'"]) # send command (with spaces into)
+    return _send_text_script(command)
 
 
 def adb_send_key(*keyevents:str, keycombination=False):
     """Send keyevent(s) input to a connected adb device"""
     
-    if keycombination:
-        sendkeys_mode = "keycombination"
-        if len(keyevents) > 2:
-            raise ValueError("keycombination needs at least 2 keys to send")
-    else:
-        sendkeys_mode = "keyevent"
-    
-    return adb_shell_cmd(["input", sendkeys_mode, *keyevents])
+    return adb_shell_cmd(_input_key_args(*keyevents, keycombination=keycombination))
+
+
+def adb_send_keys(sequence:str):
+    """Send a key sequence ('dpad_down*5 enter', key+key combinations, sleep:s, @macro of the conf) in one shell command"""
+
+    return adb_shell_cmd([compile_macro(sequence, _conf.get("macros", {}))])
 
 
 def adb_send_cmd(command:str):
     """Send a text command to execute on a connected adb device (for a terminal app like termux)"""
     
-    return adb_send_text(command) and adb_send_key(KeyMap.enter)
+    # type the text and ENTER in one shell command
+    return _send_text_script(command, enter=True)
 
 
-def _extract_apkm_or_xapk(apkm_xapk_path:str) -> list:
-    """Extract .apk files from .apkm file"""
+def adb_shell_stream(command:str):
+    """Return a stream running a shell command on a connected adb device (its output is read as it arrives)"""
+
+    _log.info("stream %s", command)
+    return get_adb_client().shell_stream(device_serial(), command)
+
+
+async def adb_shell_cmd_async(command:list, get_result=False):
+    """Execute a command in the adb shell without blocking the event loop"""
+
+    return await asyncio.to_thread(adb_shell_cmd, command, get_result)
+
+
+async def adb_send_key_async(*keyevents:str, keycombination=False):
+    """Send keyevent(s) input without blocking the event loop"""
+
+    return await asyncio.to_thread(adb_send_key, *keyevents, keycombination=keycombination)
+
+
+async def adb_send_keys_async(sequence:str):
+    """Send a key sequence without blocking the event loop"""
+
+    return await asyncio.to_thread(adb_send_keys, sequence)
+
+
+async def adb_send_cmd_async(command:str):
+    """Send a text command to execute without blocking the event loop"""
+
+    return await asyncio.to_thread(adb_send_cmd, command)
+
+
+def get_extract_cache() -> ExtractCache:
+    """Return the extraction cache of .apkm / .xapk files (size budget from the conf)"""
+
+    global _extract_cache
+    if _extract_cache is None:
+        max_size = _conf.get("extract_cache_max_mb", default_extract_cache_mb) * 1024 * 1024
+        _extract_cache = ExtractCache(temp_extract_path, max_size)
+    return _extract_cache
+
+
+def _extract_apkm_or_xapk(apkm_xapk_path:str, sha256:str=None, pin=False) -> list:
+    """Extract .apk files from .apkm file (reuse a previous extraction of the same archive content, sha256 of the catalog saves hashing it)"""
     # thanks to : https://github.com/veryraregaming/Rares-Apkm-to-APK-GUI
 
     basename_apkm_xapk = os.path.splitext(os.path.basename(apkm_xapk_path))[0]
-    _log.info(f"extracting {os.path.splitext(apkm_xapk_path)[1]} file '{basename_apkm_xapk}' to .apk files")
+    _log.info("extracting %s file '%s' to .apk files", os.path.splitext(apkm_xapk_path)[1], basename_apkm_xapk)
+
+    # extract .apkm / .xapk in the cache (dir named with the archive sha256)
+    return get_extract_cache().get(apkm_xapk_path, sha256, pin)
 
-    # create temp extract dir
-    extract_dir = os.path.join(temp_extract_path, basename_apkm_xapk)
-    os.makedirs(extract_dir, exist_ok=True)
 
-    # extract .apkm / .xapk in a temp folder (the same of .zip file)
-    with zipfile.ZipFile(apkm_xapk_path, 'r') as zip_ref:
-        zip_ref.extractall(extract_dir)
+def release_extracted(apk_files:list):
+    """Allow the eviction of .apk files extracted with pin=True (the install using them is done)"""
 
-    # list new .apk files
-    return [os.path.join(extract_dir, f) for f in os.listdir(extract_dir) if f.endswith('.apk')]
+    get_extract_cache().unpin(apk_files)
 
 
-def check_and_extract_apk(apk_path:str) -> str | list:
-    """Check format of the apk and extract or convert it to a .apk file if is needed"""
+def check_and_extract_apk(apk_path:str, sha256:str=None, pin=False) -> str | list:
+    """Check format of the apk and extract or convert it to a .apk file if is needed (pinned extractions are released with release_extracted)"""
 
     # get apk format
     apk_ext = os.path.splitext(apk_path)[1]
@@ -179,12 +402,75 @@ def check_and_extract_apk(apk_path:str) -> str | list:
 
     elif apk_ext in [".apkm", ".xapk"]:
         print(f"[*] extracting .apk files from {apk_ext} archive ...")
-        apk_files = _extract_apkm_or_xapk(apk_path)
+        apk_files = _extract_apkm_or_xapk(apk_path, sha256, pin)
 
     # return new .apk file(s)
     return apk_files
 
 
+def get_device_cache() -> DeviceCache:
+    """Return the cache of the devices properties (ttls from the conf)"""
+
+    global _device_cache
+    if _device_cache is None:
+        _device_cache = DeviceCache(device_cache_path, _conf.get("device_cache_ttl"))
+    return _device_cache
+
+
+def adb_device_fields(*fields:str) -> dict:
+    """Return fields of the connected adb device (props, density, packages, input_method), the expired ones are read in one shell command"""
+
+    cache = get_device_cache()
+    serial = device_serial()
+    values = {field: cache.get(serial, field) for field in fields or device_fields}
+    expired = [field for field, value in values.items() if value is None]
+    if expired == []:
+        return values
+
+    # each command output ends with a marker line and its exit code
+    marker = uuid.uuid4().hex
+    result = adb_shell_cmd(["; ".join(f"{field_commands[field]}; printf '\\n{marker}:%d\\n' $?" for field in expired)], get_result=True)
+    outputs = re.split(rf"\n{marker}:(\d+)\n", result.stdout)
+
+    fresh = {}
+    for index, field in enumerate(expired):
+        output, code = (outputs[index * 2], outputs[index * 2 + 1]) if len(outputs) > index * 2 + 1 else ("", "1")
+        values[field] = parse_field(field, output)
+        if code == "0": # failed reads are not cached
+            fresh[field] = values[field]
+
+    cache.set(serial, fresh)
+    _log.info("device fields %s: %s read", serial, ", ".join(expired))
+    return values
+
+
+def adb_refresh_device_cache(invalidate=False):
+    """Read the expired fields of the connected adb device (all of them with invalidate), in one shell command"""
+
+    if invalidate:
+        get_device_cache().invalidate(device_serial())
+    return adb_device_fields(*device_fields)
+
+
+def adb_device_spec():
+    """Return the abis, sdk, density and locales of the connected adb device (from the device cache)"""
+
+    fields = adb_device_fields("props", "density")
+    return parse_device_spec(fields["props"], fields["density"])
+
+
+def _select_device_splits(splits:list) -> list:
+    """Keep only the splits needed by the connected device from a list of (name, size)"""
+
+    if len(splits) < 2 or not _conf.get("split_selection", True):
+        return [name for name, _ in splits]
+
+    selected, skipped = select_splits(splits, adb_device_spec())
+    if skipped:
+        print(f"[*] {len(selected)}/{len(splits)} splits selected for the device ({skipped/1e6:.1f} MB skipped)")
+    return selected
+
+
 def adb_install_apk(apk_files:list, replace_apk=False, allow_downgrade=False):
     """Install apk file(s) on a connected adb device"""
 
@@ -194,7 +480,8 @@ def adb_install_apk(apk_files:list, replace_apk=False, allow_downgrade=False):
         if apk_ext != ".apk":
             raise ValueError(f"apk format (.{apk_ext}) is not supported with adb !")
 
-#    apk_files = [f for f in apk_files if ("v7a" in f) or ("base" in f)]
+    # keep only the splits needed by the device
+    apk_files = _select_device_splits([(f, os.path.getsize(f)) for f in apk_files])
 
     # Create install command
     if len(apk_files) > 1:
@@ -206,12 +493,163 @@ def adb_install_apk(apk_files:list, replace_apk=False, allow_downgrade=False):
     if replace_apk: install_command.insert(1, "-r")
     if allow_downgrade: install_command.insert(1, "-d")
 
-    # install apk
-    return exec_cmd(cmd_adb_device() + install_command, get_result=True)
+    # install apk (the installed packages are read again after)
+    result = exec_cmd(cmd_adb_device() + install_command, get_result=True)
+    get_device_cache().invalidate(device_serial(), "packages")
+    return result
+
+
+def _bundle_splits(zip_ref:zipfile.ZipFile) -> list:
+    """Return the .apk members of an .apkm / .xapk archive"""
+
+    return [info for info in zip_ref.infolist() if info.filename.endswith(".apk")]
+
+
+def _pm_session_cmd(serial:str) -> str:
+    """Return the package manager command used for install sessions (cmd package is faster than pm)"""
+
+    try:
+        return "cmd package" if "cmd" in get_adb_client().features(serial) else "pm"
+    except AdbError:
+        return "pm"
+
+
+def _install_bundle_from_extract(bundle_path:str, replace_apk=False, allow_downgrade=False):
+    """Install an .apkm / .xapk file by extracting it (used without a reachable adb server)"""
+
+    apk_files = _extract_apkm_or_xapk(bundle_path, pin=True)
+    try:
+        return adb_install_apk(apk_files, replace_apk, allow_downgrade)
+    finally:
+        release_extracted(apk_files)
+
+
+def _abandon_session(pm:str, serial:str, session_id:str):
+    """Abandon a pm install session (its staged splits are deleted), ignore a lost device"""
+
+    _log.warning("install-abandon %s", session_id)
+    try:
+        get_adb_client().shell(serial, f"{pm} install-abandon {session_id}")
+    except (OSError, AdbError):
+        pass
+
+
+@timed("install.session")
+def _install_session(name:str, splits:list, replace_apk=False, allow_downgrade=False):
+    """Install splits in a pm install session, splits are (split name, size, open function) streamed to the device"""
+
+    client = get_adb_client()
+    serial = device_serial()
+    pm = _pm_session_cmd(serial)
+
+    # create install session
+    create_args = ["-r"] if replace_apk else []
+    if allow_downgrade: create_args.append("-d")
+    create_args += ["-S", str(sum(size for _, size, _ in splits))]
+
+    _log.info("install-create %s (%d splits)", name, len(splits))
+    result = client.shell(serial, f"{pm} install-create {' '.join(create_args)}")
+    session_id = re.search(r"\[(\d+)\]", result.stdout)
+    if session_id is None:
+        return CompletedProcess(name, 1, result.stdout, (result.stderr or result.stdout).strip())
+    session_id = session_id.group(1)
+
+    # stream each split to the session (exactly -S bytes : pm answers on the same stream)
+    try:
+        for index, (split_name, size, open_split) in enumerate(splits):
+            with get_telemetry().span("install.write") as span, open_split() as split_stream:
+                output = client.exec_out(
+                    serial,
+                    f"{pm} install-write -S {size} {session_id} {index}_{os.path.basename(split_name)} -",
+                    stdin=split_stream, size=size
+                ).decode("utf-8", errors="replace")
+                span.bytes = size
+            if "Success" not in output:
+                _abandon_session(pm, serial, session_id)
+                return CompletedProcess(name, 1, output, output.strip() or f"install-write of {split_name} failed")
+    except BaseException as e:
+        # the staged splits are not left on the device (cancelled, lost connection, corrupted member, ...)
+        _abandon_session(pm, serial, session_id)
+        if isinstance(e, (OSError, AdbError)) and not isinstance(e, JobCancelled):
+            return CompletedProcess(name, 1, "", f"install-write failed ({str(e) or type(e).__name__})")
+        raise
+
+    # commit the session (the device verifies and installs the splits)
+    with get_telemetry().span("install.commit"):
+        result = client.shell(serial, f"{pm} install-commit {session_id}")
+    get_device_cache().invalidate(serial, "packages")
+    output = (result.stdout + result.stderr).strip()
+    if "Success" in output:
+        return CompletedProcess(name, 0, output, "")
+    return CompletedProcess(name, 1, output, output)
+
+
+def adb_install_bundle(bundle_path:str, replace_apk=False, allow_downgrade=False):
+    """Install an .apkm / .xapk file by streaming its .apk splits in a pm install session (no temp files)"""
+
+    with zipfile.ZipFile(bundle_path, "r") as zip_ref:
+        splits = _bundle_splits(zip_ref)
+        if splits == []:
+            return CompletedProcess(bundle_path, 1, "", f"no .apk file in {os.path.basename(bundle_path)}")
+
+        try:
+            # keep only the splits needed by the device
+            selected = _select_device_splits([(split.filename, split.file_size) for split in splits])
+            return _install_session(
+                os.path.basename(bundle_path),
+                [(split.filename, split.file_size, lambda split=split: zip_ref.open(split)) for split in splits if split.filename in selected],
+                replace_apk, allow_downgrade
+            )
+        except ConnectionRefusedError: # adb server not reachable before the session (nothing sent)
+            return _install_bundle_from_extract(bundle_path, replace_apk, allow_downgrade)
+
+
+def adb_install_split_files(apk_files:list, replace_apk=False, allow_downgrade=False):
+    """Install already extracted .apk splits by streaming them in a pm install session"""
+
+    try:
+        selected = _select_device_splits([(f, os.path.getsize(f)) for f in apk_files])
+        return _install_session(
+            os.path.basename(os.path.dirname(apk_files[0])),
+            [(f, os.path.getsize(f), lambda f=f: open(f, "rb")) for f in selected],
+            replace_apk, allow_downgrade
+        )
+    except ConnectionRefusedError: # adb server not reachable before the session (nothing sent)
+        return adb_install_apk(apk_files, replace_apk, allow_downgrade)
+
+
+def adb_install_package(apk_path:str, replace_apk=False, allow_downgrade=False):
+    """Install an .apk, .apkm or .xapk file on a connected adb device"""
+
+    if os.path.splitext(apk_path)[1] in bundle_exts:
+        return adb_install_bundle(apk_path, replace_apk, allow_downgrade)
+    return adb_install_apk([apk_path], replace_apk, allow_downgrade)
+
+
+def extract_bundle_id(bundle_path:str):
+    """Extract the package id of an .apkm / .xapk file from its metadata file (or its base .apk)"""
+
+    with zipfile.ZipFile(bundle_path, "r") as zip_ref:
+        names = zip_ref.namelist()
+
+        # .xapk : manifest.json ; .apkm : info.json
+        for meta_file, id_key in (("manifest.json", "package_name"), ("info.json", "pname")):
+            if meta_file in names:
+                try:
+                    return json.loads(zip_ref.read(meta_file)).get(id_key)
+                except ValueError:
+                    pass
+
+    # no metadata file : read the manifest of the base .apk
+    try:
+        return read_bundle_info(bundle_path).package
+    except ManifestError as e:
+        print(f"[-] cannot find apk id ({e})")
+        return None
 
 
-def extract_apk_id(apk_path:str):
-    """Extract id from a .apk file"""
+def _extract_apk_id_aapt(apk_path:str):
+    """Extract id from a .apk file with aapt"""
 
     # extract package Id
     result = exec_cmd(["aapt", "dump", "badging", apk_path], get_result=True)
@@ -226,34 +664,116 @@ def extract_apk_id(apk_path:str):
     return package_id
 
 
+def extract_apk_id(apk_path:str):
+    """Extract id from a .apk file"""
+
+    # read the binary AndroidManifest.xml
+    try:
+        return read_apk_info(apk_path).package
+    except ManifestError as e:
+        _log.warning("%s: %s", os.path.basename(apk_path), e)
+
+    # fallback on aapt (optional dependency)
+    if shutil.which("aapt") is not None:
+        return _extract_apk_id_aapt(apk_path)
+
+    print(f"[-] cannot find apk id ({os.path.basename(apk_path)})")
+    return None
+
+
 def adb_list_packages():
-    """List all packages of a connected adb device"""
+    """List all packages of a connected adb device (from the device cache)"""
+
+    return list(adb_package_versions())
+
+
+def adb_package_versions() -> dict:
+    """Return the installed packages of a connected adb device and their version codes (None before android 9)"""
+
+    packages = adb_device_fields("packages")["packages"]
+    return packages if isinstance(packages, dict) else dict.fromkeys(packages) # list in the caches of older versions
+
+
+def adb_is_installed(package_id:str) -> bool:
+    """Check if a package is installed on a connected adb device (from the device cache, else with a targeted pm path)"""
+
+    packages = get_device_cache().get(device_serial(), "packages")
+    if packages is not None:
+        return package_id in packages
+
+    result = adb_shell_cmd(["pm", "path", package_id], get_result=True)
+    return result.returncode == 0 and result.stdout.startswith("package:")
+
+
+def _is_resumable(size:int) -> bool:
+    """Check if a file is big enough to be transferred with resume support"""
 
-    # get installed packages
-    _packages_id = adb_shell_cmd(["pm", "list", "packages"], True)
+    return size >= _conf.get("resumable_min_mb", default_resumable_min_mb) * 1024 * 1024
 
-    # check returncode
-    if _packages_id.returncode != 0:
-        return []
 
-    # extract packages from result
-    packages_id = []
-    for line in _packages_id.stdout.splitlines():
-        packages_id.append(line.split("package:")[1])
+def use_compression() -> bool:
+    """Check if the transfers can be compressed on the wire (conf 'compression')"""
 
-    return packages_id
+    return _conf.get("compression", True)
 
 
 def adb_push_path(src:str, trg:str):
     """Push a file or a directory of files to a connected adb device"""
 
-    return exec_cmd(cmd_adb_device() + ["push", src, trg])
+    _log.info("push %s -> %s", src, trg)
+    try:
+        features = get_adb_client().features(device_serial())
+    except ConnectionRefusedError: # adb server not reachable (nothing sent) : adb program
+        return exec_cmd(cmd_adb_device() + ["push", src, trg])
+    except (OSError, AdbError) as e:
+        _log.error("push failed (%s)", e)
+        return False
+
+    try:
+        # big file : push through a partial file (resumed after a disconnection, its segments are appended with shell v2 stdin),
+        # compressible files are streamed
+        big_file = os.path.isfile(src) and _is_resumable(os.path.getsize(src)) and not (use_compression() and should_compress(src, os.path.getsize(src)))
+        if big_file and "shell_v2" in features:
+            resumable_push(device_serial(), src, trg, TransferState(transfer_state_path), _wait_reconnect)
+            return True
+
+        stats = parallel_push(device_serial(), src, trg, _conf.get("transfer_streams", default_transfer_streams), use_compression())
+        print(f"[*] {stats}")
+        _log.info("pushed %s", stats, extra={"command": "push", "seconds": stats.seconds, "bytes": stats.bytes})
+        return True
+    except (OSError, AdbError) as e: # lost during the transfer : not restarted with the adb program
+        _log.error("push failed (%s)", e)
+        return False
 
 
 def adb_pull_path(src:str, trg:str):
     """Pull a file or a directory of files from a connected adb device"""
 
-    return exec_cmd(cmd_adb_device() + ["pull", src, trg])
+    _log.info("pull %s -> %s", src, trg)
+    try:
+        with get_adb_client().sync(device_serial()) as sync_conn:
+            mode, size, _ = sync_conn.stat(src)
+    except ConnectionRefusedError: # adb server not reachable (nothing sent) : adb program
+        return exec_cmd(cmd_adb_device() + ["pull", src, trg])
+    except (OSError, AdbError) as e:
+        _log.error("pull failed (%s)", e)
+        return False
+
+    try:
+        # big file : pull in a partial file (resumed after a disconnection)
+        if stat.S_ISREG(mode):
+            size = remote_file_size(device_serial(), src) or size # the sync size of a file over 4 GiB is truncated
+        if stat.S_ISREG(mode) and _is_resumable(size) and not (use_compression() and should_compress(src, size)):
+            resumable_pull(device_serial(), src, trg, _wait_reconnect)
+            return True
+
+        stats = parallel_pull(device_serial(), src, trg, _conf.get("transfer_streams", default_transfer_streams), use_compression())
+        print(f"[*] {stats}")
+        _log.info("pulled %s", stats, extra={"command": "pull", "seconds": stats.seconds, "bytes": stats.bytes})
+        return True
+    except (OSError, AdbError) as e: # lost during the transfer : not restarted with the adb program
+        _log.error("pull failed (%s)", e)
+        return False
 
 
 def adb_disable_dev_opts():
@@ -0,0 +1,116 @@
+#---------------------------------------------------------------------------------
+# -*- coding: utf-8 -*-
+# Python: 3.12.0
+# Author: Killian Nallet
+# Date: 17/10/2026
+#---------------------------------------------------------------------------------
+
+
+# imports
+import os
+import shlex
+import hashlib
+
+from adb_client import get_adb_client
+from telemetry import timed
+from transfer import PUSH, default_transfer_streams, list_local_tree, list_remote_tree, parallel_transfer
+
+
+# define constants
+hash_chunk_size = 1024 * 1024
+md5sum_batch_size = 200 # files per md5sum shell command
+
+
+# define functions
+def local_md5(path:str) -> str:
+    """Return the md5 hex digest of a local file"""
+
+    digest = hashlib.md5()
+    with open(path, "rb") as file:
+        while chunk := file.read(hash_chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def remote_md5(serial:str, remote_root:str, rel_paths:list) -> dict:
+    """Return {relative path: md5} of remote files (one md5sum command per batch of files)"""
+
+    hashes = {}
+    client = get_adb_client()
+    for index in range(0, len(rel_paths), md5sum_batch_size):
+        batch = rel_paths[index:index + md5sum_batch_size]
+        result = client.shell(serial, f"cd {shlex.quote(remote_root)} && md5sum {' '.join(shlex.quote(p) for p in batch)}")
+        for line in result.stdout.splitlines():
+            digest, _, rel_path = line.partition("  ")
+            if rel_path:
+                hashes[rel_path] = digest
+    return hashes
+
+
+@timed("parse.sync_plan")
+def plan_sync(serial:str, local_root:str, remote_root:str, delete=False, use_hash=False) -> dict:
+    """Compare a local folder with a remote folder, return the files to add, update and delete"""
+
+    local_files = list_local_tree(local_root)
+    remote_files = list_remote_tree(serial, remote_root)
+
+    plan = {"add": [], "update": [], "delete": [], "unchanged": 0}
+    maybe_same = [] # same size, different mtime (checked with hashes)
+
+    for rel_path, (size, mtime) in sorted(local_files.items()):
+        if rel_path not in remote_files:
+            plan["add"].append(rel_path)
+            continue
+
+        remote_size, remote_mtime = remote_files[rel_path]
+        if remote_size != size: # exact sizes (list_remote_tree corrects the files over 4 GiB)
+            plan["update"].append(rel_path)
+        elif remote_mtime != mtime & 0xFFFFFFFF: # sync v1 mtimes are 32 bits
+            (maybe_same if use_hash else plan["update"]).append(rel_path)
+        else:
+            plan["unchanged"] += 1
+
+    # compare the content of the files with a different mtime only
+    if maybe_same:
+        hashes = remote_md5(serial, remote_root, maybe_same)
+        for rel_path in maybe_same:
+            if hashes.get(rel_path) == local_md5(os.path.join(local_root, rel_path)):
+                plan["unchanged"] += 1
+            else:
+                plan["update"].append(rel_path)
+
+    if delete:
+        plan["delete"] = sorted(rel_path for rel_path in remote_files if rel_path not in local_files)
+
+    return plan
+
+
+def print_sync_plan(plan:dict):
+    """Print the changes of a sync plan"""
+
+    for rel_path in plan["add"]:
+        print(f"  + {rel_path}")
+    for rel_path in plan["update"]:
+        print(f"  ~ {rel_path}")
+    for rel_path in plan["delete"]:
+        print(f"  - {rel_path}")
+    print(f"[*] {len(plan['add'])} to add, {len(plan['update'])} to update, {len(plan['delete'])} to delete, {plan['unchanged']} unchanged")
+
+
+def run_sync(serial:str, local_root:str, remote_root:str, plan:dict, streams:int=default_transfer_streams, compress=False) -> int:
+    """Apply a sync plan (push the added / updated files, delete the removed files), return the bytes sent"""
+
+    client = get_adb_client()
+    remote_root = remote_root.rstrip("/")
+
+    jobs = [
+        (os.path.join(local_root, rel_path), f"{remote_root}/{rel_path}", os.path.getsize(os.path.join(local_root, rel_path)))
+        for rel_path in plan["add"] + plan["update"]
+    ]
+    sent = parallel_transfer(serial, jobs, PUSH, streams, compress).bytes if jobs else 0
+
+    for index in range(0, len(plan["delete"]), md5sum_batch_size):
+        batch = plan["delete"][index:index + md5sum_batch_size]
+        client.shell(serial, "rm -f " + " ".join(shlex.quote(f"{remote_root}/{rel_path}") for rel_path in batch))
+
+    return sent
@@ -8,14 +8,29 @@
 
 # imports
 import os
+import sys
 import json
+import codecs
 import time
+import shlex
+import signal
+import asyncio
+import argparse
 from dotenv import load_dotenv
 
-import threading
 from prompt_toolkit import PromptSession
+from prompt_toolkit.patch_stdout import patch_stdout
 
 from adb_functions import *
+from device_tracker import Backoff, track_devices_async
+from apk_catalog import ApkCatalog
+from bulk_install import default_install_workers, bulk_install, print_bulk_summary
+from batch import ON_ERROR_CONTINUE, ON_ERROR_STOP, BatchRunner, default_prefetch, print_batch_summary, read_script, write_batch_summary
+from adb_sync import plan_sync, print_sync_plan, run_sync
+from fleet import FLEET_DOWNGRADE, default_fleet_workers, fleet_install, fleet_push, print_fleet_results
+from jobs import JOB_FAILED, JobManager, print_jobs
+from macros import MacroError, MacroRecorder
+from telemetry import get_telemetry, print_stats
 from config import env_file_path, check_dependencies_groups
 
 
@@ -27,17 +42,23 @@ device_downloads_dir = "/storage/emulated/0/Download/" # refers to the termux in
 pc_downloads_dir = os.path.join(current_dir_path, "adb-downloads")
 
 conf_path = os.path.join(current_dir_path, "data", "adb_term_conf.json")
+catalog_path = os.path.join(current_dir_path, "data", "apk_catalog.db")
 log_path = os.path.join(current_dir_path, "data", "adb_term.log")
+stats_path = os.path.join(current_dir_path, "data", "adb_term_stats.jsonl")
 
 
 # define variables
 conf = {}
-event_device_connected = threading.Event()
-event_exit = threading.Event()
+event_device_connected = None # asyncio.Event, created by main()
+reconnect_task = None
+foreground_task = None # operation stopped by ctrl-c (outside the prompt)
+sh_mode = False # the commands are run with their output instead of being typed in the device terminal
+macro_recorder = None # MacroRecorder of the keys sent (.macro record)
 
 
-# initialise PromptSession for for non-blocking input
+# initialise PromptSession for for non-blocking input (commands and questions)
 session = PromptSession()
+ask_session = PromptSession()
 
 class PromptExit(Exception):
     """Exception used to exit the PromptSession"""
@@ -63,344 +84,866 @@ def save_conf():
 
     adb_fncts_set_conf(conf)
 
-def reconnect_device():
-    """Reconnect the selected adb decice if it is disconnect"""
+async def ask(message:str) -> str:
+    """Ask a question without blocking the event loop"""
 
-    # set the reconnect event
-    event_device_connected.set()
+    return await ask_session.prompt_async(message)
 
-    # reconnect loop
-    while not event_exit.is_set():
+async def wait_connected(timeout:float):
+    """Wait the reconnection of the device (at most timeout seconds)"""
 
-        # check the connexion
-        if check_conn():
-            if not event_device_connected.is_set():
-                print("\n[+] device reconnected")
-            event_device_connected.set()
+    try:
+        await asyncio.wait_for(event_device_connected.wait(), timeout)
+    except TimeoutError:
+        pass
 
+async def reconnect_device():
+    """Try to reconnect the selected adb device (bounded exponential backoff between attempts)"""
+
+    backoff = Backoff()
+    address = f"{conf['ip']}:{conf['port']}"
+
+    while not event_device_connected.is_set():
+        try:
+            log.info(await asyncio.to_thread(get_adb_client().connect_device, address))
+        except (OSError, AdbError) as e:
+            log.warning("reconnect %s failed (%s)", address, e)
+
+        # the device monitor set the event as soon as the device is back
+        await wait_connected(backoff.next())
+
+def on_device_state(serial:str, old_state:str, new_state:str):
+    """Called by the device monitor task when a device state changes"""
+    global reconnect_task
+
+    if serial != f"{conf['ip']}:{conf['port']}":
+        return
+    log.info("device %s : %s -> %s", serial, old_state, new_state)
+
+    # connected
+    if new_state == "device":
+        if not event_device_connected.is_set():
+            print("\n[+] device reconnected")
+            get_device_cache().invalidate(serial) # rebooted / updated : its properties are read again
+        event_device_connected.set()
+
+    # disconnected
+    elif event_device_connected.is_set():
+        event_device_connected.clear()
+        get_adb_client().close_shell_session(serial)
+        get_adb_client().close_pool(serial)
+
+        for prompt_session in (session, ask_session):
+            if prompt_session.app.is_running:
+                prompt_session.app.exit(exception=PromptExit())
+        print("\n[!] device disconnected")
+
+        # start reconnect attempts
+        if reconnect_task is None or reconnect_task.done():
+            reconnect_task = asyncio.create_task(reconnect_device())
+
+def on_sigint(signum, frame):
+    """Ctrl-c outside the prompt : stop the foreground operation"""
+
+    if foreground_task is None:
+        raise KeyboardInterrupt()
+    foreground_task.get_loop().call_soon_threadsafe(foreground_task.cancel)
+
+async def run_foreground(awaitable):
+    """Await an operation which can be stopped with ctrl-c, return (completed, result)"""
+    global foreground_task
+
+    foreground_task = asyncio.ensure_future(awaitable)
+    try:
+        return True, await foreground_task
+    except asyncio.CancelledError:
+        return False, None
+    finally:
+        foreground_task = None
+
+async def run_job(name:str, function, *args, background=False):
+    """Run a blocking operation as a job, in foreground (stopped by ctrl-c) or in background"""
+
+    job = jobs.start(name, function, *args, background=background)
+    if background:
+        print(f"[*] job [{job.id}] started in background ({name})")
+        return None
+
+    completed, result = await run_foreground(jobs.wait(job))
+    if not completed:
+        jobs.cancel(job.id)
+        print(f"\r[!] job [{job.id}] cancelled ({name})")
+    return result
+
+async def run_stream(command:str):
+    """Run a shell command with its output displayed as it arrives (ctrl-c interrupts it), return its exit code"""
+
+    stream = adb_shell_stream(command)
+    decoders = {"stdout": codecs.getincrementaldecoder("utf-8")(errors="replace"), "stderr": codecs.getincrementaldecoder("utf-8")(errors="replace")}
+
+    def write(name:str, data:bytes):
+        output = getattr(sys, name)
+        output.write(decoders[name].decode(data))
+        output.flush()
+
+    task = asyncio.ensure_future(asyncio.to_thread(stream.run, lambda data: write("stdout", data), lambda data: write("stderr", data)))
+    interrupted = False
+    while True:
+        completed, returncode = await run_foreground(asyncio.shield(task))
+        if completed:
+            return returncode
+
+        # first ctrl-c : SIGINT to the remote command, next ones : close the stream
+        if not interrupted and await asyncio.to_thread(stream.interrupt):
+            interrupted = True
+            print("^C")
         else:
-            # disconnected
-            if event_device_connected.is_set():
-                session.app.exit(exception=PromptExit())
+            stream.close()
 
-                while session.app.is_running:
-                    time.sleep(0.1)
-                if not event_exit.is_set():
-                    print("\n[!] device disconnected")
+async def sh_command(command:str):
+    """Run a shell command with live output and print its exit code"""
 
-            event_device_connected.clear()
+    try:
+        returncode = await run_stream(command)
+    except (OSError, AdbError) as e:
+        print(f"[-] shell stream failed ({e})")
+        return
 
-        # wait
-        time.sleep(0.5)
+    if returncode is None:
+        print("[!] command stopped")
+    elif returncode != 0:
+        print(f"[!] exit code {returncode}")
 
+def run_ahead(function, *args) -> asyncio.Future:
+    """Start a blocking function in a thread, its result is used later or ignored (its errors are not reported)"""
 
-# check and load env (for programs default paths)
-if os.path.exists(env_file_path):
-    load_dotenv()
-else:
-    print("Execute the config.py file to configure this tool")
+    future = asyncio.ensure_future(asyncio.to_thread(function, *args))
+    future.add_done_callback(lambda future: future.cancelled() or future.exception())
+    return future
 
+def record_keys(sequence:str):
+    """Add the keys sent to the macro being recorded"""
 
-# configure logger
-log = configure_logger(log_path)
+    if macro_recorder is not None:
+        macro_recorder.add(sequence)
 
-# check tool dependencies
-check_dependencies_groups(log)
+def on_job_done(job):
+    """Called when a job ends (background jobs and errors are reported)"""
 
-# start adb
-print(f"[*] starting adb")
-restart_adb()
+    if job.background or job.status == JOB_FAILED:
+        print(f"[*] job [{job.id}] {job.status} in {job.duration:.1f}s ({job.name})" + (f" : {job.error}" if job.error else ""))
 
-# check program conf
-if os.path.exists(conf_path):
-    load_conf()
 
-# pair new device and write conf
-else:
-    # get pair infos
-    print("[*] pair a new device")
-    conf = {}
-    conf["ip"] = input("[?] device ip: ")
-    conf["port"] = None
-    pair_port = input("[?] device pair port: ")
-    pair_code = input("[?] device pair code: ")
-    save_conf()
-
-    # pair device
-    if exec_cmd(["adb", "pair", conf["ip"]+":"+pair_port, pair_code]):
-        print("[+] new device paired")
-    else: 
-        print("[-] pair of new device failed !"); exit()
-
-
-# connect device loop
-while True:
-
-    # search device
-    print(f"\nSearching device {conf["ip"]}")
-    ping_ip = ping_host(conf["ip"]) # ping ip (check if ip is valid on the local network)
-
-    if ping_ip:
-        # connect device
-        print("[*] connecting to device")
-        if not check_conn():
-            
-            # check port
-            if conf["port"] is None:
-                conf["port"] = input("[?] device connect port: ")
-                save_conf()
+def find_apk(apk_filename:str):
+    """Find an apk from a path or in the apks catalog, return (apk path or None, apk file name)"""
+
+    apk_exts = [".apk", ".apkm", ".xapk"]
+    apk_path = None
 
-            # try connect
-            exec_cmd(["adb", "connect", conf["ip"]+":"+conf["port"]])
-            device_connected = check_conn() # test shell access
+    # check if the path is valid
+    if os.path.exists(apk_filename):
+        if os.path.isfile(apk_filename):
+            apk_ext = os.path.splitext(apk_filename)[1]
+            if apk_ext in apk_exts:
+                apk_path = apk_filename
+            else:
+                print(f"[!] .{apk_ext} files are not supported")
+        else:
+            print(f"[!] {apk_filename} is not a file")
 
+    # search apk in the apks catalog (file name, package id or prefix)
     else:
-        print("[!] device not found")
-        device_connected = False
+        apk_entries = apk_catalog.lookup(apk_filename) # newest version first
+        if len({entry["package"] or entry["path"] for entry in apk_entries}) > 1:
+            print(f"[!] several apks match '{apk_filename}' : {", ".join(entry["name"] for entry in apk_entries)}")
+        elif apk_entries != []:
+            apk_path = apk_entries[0]["path"]
+            apk_filename = apk_entries[0]["name"]
 
-    # retype and save device infos
-    if conf["port"] is None or not device_connected:
-        print("[-] connect device failed") if conf["port"] is not None else None
+    return apk_path, apk_filename
 
-        # try to connect a new port
-        print("[*] input device infos :")
-        if not ping_ip:
-            ip = input(f"[?] device ip ({conf['ip']}) -> ")
-            conf["ip"] = ip if ip != "" else conf["ip"]
+def get_apk_id(apk_path:str):
+    """Return the package id of an apk (from the catalog if it is indexed)"""
 
-        connect_port = input("[?] device connect port: ")
-        conf["port"] = connect_port if connect_port != "" else conf["port"]
-        save_conf()
+    catalog_entry = apk_catalog.get(apk_path)
+    if catalog_entry is not None and catalog_entry["package"]:
+        return catalog_entry["package"]
 
-    # device connected
-    else:
-        print("[+] device connected\n")
-        break
+    try:
+        return extract_bundle_id(apk_path) if os.path.splitext(apk_path)[1] in bundle_exts else extract_apk_id(apk_path)
+    except Exception:
+        return None
+
+def get_group(name:str) -> list:
+    """Return the devices serials of a group (from the conf)"""
+
+    return conf.get("groups", {}).get(name, [])
 
 
-# start reconnect thread
-threading.Thread(target=reconnect_device, daemon=True).start()
+def is_downgrade_error(err:str) -> bool:
+    """Check if an install error is a version downgrade"""
 
-# loop for send commands
-print(f"[*] session started with {conf['ip']}")
+    return "INSTALL_FAILED_VERSION_DOWNGRADE" in err and "Downgrade detected" in err
+
+def install_job(apk_path:str, apk_filename:str, replace_apk=False, allow_downgrade=False, background=False, install_start:float=None):
+    """Install an apk and print the result (job), return the install result (the time is counted from install_start)"""
+
+    install_start = install_start or time.time()
+    result = adb_install_package(apk_path, replace_apk, allow_downgrade=allow_downgrade)
+
+    if result.returncode == 0: # no error
+        print(f"[+] apk '{apk_filename}' installed in {time.time()-install_start:.1f}s")
+    elif is_downgrade_error(result.stderr.strip()):
+        print("[!] Downgrade detected")
+        if background:
+            print(f"[*] run '.install {apk_filename}' in foreground to install this old apk version")
+    else:
+        print(f"[-] install apk failed ({result.stderr.strip().replace("\n", "")})")
+    return result
+
+def fleet_install_job(serials:list, apk_path:str, apk_id:str, replace_apk=False, allow_downgrade=False, background=False) -> dict:
+    """Install an apk on a group of devices (job), the results are printed by background jobs"""
+
+    results = fleet_install(
+        serials, apk_path, apk_id, replace_apk, allow_downgrade=allow_downgrade,
+        workers=conf.get("fleet_workers", default_fleet_workers), sha256=apk_catalog.file_hash(apk_path)
+    )
+    if background:
+        print_fleet_results(results)
+        if any(code == FLEET_DOWNGRADE for code, _ in results.values()):
+            print("[*] run the install in foreground to install this old apk version on the downgraded devices")
+    return results
+
+def push_job(src_path:str, trg_path:str):
+    """Push a path and print the result (job)"""
+
+    if adb_push_path(src_path, trg_path):
+        print(f"[+] path pushed to \"{trg_path}\"")
+    else:
+        print("[-] push of path failed")
 
-while True:
+def pull_job(src_path:str, pc_downloads_path:str):
+    """Pull a path and print the result (job)"""
 
-    # wait reconnect
-    if not event_device_connected.is_set():
-        print(f"Reconnecting device {conf['ip']}...")
+    if adb_pull_path(src_path, pc_downloads_path):
+        print(f"[+] path pulled to {pc_downloads_path}")
+    else:
+        print("[-] pull of path failed")
+
+def sync_job(local_root:str, remote_root:str, delete=False, dry_run=False, use_hash=False):
+    """Sync a local folder to the device and print the changes (job)"""
+
+    # compare both sides
+    sync_start = time.time()
+    try:
+        plan = plan_sync(device_serial(), local_root, remote_root, delete=delete, use_hash=use_hash)
+    except (OSError, AdbError) as e:
+        print(f"[-] sync failed ({e})")
+        return
+    print_sync_plan(plan)
+
+    # apply the changes
+    if not dry_run:
         try:
-            while not event_device_connected.is_set(): 
-                time.sleep(0.1)
-        except KeyboardInterrupt: 
-            break
+            sent = run_sync(device_serial(), local_root, remote_root, plan, conf.get("transfer_streams", default_transfer_streams), use_compression())
+            print(f"[+] synced in {time.time()-sync_start:.1f}s ({sent/1e6:.1f} MB sent)")
+        except (OSError, AdbError) as e:
+            print(f"[-] sync failed ({e})")
+
+def bulk_install_job(source:str, allow_downgrade=False):
+    """Install the packages of a folder or manifest and print the summary (job)"""
 
-    # interactive prompt
     try:
-        send_crtlc = False
-        cmd = session.prompt("adb-term> ").strip()
+        summary = bulk_install(source, find_apk, apk_catalog, conf.get("install_workers", default_install_workers), allow_downgrade=allow_downgrade)
+    except (OSError, AdbError) as e:
+        print(f"[-] bulk install failed ({e})")
+        return
+    print_bulk_summary(summary)
+
+
+async def connect_device():
+    """Search and connect the device of the conf (ask new infos on failure)"""
+
+    while True:
+
+        # search device
+        print(f"\nSearching device {conf["ip"]}")
+        ping_ip = await ping_host_async(conf["ip"]) # ping ip (check if ip is valid on the local network)
+
+        if ping_ip:
+            # connect device
+            print("[*] connecting to device")
+            device_connected = check_conn()
+            if not device_connected:
 
-    except PromptExit:
+                # check port
+                if conf["port"] is None:
+                    conf["port"] = await ask("[?] device connect port: ")
+                    save_conf()
+
+                # try connect
+                await exec_cmd_async(["adb", "connect", conf["ip"]+":"+conf["port"]])
+                device_connected = check_conn() # test shell access
+
+        else:
+            print("[!] device not found")
+            device_connected = False
+
+        # retype and save device infos
+        if conf["port"] is None or not device_connected:
+            print("[-] connect device failed") if conf["port"] is not None else None
+
+            # try to connect a new port
+            print("[*] input device infos :")
+            if not ping_ip:
+                ip = await ask(f"[?] device ip ({conf['ip']}) -> ")
+                conf["ip"] = ip if ip != "" else conf["ip"]
+
+            connect_port = await ask("[?] device connect port: ")
+            conf["port"] = connect_port if connect_port != "" else conf["port"]
+            save_conf()
+
+        # device connected
+        else:
+            print("[+] device connected\n")
+            break
+
+
+async def main():
+    """Connect the device, start the device monitor and run the commands loop"""
+    global conf, event_device_connected, sh_mode, macro_recorder
+
+    loop = asyncio.get_running_loop()
+    event_device_connected = asyncio.Event()
+    previous_sigint = signal.signal(signal.SIGINT, on_sigint)
+
+    # update the apks catalog in background (only new / changed files are indexed)
+    catalog_task = asyncio.create_task(asyncio.to_thread(apk_catalog.refresh))
+
+    # check program conf
+    if os.path.exists(conf_path):
+        load_conf()
+        get_telemetry().set_sink(conf.get("stats_spans_path")) # optional : every span in a json lines file
+
+    # pair new device and write conf
+    else:
+        # get pair infos
+        print("[*] pair a new device")
+        conf = {}
+        conf["ip"] = await ask("[?] device ip: ")
+        conf["port"] = None
+        pair_port = await ask("[?] device pair port: ")
+        pair_code = await ask("[?] device pair code: ")
+        save_conf()
+
+        # pair device
+        if await exec_cmd_async(["adb", "pair", conf["ip"]+":"+pair_port, pair_code]):
+            print("[+] new device paired")
+        else:
+            print("[-] pair of new device failed !"); return
+
+    # connect device and read its properties (abi, density, packages, ...) unless they are cached
+    await connect_device()
+    await asyncio.to_thread(adb_refresh_device_cache)
+
+    # start the device monitor task (device connected / disconnected events)
+    event_device_connected.set()
+    adb_fncts_set_wait_reconnect( # transfers (worker threads) resume after a reconnection
+        lambda: asyncio.run_coroutine_threadsafe(wait_connected(60), loop).result()
+    )
+    monitor_task = asyncio.create_task(track_devices_async(on_device_state))
+
+    # loop for send commands
+    print(f"[*] session started with {conf['ip']}")
+
+    while True:
+
+        # wait reconnect
         if not event_device_connected.is_set():
+            print(f"Reconnecting device {conf['ip']}...")
+            completed, _ = await run_foreground(event_device_connected.wait())
+            if not completed: # ctrl-c
+                break
+
+        # interactive prompt
+        try:
+            send_crtlc = False
+            cmd = (await session.prompt_async("adb-sh> " if sh_mode else "adb-term> ")).strip()
+
+        except PromptExit:
+            if not event_device_connected.is_set():
+                continue
+
+        except KeyboardInterrupt: # ctrl-c
+            send_crtlc = True
+
+        except EOFError: # ctrl-d (from session.prompt_async())
+            break
+
+
+        # ctrl-C
+        if send_crtlc:
+            await adb_send_key_async(KeyMap.ctrl_right, KeyMap.c, keycombination=True)
+            record_keys("ctrl_right+c")
+            print("\rKeyboardInterrupt -> [Ctrl-c] send to device")
             continue
 
-    except KeyboardInterrupt: # ctrl-c
-        send_crtlc = True
 
-    except EOFError: # ctrl-d (from session.prompt())
-        event_exit.set()
-        break
+        # long commands ending with '&' run in background
+        background = cmd.startswith(".") and cmd.endswith(" &")
+        if background:
+            cmd = cmd[:-2].strip()
 
+        # count the commands by type
+        get_telemetry().count(f"command {cmd.split()[0] if cmd.startswith('.') else 'text' if cmd else 'enter'}")
 
-    # ctrl-C
-    if send_crtlc:
-        adb_send_key(KeyMap.ctrl_right, KeyMap.c, keycombination=True)
-        print("\rKeyboardInterrupt -> [Ctrl-c] send to device")
-        continue
 
+        # no command
+        if cmd == "":
+            if not sh_mode:
+                await adb_send_key_async(KeyMap.enter) # enter
+                record_keys("enter")
 
-    # no command
-    if cmd == "":
-        adb_send_key(KeyMap.enter) # enter
+        # quit this program
+        elif cmd == ".quit":
+            break
 
-    # quit this program
-    elif cmd == ".quit":
-        break
 
+        # list background jobs
+        elif cmd == ".jobs":
+            print_jobs(list(jobs.jobs.values()))
 
-    # on / off screen
-    elif cmd == ".on_screen":
-        adb_send_key(KeyMap.power)
+        # cancel a job
+        elif cmd.startswith(".cancel "):
+            job_id = cmd.split(".cancel ")[1].strip()
+            if job_id.isdigit() and jobs.cancel(int(job_id)):
+                print(f"[*] cancelling job [{job_id}]")
+            else:
+                print(f"[!] no running job [{job_id}]")
 
-    elif cmd == ".off_screen":
-        adb_send_key(KeyMap.endcall) # or soft_sleep
 
+        # latency / throughput stats of the adb operations
+        elif cmd == ".stats":
+            print_stats(get_telemetry().snapshot())
 
-    # disable dev options
-    elif cmd == ".dev-off":
-        if adb_disable_dev_opts():
-            print("-> dev options are disabled")
+        elif cmd == ".stats reset":
+            get_telemetry().reset()
+            print("[*] stats cleared")
 
+        elif cmd.startswith(".stats export"):
+            export_path = cmd[len(".stats export"):].strip() or stats_path
+            print(f"[+] {get_telemetry().export_jsonl(export_path)} lines exported to {export_path}")
 
-    # get devices
-    elif cmd.startswith(".get-devices"):
-        # get devices
-        #TODO: set connected device
-        print(get_connected_devices())
 
+        # run a command with its output (stdout / stderr displayed as they arrive, ctrl-c interrupts it)
+        elif cmd.startswith(".sh "):
+            await sh_command(cmd[len(".sh "):])
 
-    # set user password (termux)
-    elif cmd.startswith(".termux-passwd "):
-        # get passwd
-        passwd = cmd.split(".termux-passwd ")[1]
-        # change passwd
-        if adb_send_cmd("passwd") and adb_send_cmd(passwd) and adb_send_cmd(passwd): # retype password
-            print("[*] password set")
-            save_conf()
+        # toggle : run all the commands with their output
+        elif cmd == ".sh":
+            sh_mode = not sh_mode
+            print(f"[*] shell mode {'on : commands run with their output' if sh_mode else 'off : commands are typed in the device terminal'}")
 
 
-    # install apk
-    elif cmd.startswith(".install "):
-        # get apk
-        apk_filename = cmd.split(".install ")[1]
-        apk_exts = [".apk", ".apkm", ".xapk"]
-        apk_filenames = [apk_filename+ext for ext in apk_exts]
-        apk_path = None
-
-        # check if the path is valid
-        if os.path.exists(apk_filename):
-            if os.path.isfile(apk_filename):
-                apk_ext = os.path.splitext()[1]
-                if apk_ext in apk_exts:
-                    apk_path = apk_filename
+        # on / off screen
+        elif cmd == ".on_screen":
+            await adb_send_key_async(KeyMap.power)
+            record_keys("power")
+
+        elif cmd == ".off_screen":
+            await adb_send_key_async(KeyMap.endcall) # or soft_sleep
+            record_keys("endcall")
+
+
+        # send a key sequence in one shell command (KeyMap names, key*N, key+key, sleep:s, @macro)
+        elif cmd.startswith(".keys "):
+            sequence = cmd[len(".keys "):]
+            try:
+                await adb_send_keys_async(sequence)
+                record_keys(sequence)
+            except MacroError as e:
+                print(f"[!] {e}")
+
+        # manage the key macros (saved in the conf)
+        elif cmd == ".macro" or cmd.startswith(".macro "):
+            args = cmd.split()[1:]
+            macros = conf.setdefault("macros", {})
+
+            if len(args) >= 3 and args[0] == "set":
+                macros[args[1]] = " ".join(args[2:])
+                save_conf()
+                print(f"[+] macro '{args[1]}' : {macros[args[1]]}")
+            elif len(args) == 2 and args[0] == "del":
+                if macros.pop(args[1], None) is not None:
+                    save_conf()
+                    print(f"[+] macro '{args[1]}' deleted")
+            elif len(args) == 2 and args[0] == "play":
+                try:
+                    await adb_send_keys_async(f"@{args[1]}")
+                except MacroError as e:
+                    print(f"[!] {e}")
+            elif len(args) in [2, 3] and args[0] == "record" and args[2:] in [[], ["--delays"]]:
+                macro_recorder = MacroRecorder(args[1], delays=args[2:] == ["--delays"])
+                print(f"[*] recording macro '{args[1]}' (keys, enter, ctrl-c, screen on / off), '.macro stop' to save it")
+            elif args == ["stop"] and macro_recorder is not None:
+                if macro_recorder.tokens:
+                    macros[macro_recorder.name] = macro_recorder.sequence()
+                    save_conf()
+                    print(f"[+] macro '{macro_recorder.name}' : {macros[macro_recorder.name]}")
                 else:
-                    print(f"[!] .{apk_ext} files are not supported")
+                    print("[!] no keys recorded")
+                macro_recorder = None
+            elif args == []:
+                for name, sequence in macros.items():
+                    print(f"{name}: {sequence}")
             else:
-                print(f"[!] {apk_filename} is not a file")
+                print("[!] usage: .macro | .macro set <name> <keys> | .macro del <name> | .macro play <name> | .macro record <name> [--delays] | .macro stop")
 
-        # search apk in apk dirs
-        else:
-            # recursive search
-            for search_dir, _, files in os.walk(apks_folder_path):
-                for file in files:
-                    if apk_filename == file:
-                        pass # ok
-                    elif file in apk_filenames:
-                        apk_filename = file # ok
-                    else: 
-                        continue
-                    apk_path = os.path.join(current_dir_path, search_dir, apk_filename)
-                    break
-
-                # if no break
-                else:
-                    continue
 
-                # if a break, quit loop
-                break
+        # disable dev options
+        elif cmd == ".dev-off":
+            if await asyncio.to_thread(adb_disable_dev_opts):
+                print("-> dev options are disabled")
 
-        # install apk
-        if apk_path is not None:
-            print(f"[*] installing '{apk_filename}' on {conf["ip"]}")
-
-            # extract or convert the apk file if needed
-            install_start = time.time()
-            apk_files = check_and_extract_apk(apk_path)
-
-            # check if the package is already installed
-            replace_apk = False
-            try: apk_id = extract_apk_id(apk_files[1] if len(apk_files) > 1 else apk_files[0])
-            except: apk_id = None
-
-            if (apk_id is not None) and (apk_id in adb_list_packages()):
-                print("[!] This apk is already installed on device")
-                if input("[?] Install the new apk without erasing old apk data (-> apk update) ? [y/n] ") in ["y", "yes"]:
-                    replace_apk = True
-
-            # try install and get result
-            result = adb_install_apk(apk_files, replace_apk)
-            if result.returncode == 0: # no error
-                print(f"[+] apk '{apk_filename}' installed in {time.time()-install_start:.1f}s")
-                continue
 
-            # error occured
+        # get devices
+        elif cmd.startswith(".get-devices"):
+            # get devices
+            #TODO: set connected device
+            print(await asyncio.to_thread(get_connected_devices))
+
+
+        # set user password (termux)
+        elif cmd.startswith(".termux-passwd "):
+            # get passwd
+            passwd = cmd.split(".termux-passwd ")[1]
+            # change passwd
+            if await adb_send_cmd_async("passwd") and await adb_send_cmd_async(passwd) and await adb_send_cmd_async(passwd): # retype password
+                print("[*] password set")
+                save_conf()
+
+
+        # search apks in the catalog
+        elif cmd.startswith(".apks"):
+            query = cmd[len(".apks"):].strip()
+            await asyncio.to_thread(apk_catalog.refresh)
+            for entry in apk_catalog.find(query):
+                print(f"{entry["name"]:<40} {entry["package"] or "?":<40} {entry["version_code"] or "":>10} {entry["size"]/1e6:8.1f} MB")
+
+
+        # manage devices groups (fleet mode)
+        elif cmd == ".group" or cmd.startswith(".group "):
+            args = cmd.split()[1:]
+            groups = conf.setdefault("groups", {})
+
+            if len(args) >= 3 and args[0] == "set":
+                groups[args[1]] = args[2:]
+                save_conf()
+                print(f"[+] group '{args[1]}' : {", ".join(args[2:])}")
+            elif len(args) == 2 and args[0] == "del":
+                if groups.pop(args[1], None) is not None:
+                    save_conf()
+                    print(f"[+] group '{args[1]}' deleted")
+            elif args == []:
+                for name, serials in groups.items():
+                    print(f"{name}: {", ".join(serials)}")
+            else:
+                print("[!] usage: .group | .group set <name> <serial> [serial ...] | .group del <name>")
+
+
+        # install the packages of a folder or manifest (up to date packages are skipped)
+        elif cmd.startswith(".install-all "):
+            args = shlex.split(cmd)[1:]
+            paths = [arg for arg in args if not arg.startswith("--")]
+
+            if len(paths) != 1 or not {arg for arg in args if arg.startswith("--")} <= {"--downgrade"}:
+                print("[!] usage: .install-all <folder|manifest> [--downgrade] [&]")
+            elif not os.path.exists(paths[0]):
+                print(f"[!] the path {paths[0]} don't exists")
+            else:
+                print(f"[*] installing the packages of '{paths[0]}' on {conf["ip"]}")
+                await run_job(f"install-all {paths[0]}", bulk_install_job, paths[0], "--downgrade" in args, background=background)
+
+
+        # install apk on a group of devices
+        elif cmd.startswith(".install @"):
+            group_name, _, apk_filename = cmd.split(".install @")[1].partition(" ")
+            serials = get_group(group_name)
+            apk_path, apk_filename = await asyncio.to_thread(find_apk, apk_filename.strip())
+
+            if serials == []:
+                print(f"[!] group '{group_name}' is empty or don't exists")
+            elif apk_path is None:
+                print(f"[!] apk '{apk_filename}' not found")
             else:
-                # strip error
-                err = result.stderr.strip()
+                print(f"[*] installing '{apk_filename}' on {len(serials)} devices ({group_name})")
+                install_start = time.time()
+                apk_id = await asyncio.to_thread(get_apk_id, apk_path)
+                try: replace_apk = await ask("[?] Update the devices where the apk is already installed (keep apk data) ? [y/n] ") in ["y", "yes"]
+                except (KeyboardInterrupt, PromptExit): continue
+                job_name = f"install {apk_filename} @{group_name}"
+                results = await run_job(job_name, fleet_install_job, serials, apk_path, apk_id, replace_apk, False, background, background=background)
+                if results is None: # background job or cancelled
+                    continue
+
+                # downgrade detected on some devices
+                downgrade_serials = [serial for serial, (code, _) in results.items() if code == FLEET_DOWNGRADE]
+                if downgrade_serials != []:
+                    print(f"[!] Downgrade detected on {len(downgrade_serials)} devices")
+                    try: install_old = await ask("[?] Install this old apk version on these devices ? [y/n] ") in ["yes", "y"]
+                    except (KeyboardInterrupt, PromptExit): install_old = False
+                    if install_old:
+                        results.update(await run_job(job_name, fleet_install_job, downgrade_serials, apk_path, apk_id, replace_apk, True) or {})
 
-                # downgrade detected
-                if "INSTALL_FAILED_VERSION_DOWNGRADE" in err and "Downgrade detected" in err:
+                print_fleet_results(results)
+                print(f"[*] fleet install done in {time.time()-install_start:.1f}s")
 
-                    # try reinstall with downgrade
-                    print("[!] Downgrade detected")
-                    if input("[?] Install this old apk version ? [y/n] ") in ["yes", "y"]:
+
+        # install apk
+        elif cmd.startswith(".install "):
+            # get apk
+            apk_path, apk_filename = await asyncio.to_thread(find_apk, cmd.split(".install ")[1])
+
+            # install apk
+            if apk_path is not None:
+                print(f"[*] installing '{apk_filename}' on {conf["ip"]}")
+                is_bundle = os.path.splitext(apk_path)[1] in bundle_exts
+
+                # pipeline : the device spec (split selection) is read while the package id is parsed and looked up on
+                # the device (targeted pm path query, it needs the id) and the question answered ; the splits are then
+                # streamed from the archive (no extraction)
+                install_start = time.time()
+                spec_task = run_ahead(adb_device_spec) if is_bundle else None
+                apk_id = await asyncio.to_thread(get_apk_id, apk_path)
+                replace_apk = False
+
+                if (apk_id is not None) and await asyncio.to_thread(adb_is_installed, apk_id):
+                    print("[!] This apk is already installed on device")
+                    try:
+                        if await ask("[?] Install the new apk without erasing old apk data (-> apk update) ? [y/n] ") in ["y", "yes"]:
+                            replace_apk = True
+                    except (KeyboardInterrupt, PromptExit): continue
+
+                if spec_task is not None:
+                    await asyncio.wait([spec_task])
+
+                # try install and get result
+                if is_bundle: print(f"[*] streaming .apk files from {os.path.splitext(apk_path)[1]} archive ...")
+                job_name = f"install {apk_filename}"
+                result = await run_job(job_name, install_job, apk_path, apk_filename, replace_apk, False, background, install_start, background=background)
+
+                # downgrade detected : try reinstall with downgrade
+                if result is not None and is_downgrade_error(result.stderr.strip()):
+                    try: install_old = await ask("[?] Install this old apk version ? [y/n] ") in ["yes", "y"]
+                    except (KeyboardInterrupt, PromptExit): install_old = False
+                    if install_old:
                         print(f"[*] installing '{apk_filename}'")
-                        result = adb_install_apk(apk_files, replace_apk, allow_downgrade=True)
-                        if result.returncode == 0: # no error
-                            print(f"[+] apk '{apk_filename}' installed in {time.time()-install_start:.1f}s")
-                        else:
-                            print(f"[-] install apk failed ({result.stderr.strip().replace("\n", "")})")
+                        await run_job(job_name, install_job, apk_path, apk_filename, replace_apk, True, False)
 
                     # install (downgrade) cancelled
                     else:
                         print(f"[-] install apk cancelled")
 
-                # other error in install apk
-                else:
-                    print(f"[-] install apk failed ({err})")
+            # apk not found
+            else:
+                print(f"[!] apk '{apk_filename}' not found")
 
-        # apk not found
-        else:
-            print(f"[!] apk '{apk_filename}' not found")
 
+        # push files on a group of devices
+        elif cmd.startswith(".push @"):
+            group_name, _, src_path = cmd.split(".push @")[1].partition(" ")
+            src_path = src_path.strip()
+            serials = get_group(group_name)
 
-    # push files
-    elif cmd.startswith(".push "):
-        # get file / dir
-        src_path = cmd.split(".push ")[1]
+            if serials == []:
+                print(f"[!] group '{group_name}' is empty or don't exists")
+                continue
+            if not os.path.exists(src_path):
+                print(f"[!] the path {src_path} don't exists, cannot push this")
+                continue
 
-        # check if the file exists
-        if not os.path.exists(src_path):
-            print(f"[!] the path {src_path} don't exists, cannot push this")
-            continue
+            # choose trg path
+            print(f"[*] By default, push path to \"{device_downloads_dir}\"")
+            try: trg_dir = await ask("[?] New target path (empty=default): ") or device_downloads_dir
+            except (KeyboardInterrupt, PromptExit): continue
+            trg_path = os.path.join(trg_dir, os.path.basename(src_path))
+
+            print(f"[*] pushing '{src_path}' to {len(serials)} devices ({group_name})")
+            results = await run_job(
+                f"push {src_path} @{group_name}", fleet_push, serials, src_path, trg_path,
+                conf.get("fleet_workers", default_fleet_workers), background=background
+            )
+            if results is not None:
+                print_fleet_results(results)
+
+
+        # push files
+        elif cmd.startswith(".push "):
+            # get file / dir
+            src_path = cmd.split(".push ")[1]
+
+            # check if the file exists
+            if not os.path.exists(src_path):
+                print(f"[!] the path {src_path} don't exists, cannot push this")
+                continue
 
-        # choose trg path
-        print(f"[*] By default, push path to \"{device_downloads_dir}\"")
-        try: trg_dir = input("[?] New target path (empty=default): ") or device_downloads_dir
-        except KeyboardInterrupt: continue
-        trg_path = os.path.join(trg_dir, os.path.basename(src_path))
+            # choose trg path
+            print(f"[*] By default, push path to \"{device_downloads_dir}\"")
+            try: trg_dir = await ask("[?] New target path (empty=default): ") or device_downloads_dir
+            except (KeyboardInterrupt, PromptExit): continue
+            trg_path = os.path.join(trg_dir, os.path.basename(src_path))
 
-        # send file
-        print(f"[*] pushing '{src_path}' to the device")
-        if adb_push_path(src_path, trg_path):
-            print(f"[+] path pushed to \"{trg_path}\"")
-        else:
-            print("[-] push of path failed")
+            # send file
+            print(f"[*] pushing '{src_path}' to the device")
+            await run_job(f"push {src_path}", push_job, src_path, trg_path, background=background)
 
 
-    # pull files
-    elif cmd.startswith(".pull "):
-        # choose trg path
-        print(f"[*] By default, path are pulled from \"{device_downloads_dir}\"")
-        try: src_device = input("[?] New source path (empty=default): ") or device_downloads_dir
-        except KeyboardInterrupt: continue
+        # sync a local folder to the device (only added / changed files are sent)
+        elif cmd.startswith(".sync "):
+            args = shlex.split(cmd)[1:]
+            options = {arg for arg in args if arg.startswith("--")}
+            paths = [arg for arg in args if not arg.startswith("--")]
 
-        # get file / dir
-        src_path = os.path.join(src_device, cmd.split(".pull ")[1])
-        pc_downloads_path = os.path.join(pc_downloads_dir, os.path.basename(src_path))
+            if len(paths) != 2 or not options <= {"--delete", "--dry-run", "--hash"}:
+                print("[!] usage: .sync <local dir> <remote dir> [--delete] [--dry-run] [--hash] [&]")
+                continue
+            if not os.path.isdir(paths[0]):
+                print(f"[!] {paths[0]} is not a directory")
+                continue
+
+            await run_job(
+                f"sync {paths[0]} {paths[1]}", sync_job, paths[0], paths[1],
+                "--delete" in options, "--dry-run" in options, "--hash" in options, background=background
+            )
+
+
+        # pull files
+        elif cmd.startswith(".pull "):
+            # choose trg path
+            print(f"[*] By default, path are pulled from \"{device_downloads_dir}\"")
+            try: src_device = await ask("[?] New source path (empty=default): ") or device_downloads_dir
+            except (KeyboardInterrupt, PromptExit): continue
+
+            # get file / dir
+            src_path = os.path.join(src_device, cmd.split(".pull ")[1])
+            pc_downloads_path = os.path.join(pc_downloads_dir, os.path.basename(src_path))
 
-        # check download dir
-        if not os.path.exists(pc_downloads_dir):
-            os.mkdir(pc_downloads_dir)
+            # check download dir
+            if not os.path.exists(pc_downloads_dir):
+                os.mkdir(pc_downloads_dir)
 
-        # pull file
-        print(f"[*] pulling '{src_path}' from the device")
-        if adb_pull_path(src_path, pc_downloads_path):
-            print(f"[+] path pulled to {pc_downloads_path}")
+            # pull file
+            print(f"[*] pulling '{src_path}' from the device")
+            await run_job(f"pull {src_path}", pull_job, src_path, pc_downloads_path, background=background)
+
+
+        # execute command
+        elif sh_mode:
+            await sh_command(cmd)
         else:
-            print("[-] pull of path failed")
+            await adb_send_cmd_async(cmd)
 
 
-    # execute command
-    else:
-        adb_send_cmd(cmd)
+    # stop the running jobs and the device monitor
+    if jobs.cancel_all():
+        print("[*] cancelling the running jobs")
+        await asyncio.wait([job.task for job in jobs.running()], timeout=5)
+    monitor_task.cancel()
+    catalog_task.cancel()
+    signal.signal(signal.SIGINT, previous_sigint)
+
+
+async def batch_main(args) -> int:
+    """Run the commands of a script without prompting, return the exit code"""
+
+    if not os.path.exists(conf_path):
+        print("[-] no device configured, run adb_term.py once to pair a device")
+        return 2
+    load_conf()
+    get_telemetry().set_sink(conf.get("stats_spans_path"))
+
+    # check all the commands before running anything
+    try:
+        steps = read_script(args.batch)
+    except OSError as e:
+        print(f"[-] cannot read {args.batch} ({e})")
+        return 2
+    runner = BatchRunner(find_apk, conf, device_downloads_dir, pc_downloads_dir, args.on_error, args.prefetch, apk_catalog)
+    errors = runner.check(steps)
+    for error in errors:
+        print(f"[-] {error}")
+    if errors:
+        return 2
+
+    # connect the device of the conf (no questions)
+    if not check_conn() and not (conf["port"] is not None and await exec_cmd_async(["adb", "connect", f"{conf['ip']}:{conf['port']}"]) and check_conn()):
+        print(f"[-] device {conf['ip']} is not connected")
+        return 1
+    await asyncio.to_thread(adb_refresh_device_cache)
+    await asyncio.to_thread(apk_catalog.refresh)
+
+    # run the steps (ctrl-c cancels the running step)
+    previous_sigint = signal.signal(signal.SIGINT, on_sigint)
+    try:
+        job = jobs.start("batch", runner.run, steps)
+        completed, summary = await run_foreground(jobs.wait(job))
+        if not completed:
+            jobs.cancel(job.id)
+            print("\r[!] batch cancelled")
+            summary = await jobs.wait(job)
+    finally:
+        signal.signal(signal.SIGINT, previous_sigint)
+
+    if summary is None: # unexpected error of the runner
+        print(f"[-] batch failed ({job.error})")
+        return 1
+    print_batch_summary(summary)
+    if args.summary:
+        write_batch_summary(summary, args.summary, summary_output)
+    return 0 if summary["ok"] == len(steps) else 1
+
+
+# command line (no args : interactive terminal)
+parser = argparse.ArgumentParser(description="adb terminal : install apks, transfer files and type commands on an adb device")
+parser.add_argument("--batch", metavar="FILE", help="run the commands of a script without prompting ('-' for stdin)")
+parser.add_argument("--on-error", choices=[ON_ERROR_STOP, ON_ERROR_CONTINUE], default=ON_ERROR_STOP, help="stop the batch or continue after a failed command")
+parser.add_argument("--summary", metavar="PATH", help="write the batch summary as json ('-' for stdout, the progress is then printed on stderr)")
+parser.add_argument("--log-json", action="store_true", help="write the log as json lines (command, duration, exit code, bytes)")
+parser.add_argument("--log-level", default="DEBUG", choices=["DEBUG", "INFO", "WARNING", "ERROR"], help="minimum level of the logged records")
+parser.add_argument("--prefetch", type=int, default=default_prefetch, help="next batch commands prepared while a command runs (apk lookup, extraction)")
+cli_args = parser.parse_args()
+
+# with --summary - the json summary is the only output on stdout (the progress goes to stderr)
+summary_output = sys.stdout
+if cli_args.batch is not None and cli_args.summary == "-":
+    sys.stdout = sys.stderr
+
+
+# check and load env (for programs default paths)
+if os.path.exists(env_file_path):
+    load_dotenv()
+else:
+    print("Execute the config.py file to configure this tool")
+
+
+# configure logger (rotated, written by a background thread)
+log = configure_logger(log_path, cli_args.log_json, cli_args.log_level)
+
+# check tool dependencies (resolved paths and versions are cached in the .env file)
+tools = check_dependencies_groups(log)
+
+# apks catalog and jobs
+apk_catalog = ApkCatalog(catalog_path, apks_folder_path)
+jobs = JobManager(on_done=on_job_done)
+
+# start adb (or reuse the running server)
+print(f"[*] starting adb")
+start_adb(tools["adb"][1])
+
+# run a script
+if cli_args.batch is not None:
+    exit(asyncio.run(batch_main(cli_args)))
+
+# run the terminal (the prints of the background jobs are displayed above the prompt)
+with patch_stdout():
+    asyncio.run(main())
@@ -0,0 +1,203 @@
+#---------------------------------------------------------------------------------
+# -*- coding: utf-8 -*-
+# Python: 3.12.0
+# Author: Killian Nallet
+# Date: 17/10/2026
+#---------------------------------------------------------------------------------
+
+
+# imports
+import os
+import json
+import sqlite3
+import hashlib
+import zipfile
+import threading
+
+from apk_manifest import ManifestError, read_apk_info, read_bundle_info
+
+
+# define constants
+apk_exts = [".apk", ".apkm", ".xapk"]
+hash_chunk_size = 1024 * 1024
+
+catalog_schema = """
+CREATE TABLE IF NOT EXISTS apks (
+    path TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    stem TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    sha256 TEXT NOT NULL,
+    package TEXT,
+    version_code INTEGER,
+    splits TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS apks_name ON apks (name);
+CREATE INDEX IF NOT EXISTS apks_stem ON apks (stem);
+CREATE INDEX IF NOT EXISTS apks_package ON apks (package);
+"""
+
+
+# define functions
+def file_sha256(path:str) -> str:
+    """Return the sha256 hex digest of a file"""
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        while chunk := file.read(hash_chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _iter_apk_files(root:str):
+    """Yield (path, stat) of each .apk / .apkm / .xapk file under a folder"""
+
+    try:
+        entries = list(os.scandir(root))
+    except OSError:
+        return
+
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            yield from _iter_apk_files(entry.path)
+        elif os.path.splitext(entry.name)[1] in apk_exts:
+            yield entry.path, entry.stat()
+
+
+def _read_entry_metadata(path:str):
+    """Return (package, version_code, splits) of an apk file"""
+
+    try:
+        if path.endswith(".apk"):
+            info, splits = read_apk_info(path), [os.path.basename(path)]
+        else:
+            with zipfile.ZipFile(path, "r") as zip_ref:
+                splits = [name for name in zip_ref.namelist() if name.endswith(".apk")]
+            info = read_bundle_info(path)
+    except (ManifestError, zipfile.BadZipFile, OSError):
+        return None, None, []
+
+    return info.package, info.version_code, splits
+
+
+# define classes
+class ApkCatalog:
+    """Persistent index (sqlite) of the apk files of a folder"""
+
+    def __init__(self, db_path:str, root:str):
+        self.root = root
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock() # one refresh at a time
+
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(catalog_schema)
+
+    def close(self):
+        """Close the catalog database"""
+
+        with self._lock:
+            self.db.close()
+
+    def refresh(self) -> int:
+        """Update the catalog from the files changes (size / mtime), return the number of updated entries"""
+
+        with self._refresh_lock:
+            return self._refresh()
+
+    def _refresh(self) -> int:
+        with self._lock:
+            known = {row["path"]: (row["size"], row["mtime"]) for row in self.db.execute("SELECT path, size, mtime FROM apks")}
+
+        seen, updated = set(), 0
+        for path, file_stat in _iter_apk_files(self.root):
+            seen.add(path)
+            if known.get(path) == (file_stat.st_size, file_stat.st_mtime):
+                continue # unchanged
+
+            # new or changed file : hash and read its metadata
+            package, version_code, splits = _read_entry_metadata(path)
+            name = os.path.basename(path)
+            row = (
+                path, name, os.path.splitext(name)[0], file_stat.st_size, file_stat.st_mtime,
+                file_sha256(path), package, version_code, json.dumps(splits)
+            )
+            with self._lock:
+                self.db.execute("INSERT OR REPLACE INTO apks VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", row)
+            updated += 1
+
+        # removed files
+        removed = [(path,) for path in known if path not in seen]
+        with self._lock:
+            self.db.executemany("DELETE FROM apks WHERE path = ?", removed)
+            self.db.commit()
+
+        return updated + len(removed)
+
+    def _query(self, sql:str, args:tuple) -> list:
+        with self._lock:
+            return [self._to_entry(row) for row in self.db.execute(sql, args)]
+
+    @staticmethod
+    def _to_entry(row) -> dict:
+        entry = dict(row)
+        entry["splits"] = json.loads(entry["splits"])
+        return entry
+
+    def find(self, query:str) -> list:
+        """Find entries by file name, name without extension, package id or prefix (best matches first)"""
+
+        order = " ORDER BY version_code DESC, mtime DESC"
+        for sql, args in (
+            ("SELECT * FROM apks WHERE name = ?", (query,)),
+            ("SELECT * FROM apks WHERE stem = ?", (query,)),
+            ("SELECT * FROM apks WHERE package = ?", (query,)),
+        ):
+            entries = self._query(sql + order, args)
+            if entries != []:
+                return entries
+
+        # prefix search (indexed range on name and package)
+        upper = query + "\uffff"
+        return self._query(
+            "SELECT * FROM apks WHERE (name >= ? AND name < ?) OR (package >= ? AND package < ?)" + order,
+            (query, upper, query, upper)
+        )
+
+    def get(self, path:str):
+        """Return the entry of a path (None if it is not in the catalog)"""
+
+        entries = self._query("SELECT * FROM apks WHERE path = ?", (path,))
+        return entries[0] if entries else None
+
+    def file_hash(self, path:str):
+        """Return the sha256 of an indexed file (None if it is not in the catalog or has changed since)"""
+
+        entry = self.get(path)
+        try:
+            file_stat = os.stat(path)
+        except OSError:
+            return None
+        if entry is None or (file_stat.st_size, file_stat.st_mtime) != (entry["size"], entry["mtime"]):
+            return None
+        return entry["sha256"]
+
+    def lookup(self, query:str) -> list:
+        """Find entries, refresh the catalog first if nothing is found or a found file has changed"""
+
+        entries = self.find(query)
+        for entry in entries:
+            try:
+                file_stat = os.stat(entry["path"])
+                if (file_stat.st_size, file_stat.st_mtime) != (entry["size"], entry["mtime"]):
+                    break
+            except OSError:
+                break
+        else:
+            if entries != []:
+                return entries
+
+        self.refresh()
+        return self.find(query)
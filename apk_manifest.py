@@ -0,0 +1,227 @@
+#---------------------------------------------------------------------------------
+# -*- coding: utf-8 -*-
+# Python: 3.12.0
+# Author: Killian Nallet
+# Date: 17/10/2026
+#---------------------------------------------------------------------------------
+
+
+# imports
+import io
+import struct
+import zipfile
+from dataclasses import dataclass, field
+
+from split_select import abis, split_qualifier
+from telemetry import timed
+
+
+# define constants
+RES_STRING_POOL_TYPE = 0x0001
+RES_XML_TYPE = 0x0003
+RES_XML_START_ELEMENT_TYPE = 0x0102
+RES_XML_RESOURCE_MAP_TYPE = 0x0180
+
+UTF8_FLAG = 0x100
+NO_INDEX = 0xFFFFFFFF
+
+TYPE_REFERENCE = 0x01
+TYPE_STRING = 0x03
+TYPE_INT_BOOLEAN = 0x12
+
+abi_dir_names = {"arm64_v8a": "arm64-v8a", "armeabi_v7a": "armeabi-v7a"} # split qualifier -> lib/<abi> folder
+
+# android:* attributes ids (obfuscated apks can have empty attribute names)
+android_attrs_ids = {
+    0x01010003: "name",
+    0x0101020c: "minSdkVersion",
+    0x0101021b: "versionCode",
+    0x0101021c: "versionName",
+    0x0101028e: "required",
+    0x01010270: "targetSdkVersion",
+}
+
+
+# define classes
+class ManifestError(Exception):
+    """The binary AndroidManifest.xml cannot be decoded"""
+
+    pass
+
+
+@dataclass
+class ApkInfo:
+    """Metadata of an .apk file (read from its binary AndroidManifest.xml)"""
+
+    package: str = None
+    version_code: int = None
+    version_name: str = None
+    min_sdk: int = None
+    target_sdk: int = None
+    split: str = None # None for a base apk
+    native_abis: list = field(default_factory=list)
+    features: list = field(default_factory=list) # required features only
+
+
+# define functions
+def _read_string_pool(data:bytes, offset:int) -> list:
+    """Decode a string pool chunk"""
+
+    header_size, = struct.unpack_from("<H", data, offset + 2)
+    string_count, _, flags, strings_start = struct.unpack_from("<IIII", data, offset + 8)
+    is_utf8 = flags & UTF8_FLAG
+
+    strings = []
+    for index in range(string_count):
+        pos = offset + strings_start + struct.unpack_from("<I", data, offset + header_size + index * 4)[0]
+
+        if is_utf8:
+            # skip the length in chars, read the length in bytes (1 or 2 bytes each)
+            pos += 2 if data[pos] & 0x80 else 1
+            length = data[pos]
+            if length & 0x80:
+                length = ((length & 0x7F) << 8) | data[pos + 1]
+                pos += 1
+            pos += 1
+            strings.append(data[pos:pos + length].decode("utf-8", errors="replace"))
+
+        else:
+            length, = struct.unpack_from("<H", data, pos)
+            pos += 2
+            if length & 0x8000:
+                length = ((length & 0x7FFF) << 16) | struct.unpack_from("<H", data, pos)[0]
+                pos += 2
+            strings.append(data[pos:pos + length * 2].decode("utf-16-le", errors="replace"))
+
+    return strings
+
+
+def iter_manifest_elements(data:bytes):
+    """Yield (tag, attributes dict) for each element of a binary xml file"""
+
+    if len(data) < 8 or struct.unpack_from("<H", data, 0)[0] != RES_XML_TYPE:
+        raise ManifestError("not a binary xml file")
+
+    strings, resource_ids = [], []
+    offset = struct.unpack_from("<H", data, 2)[0]
+
+    while offset + 8 <= len(data):
+        chunk_type, header_size, chunk_size = struct.unpack_from("<HHI", data, offset)
+        if chunk_size < 8:
+            raise ManifestError(f"invalid chunk size at {offset}")
+
+        if chunk_type == RES_STRING_POOL_TYPE:
+            strings = _read_string_pool(data, offset)
+
+        elif chunk_type == RES_XML_RESOURCE_MAP_TYPE:
+            count = (chunk_size - header_size) // 4
+            resource_ids = list(struct.unpack_from(f"<{count}I", data, offset + header_size))
+
+        elif chunk_type == RES_XML_START_ELEMENT_TYPE:
+            ext = offset + header_size
+            _, name_index, attr_start, attr_size, attr_count = struct.unpack_from("<IIHHH", data, ext)
+
+            attributes = {}
+            for index in range(attr_count):
+                attr = ext + attr_start + index * attr_size
+                _, attr_name, raw_value, _, data_type, value = struct.unpack_from("<IIIHxBI", data, attr)
+
+                # attribute name (from the resource id if it is a known android attribute)
+                if attr_name < len(resource_ids) and resource_ids[attr_name] in android_attrs_ids:
+                    name = android_attrs_ids[resource_ids[attr_name]]
+                else:
+                    name = strings[attr_name] if attr_name < len(strings) else ""
+
+                # attribute value
+                if raw_value != NO_INDEX:
+                    attributes[name] = strings[raw_value]
+                elif data_type == TYPE_STRING:
+                    attributes[name] = strings[value]
+                elif data_type == TYPE_INT_BOOLEAN:
+                    attributes[name] = value != 0
+                elif data_type == TYPE_REFERENCE:
+                    attributes[name] = None # resource reference, not resolved
+                else:
+                    attributes[name] = value
+
+            yield strings[name_index], attributes
+
+        offset += chunk_size
+
+
+def _to_int(value):
+    """Convert a manifest value to int (None if it is not a number)"""
+
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+@timed("parse.manifest")
+def parse_manifest(data:bytes) -> ApkInfo:
+    """Build an ApkInfo from a binary AndroidManifest.xml"""
+
+    info = ApkInfo()
+
+    for tag, attributes in iter_manifest_elements(data):
+        if tag == "manifest":
+            info.package = attributes.get("package")
+            info.version_code = _to_int(attributes.get("versionCode"))
+            version_name = attributes.get("versionName")
+            info.version_name = None if version_name is None else str(version_name)
+            info.split = attributes.get("split")
+
+        elif tag == "uses-sdk":
+            info.min_sdk = _to_int(attributes.get("minSdkVersion"))
+            info.target_sdk = _to_int(attributes.get("targetSdkVersion"))
+
+        elif tag == "uses-feature":
+            if attributes.get("name") and attributes.get("required", True):
+                info.features.append(attributes["name"])
+
+        elif tag == "application":
+            break # nothing more to read in the manifest
+
+    return info
+
+
+def read_apk_info(apk) -> ApkInfo:
+    """Read the metadata of an .apk file (path or seekable file object)"""
+
+    try:
+        with zipfile.ZipFile(apk, "r") as zip_ref:
+            info = parse_manifest(zip_ref.read("AndroidManifest.xml"))
+
+            # native libs : lib/<abi>/*.so
+            info.native_abis = sorted({
+                name.split("/")[1] for name in zip_ref.namelist()
+                if name.startswith("lib/") and name.count("/") >= 2
+            })
+    except (KeyError, zipfile.BadZipFile, struct.error, IndexError) as e:
+        raise ManifestError(f"cannot read AndroidManifest.xml ({e})")
+
+    return info
+
+
+@timed("parse.bundle")
+def read_bundle_info(bundle_path:str) -> ApkInfo:
+    """Read the metadata of the base .apk of an .apkm / .xapk file"""
+
+    with zipfile.ZipFile(bundle_path, "r") as zip_ref:
+        splits = [name for name in zip_ref.namelist() if name.endswith(".apk")]
+
+        # the base apk is usually named base.apk or <package>.apk
+        splits.sort(key=lambda name: (name.rsplit("/", 1)[-1] != "base.apk", "config." in name, name))
+        for split in splits:
+            with zip_ref.open(split) as split_file:
+                # splits are usually stored : seek is cheap, else load the split in memory
+                apk = split_file if split_file.seekable() else io.BytesIO(split_file.read())
+                info = read_apk_info(apk)
+            if info.split is None:
+                # the native libs of a split bundle are in its config.<abi> splits
+                split_abis = {abi_dir_names.get(qualifier, qualifier) for qualifier in map(split_qualifier, splits) if qualifier in abis}
+                info.native_abis = sorted(set(info.native_abis) | split_abis)
+                return info
+
+    raise ManifestError(f"no base .apk in {bundle_path}")
@@ -0,0 +1,371 @@
+#---------------------------------------------------------------------------------
+# -*- coding: utf-8 -*-
+# Python: 3.12.0
+# Author: Killian Nallet
+# Date: 17/10/2026
+#---------------------------------------------------------------------------------
+
+
+# imports
+import os
+import sys
+import json
+import time
+import shlex
+import contextvars
+from dataclasses import dataclass, asdict
+from concurrent.futures import ThreadPoolExecutor
+
+from adb_client import JobCancelled, check_cancelled
+from adb_functions import (
+    adb_disable_dev_opts, adb_pull_path, adb_push_path, adb_send_cmd, adb_send_key, adb_send_keys, adb_shell_stream, device_serial, use_compression
+)
+from adb_sync import plan_sync, print_sync_plan, run_sync
+from bulk_install import PACKAGE_CANCELLED, PACKAGE_FAILED, PACKAGE_MISSING, bulk_install, default_install_workers, print_bulk_summary
+from fleet import FLEET_OK, default_fleet_workers, fleet_install, fleet_push, install_prepared, prepare_bundle, print_fleet_results, release_prepared
+from keyevents import KeyMap
+from macros import MacroError, compile_macro
+from transfer import default_transfer_streams
+
+
+# define constants
+default_prefetch = 1 # next steps prepared while a step runs
+
+ON_ERROR_STOP = "stop"
+ON_ERROR_CONTINUE = "continue"
+
+STEP_OK = "ok"
+STEP_FAILED = "failed"
+STEP_CANCELLED = "cancelled"
+STEP_SKIPPED = "skipped"
+
+
+# define classes
+class BatchError(Exception):
+    """A batch command is invalid or has failed"""
+
+    pass
+
+
+@dataclass
+class Step:
+    """A command of a batch script"""
+
+    line: int
+    command: str
+    status: str = STEP_SKIPPED
+    seconds: float = 0.0
+    error: str = None
+
+
+class BatchRunner:
+    """Run the commands of a script without prompting (the local work of the next steps is done while a step runs)"""
+
+    # script commands (the questions of the terminal are replaced by arguments) :
+    #   .install [@group] <apk> [--downgrade]        already installed apps are updated (data kept)
+    #   .install-all <folder|manifest> [--downgrade]  up to date apps are skipped
+    #   .push [@group] <path> [device dir]
+    #   .pull <device path> [pc dir]
+    #   .sync <local dir> <device dir> [--delete] [--dry-run] [--hash]
+    #   .keys <key sequence>                          KeyMap names, key*N, key+key, sleep:s, @macro
+    #   .sh <command>                                 output displayed, fails on a non zero exit code
+    #   .on_screen | .off_screen | .dev-off
+    #   other lines are typed in the device terminal, '#' starts a comment
+
+    def __init__(self, find_apk, conf:dict, device_dir:str, pc_dir:str, on_error:str=ON_ERROR_STOP, prefetch:int=default_prefetch, catalog=None):
+        self.find_apk = find_apk # function(name) -> (apk path or None, apk file name)
+        self.catalog = catalog # ApkCatalog (versions and hashes of the indexed apks)
+        self.conf = conf
+        self.device_dir = device_dir
+        self.pc_dir = pc_dir
+        self.on_error = on_error
+        self.prefetch = prefetch
+
+        # command -> (prepare function or None, run function) ; prepare(args) runs ahead, run(args, prepared)
+        self.commands = {
+            ".install": (self._prepare_install, self._install),
+            ".install-all": (None, self._install_all),
+            ".push": (None, self._push),
+            ".pull": (None, self._pull),
+            ".sync": (None, self._sync),
+            ".sh": (None, self._sh),
+            ".keys": (None, self._keys),
+            ".on_screen": (None, lambda args, _: self._check(adb_send_key(KeyMap.power), "send key failed")),
+            ".off_screen": (None, lambda args, _: self._check(adb_send_key(KeyMap.endcall), "send key failed")),
+            ".dev-off": (None, lambda args, _: self._check(adb_disable_dev_opts(), "disable dev options failed")),
+        }
+
+    # commands
+    def parse(self, step:Step):
+        """Return the (prepare, run, args) of a step, raise BatchError if the command is invalid"""
+
+        if not step.command.startswith("."):
+            return None, self._send_cmd, [step.command]
+        if step.command.startswith(".sh "): # the command is kept as written
+            return None, self._sh, [step.command[len(".sh "):].strip()]
+        if step.command.startswith(".keys "): # checked before running anything
+            sequence = step.command[len(".keys "):].strip()
+            try:
+                compile_macro(sequence, self.conf.get("macros", {}))
+            except MacroError as e:
+                raise BatchError(str(e))
+            return None, self._keys, [sequence]
+
+        try:
+            name, *args = shlex.split(step.command)
+        except ValueError as e:
+            raise BatchError(str(e))
+        if name not in self.commands:
+            raise BatchError(f"unknown command {name}")
+
+        usages = {
+            ".install": (1, 3, ".install [@group] <apk> [--downgrade]"),
+            ".install-all": (1, 2, ".install-all <folder|manifest> [--downgrade]"),
+            ".push": (1, 3, ".push [@group] <path> [device dir]"),
+            ".pull": (1, 2, ".pull <device path> [pc dir]"),
+            ".sync": (2, 5, ".sync <local dir> <device dir> [--delete] [--dry-run] [--hash]"),
+            ".sh": (1, 1, ".sh <command>"),
+            ".keys": (1, 1, ".keys <key sequence>"),
+        }
+        min_args, max_args, usage = usages.get(name, (0, 0, name))
+        if not min_args <= len(args) <= max_args or (name in (".install", ".install-all") and not {arg for arg in args if arg.startswith("--")} <= {"--downgrade"}):
+            raise BatchError(f"usage: {usage}")
+
+        prepare, run = self.commands[name]
+        return prepare, run, args
+
+    def _check(self, success:bool, message:str):
+        if not success:
+            raise BatchError(message)
+
+    def _group(self, args:list):
+        """Pop the @group argument, return its serials (None without group)"""
+
+        if not args or not args[0].startswith("@"):
+            return None
+        name = args.pop(0)[1:]
+        serials = self.conf.get("groups", {}).get(name, [])
+        if serials == []:
+            raise BatchError(f"group '{name}' is empty or don't exists")
+        return serials
+
+    def _check_fleet(self, results:dict):
+        print_fleet_results(results)
+        failed = [serial for serial, (code, _) in results.items() if code != FLEET_OK]
+        if failed:
+            raise BatchError(f"failed on {', '.join(failed)}")
+
+    def _send_cmd(self, args:list, _):
+        self._check(adb_send_cmd(args[0]), "send command failed")
+
+    def _keys(self, args:list, _):
+        self._check(adb_send_keys(args[0]), "send keys failed")
+
+    def _sh(self, args:list, _):
+        sys.stdout.flush()
+        returncode = adb_shell_stream(args[0]).run(lambda data: _write_output(sys.stdout, data), lambda data: _write_output(sys.stderr, data))
+        if returncode != 0:
+            raise BatchError(f"exit code {returncode}")
+
+    def _prepare_install(self, args:list):
+        """Find the apk and extract its compressed splits (done while the previous step runs)"""
+
+        options = [arg for arg in args if arg.startswith("--")]
+        names = [arg for arg in args if not arg.startswith("--") and not arg.startswith("@")]
+        if options not in ([], ["--downgrade"]) or len(names) != 1:
+            raise BatchError("usage: .install [@group] <apk> [--downgrade]")
+
+        apk_path, apk_filename = self.find_apk(names[0])
+        if apk_path is None:
+            raise BatchError(f"apk '{apk_filename}' not found")
+        sha256 = self.catalog.file_hash(apk_path) if self.catalog is not None else None
+        return apk_path, apk_filename, sha256, prepare_bundle(apk_path, sha256)
+
+    def _release_install(self, prepared):
+        release_prepared(prepared[3])
+
+    def _install(self, args:list, prepared):
+        apk_path, apk_filename, sha256, apk_files = prepared
+        allow_downgrade = "--downgrade" in args
+        try:
+            serials = self._group(args)
+            if serials is not None:
+                print(f"[*] installing '{apk_filename}' on {len(serials)} devices")
+                self._check_fleet(fleet_install(
+                    serials, apk_path, None, True, allow_downgrade, workers=self.conf.get("fleet_workers", default_fleet_workers), sha256=sha256
+                ))
+                return
+
+            install_start = time.time()
+            result = install_prepared(apk_path, apk_files, True, allow_downgrade)
+        finally:
+            self._release_install(prepared)
+
+        if result.returncode != 0:
+            err = result.stderr.strip().replace("\n", " ")
+            raise BatchError(f"install apk failed ({err})")
+        print(f"[+] apk '{apk_filename}' installed in {time.time()-install_start:.1f}s")
+
+    def _install_all(self, args:list, _):
+        paths = [arg for arg in args if not arg.startswith("--")]
+        if len(paths) != 1:
+            raise BatchError("usage: .install-all <folder|manifest> [--downgrade]")
+        if not os.path.exists(paths[0]):
+            raise BatchError(f"the path {paths[0]} don't exists")
+
+        summary = bulk_install(paths[0], self.find_apk, self.catalog, self.conf.get("install_workers", default_install_workers), allow_downgrade="--downgrade" in args)
+        print_bulk_summary(summary)
+        if summary[PACKAGE_CANCELLED]:
+            raise JobCancelled()
+        failed = summary[PACKAGE_FAILED] + summary[PACKAGE_MISSING]
+        if failed:
+            raise BatchError(f"{failed} packages not installed")
+
+    def _push(self, args:list, _):
+        serials = self._group(args)
+        if not args:
+            raise BatchError("usage: .push [@group] <path> [device dir]")
+        src_path = args[0]
+        if not os.path.exists(src_path):
+            raise BatchError(f"the path {src_path} don't exists")
+        trg_path = os.path.join(args[1] if len(args) > 1 else self.device_dir, os.path.basename(src_path))
+
+        if serials is not None:
+            self._check_fleet(fleet_push(serials, src_path, trg_path, self.conf.get("fleet_workers", default_fleet_workers)))
+        else:
+            self._check(adb_push_path(src_path, trg_path), "push of path failed")
+            print(f"[+] path pushed to \"{trg_path}\"")
+
+    def _pull(self, args:list, _):
+        src_path = args[0] if args[0].startswith("/") else os.path.join(self.device_dir, args[0])
+        pc_dir = args[1] if len(args) > 1 else self.pc_dir
+        os.makedirs(pc_dir, exist_ok=True)
+        trg_path = os.path.join(pc_dir, os.path.basename(src_path))
+
+        self._check(adb_pull_path(src_path, trg_path), "pull of path failed")
+        print(f"[+] path pulled to {trg_path}")
+
+    def _sync(self, args:list, _):
+        options = {arg for arg in args if arg.startswith("--")}
+        paths = [arg for arg in args if not arg.startswith("--")]
+        if len(paths) != 2 or not options <= {"--delete", "--dry-run", "--hash"}:
+            raise BatchError("usage: .sync <local dir> <device dir> [--delete] [--dry-run] [--hash]")
+        if not os.path.isdir(paths[0]):
+            raise BatchError(f"{paths[0]} is not a directory")
+
+        plan = plan_sync(device_serial(), paths[0], paths[1], delete="--delete" in options, use_hash="--hash" in options)
+        print_sync_plan(plan)
+        if "--dry-run" not in options:
+            sent = run_sync(device_serial(), paths[0], paths[1], plan, self.conf.get("transfer_streams", default_transfer_streams), use_compression())
+            print(f"[+] synced ({sent/1e6:.1f} MB sent)")
+
+    # run
+    def check(self, steps:list) -> list:
+        """Return the errors of the invalid commands (checked before running anything)"""
+
+        errors = []
+        for step in steps:
+            try:
+                self.parse(step)
+            except BatchError as e:
+                errors.append(f"line {step.line}: {e}")
+        return errors
+
+    def run(self, steps:list) -> dict:
+        """Run the steps in order (stop or continue after an error), return the summary"""
+
+        batch_start = time.time()
+        parsed = [self.parse(step) for step in steps]
+        prepared = {} # step index -> future of prepare(args)
+        stop = False
+
+        with ThreadPoolExecutor(max_workers=max(1, self.prefetch)) as pool:
+            for index, step in enumerate(steps):
+                if stop:
+                    continue
+
+                # prepare this step and the next ones (local work, overlaps the device work)
+                for ahead in range(index, min(len(steps), index + 1 + self.prefetch)):
+                    prepare, _, args = parsed[ahead]
+                    if prepare is not None and ahead not in prepared:
+                        prepared[ahead] = pool.submit(contextvars.copy_context().run, prepare, list(args))
+
+                print(f"[*] [{step.line}] {step.command}")
+                step_start = time.time()
+                _, run, args = parsed[index]
+                try:
+                    check_cancelled()
+                    run(list(args), prepared.pop(index).result() if index in prepared else None)
+                    step.status = STEP_OK
+                except JobCancelled:
+                    step.status, step.error = STEP_CANCELLED, "cancelled"
+                    stop = True
+                except Exception as e: # any error of a step (or of its prepare, e.g. a corrupted bundle) is a failure of this step
+                    step.status, step.error = STEP_FAILED, str(e) or type(e).__name__
+                    print(f"[-] [{step.line}] {step.error}")
+                    stop = self.on_error == ON_ERROR_STOP
+                step.seconds = round(time.time() - step_start, 3)
+
+            # the steps not run are not prepared (or their prepared files are released)
+            for future in prepared.values():
+                if not future.cancel() and future.exception() is None:
+                    self._release_install(future.result())
+
+        return {
+            "device": device_serial(),
+            "on_error": self.on_error,
+            "seconds": round(time.time() - batch_start, 3),
+            **{status: sum(step.status == status for step in steps) for status in (STEP_OK, STEP_FAILED, STEP_CANCELLED, STEP_SKIPPED)},
+            "steps": [asdict(step) for step in steps],
+        }
+
+
+# define functions
+def _write_output(output, data:bytes):
+    """Write the raw output of a device command as it arrives"""
+
+    output.buffer.write(data)
+    output.buffer.flush()
+
+
+def read_script(path:str) -> list:
+    """Read the steps of a script file ('-' for stdin), the empty lines and comments are ignored"""
+
+    if path == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(path, "r", encoding="utf-8") as file:
+            lines = file.read().splitlines()
+
+    steps = []
+    for number, line in enumerate(lines, 1):
+        command = line.strip()
+        if command == "" or command.startswith("#"):
+            continue
+        if command.startswith(".") and command.endswith(" &"): # the steps always run in order
+            command = command[:-2].strip()
+        steps.append(Step(number, command))
+    return steps
+
+
+def print_batch_summary(summary:dict):
+    """Print the status of each step and the totals"""
+
+    for step in summary["steps"]:
+        print(f"  {step['line']:>4} {step['status']:<10} {step['seconds']:7.1f}s  {step['command']}" + (f" ({step['error']})" if step["error"] else ""))
+    ok = summary[STEP_OK] == len(summary["steps"])
+    print(
+        f"[{'+' if ok else '-'}] {summary[STEP_OK]}/{len(summary['steps'])} steps ok in {summary['seconds']:.1f}s"
+        f" ({summary[STEP_FAILED]} failed, {summary[STEP_CANCELLED]} cancelled, {summary[STEP_SKIPPED]} skipped)"
+    )
+
+
+def write_batch_summary(summary:dict, path:str, output=None):
+    """Write the summary as json ('-' for the output stream, stdout by default)"""
+
+    if path == "-":
+        print(json.dumps(summary, indent=4), file=output or sys.stdout, flush=True)
+        return
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as file:
+        json.dump(summary, file, indent=4)
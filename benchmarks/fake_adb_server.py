@@ -0,0 +1,386 @@
+#---------------------------------------------------------------------------------
+# -*- coding: utf-8 -*-
+# Python: 3.12.0
+# Author: Killian Nallet
+# Date: 17/10/2026
+#---------------------------------------------------------------------------------
+
+
+# imports
+import os
+import time
+import stat
+import random
+import socket
+import struct
+import threading
+import subprocess
+
+
+# define constants
+chunk_size = 64 * 1024
+
+# shell v2 packet ids
+SHELL_ID_STDIN = 0
+SHELL_ID_STDOUT = 1
+SHELL_ID_STDERR = 2
+SHELL_ID_EXIT = 3
+SHELL_ID_CLOSE_STDIN = 4
+
+
+# define classes
+class InjectedFailure(Exception):
+    """Connection dropped on purpose by the fake server"""
+
+    pass
+
+
+class FakeAdbServer:
+    """Local stand-in of the adb server and of its devices (smart-socket, shell v2, exec and sync services)"""
+
+    # the device services run in a sandbox folder : sync paths are relative to root,
+    # shell commands run with sh in root (root/system/bin first in PATH for the fake device tools)
+
+    def __init__(self, root:str, devices:dict=None, latency:float=0.0, bandwidth:float=None, fail_rate:float=0.0, seed:int=None, port:int=0):
+        self.root = root
+        self.devices = dict(devices or {"10.0.0.2:5555": "device"})
+        self.features = ["shell_v2", "cmd", "stat_v2"]
+        self.latency = latency # seconds added to each service answer
+        self.bandwidth = bandwidth # bytes/s of each stream (None = unlimited)
+        self.fail_rate = fail_rate # probability to drop a device service when it is opened
+        self.random = random.Random(seed)
+
+        self._fail_next = 0 # device services to drop
+        self._drop_after = None # bytes before dropping the next stream
+        self._trackers = []
+        self._lock = threading.Lock()
+
+        self.sock = socket.socket()
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind(("127.0.0.1", port))
+        self.sock.listen(64)
+        self.host, self.port = self.sock.getsockname()
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    # control
+    def close(self):
+        """Stop accepting connections and close the track-devices streams"""
+
+        self.sock.close()
+        with self._lock:
+            trackers, self._trackers = self._trackers, []
+        for conn in trackers:
+            self._close(conn)
+
+    def set_state(self, serial:str, state:str=None):
+        """Change the state of a device (None removes it), the trackers receive the new list"""
+
+        with self._lock:
+            if state is None:
+                self.devices.pop(serial, None)
+            else:
+                self.devices[serial] = state
+            trackers = list(self._trackers)
+
+        for conn in trackers:
+            try:
+                self._send_hex(conn, self._device_list())
+            except OSError:
+                pass
+
+    def fail_next(self, count:int=1):
+        """Drop the next device services when they are opened"""
+
+        with self._lock:
+            self._fail_next += count
+
+    def drop_stream_after(self, size:int):
+        """Drop the next exec / sync stream (or shell stream with stdin) after size bytes"""
+
+        with self._lock:
+            self._drop_after = size
+
+    # sockets
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _close(self, conn):
+        try:
+            conn.shutdown(socket.SHUT_RDWR) # wake up the reads blocked in other threads
+        except OSError:
+            pass
+        conn.close()
+
+    def _throttle(self, size:int):
+        if self.bandwidth:
+            time.sleep(size / self.bandwidth)
+
+    def _send(self, conn, data:bytes):
+        for index in range(0, len(data), chunk_size):
+            chunk = data[index:index + chunk_size]
+            self._throttle(len(chunk))
+            conn.sendall(chunk)
+
+    def _recv(self, conn, size:int) -> bytes:
+        data = bytearray()
+        while len(data) < size:
+            chunk = conn.recv(min(chunk_size, size - len(data)))
+            if not chunk:
+                raise EOFError()
+            data += chunk
+        self._throttle(size)
+        return bytes(data)
+
+    def _send_hex(self, conn, payload:bytes):
+        conn.sendall(b"%04x" % len(payload) + payload)
+
+    def _okay(self, conn, payload:bytes=None):
+        if self.latency:
+            time.sleep(self.latency)
+        conn.sendall(b"OKAY" + (b"" if payload is None else b"%04x" % len(payload) + payload))
+
+    def _fail(self, conn, message:str):
+        if self.latency:
+            time.sleep(self.latency)
+        payload = message.encode("utf-8")
+        conn.sendall(b"FAIL" + b"%04x" % len(payload) + payload)
+
+    def _device_list(self) -> bytes:
+        with self._lock:
+            return "".join(f"{serial}\t{state}\n" for serial, state in self.devices.items()).encode("utf-8")
+
+    def _inject_failure(self):
+        """Raise InjectedFailure if the service must be dropped"""
+
+        with self._lock:
+            if self._fail_next > 0:
+                self._fail_next -= 1
+                raise InjectedFailure()
+        if self.fail_rate and self.random.random() < self.fail_rate:
+            raise InjectedFailure()
+
+    def _stream_budget(self):
+        """Return the bytes allowed on the next stream (None = unlimited)"""
+
+        with self._lock:
+            budget, self._drop_after = self._drop_after, None
+        return budget
+
+    # services
+    def _handle(self, conn):
+        serial = None
+        try:
+            while True:
+                service = self._recv(conn, int(self._recv(conn, 4), 16)).decode("utf-8")
+
+                # host services
+                if service == "host:version":
+                    return self._okay(conn, b"0029")
+                if service == "host:devices":
+                    return self._okay(conn, self._device_list())
+                if service.startswith("host-serial:") and service.endswith(":features"):
+                    return self._okay(conn, ",".join(self.features).encode("utf-8"))
+                if service.startswith("host:connect:"):
+                    address = service[len("host:connect:"):]
+                    self.set_state(address, "device")
+                    return self._okay(conn, f"connected to {address}".encode("utf-8"))
+                if service == "host:track-devices":
+                    self._okay(conn)
+                    with self._lock:
+                        self._trackers.append(conn)
+                    self._send_hex(conn, self._device_list())
+                    while conn.recv(1):
+                        pass
+                    return
+                if service.startswith("host:transport:"):
+                    serial = service[len("host:transport:"):]
+                    if self.devices.get(serial) != "device":
+                        return self._fail(conn, f"device '{serial}' not found")
+                    self._okay(conn)
+                    continue
+
+                # device services
+                if serial is None:
+                    return self._fail(conn, f"unknown host service '{service}'")
+                self._inject_failure()
+                if service.startswith("shell,v2"):
+                    self._okay(conn)
+                    return self._shell_v2(conn, service.split(":", 1)[1])
+                if service.startswith(("exec:", "shell:")):
+                    self._okay(conn)
+                    return self._exec(conn, service.split(":", 1)[1])
+                if service == "sync:":
+                    self._okay(conn)
+                    return self._sync(conn)
+                return self._fail(conn, f"unknown device service '{service}'")
+
+        except (EOFError, OSError, ValueError, InjectedFailure):
+            pass
+        finally:
+            with self._lock:
+                if conn in self._trackers:
+                    self._trackers.remove(conn)
+            self._close(conn)
+
+    def _popen(self, command:str) -> subprocess.Popen:
+        env = dict(os.environ, PATH=os.path.join(self.root, "system", "bin") + os.pathsep + os.environ.get("PATH", ""))
+        return subprocess.Popen(
+            ["sh", "-c", command], cwd=self.root, env=env,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+
+    def _exec(self, conn, command:str):
+        """Raw stream : the socket is the stdin / stdout of the command (stderr is dropped)"""
+
+        process = self._popen(command)
+        budget = self._stream_budget()
+
+        client_closed = threading.Event()
+
+        def feed():
+            received = 0
+            try:
+                while chunk := conn.recv(chunk_size):
+                    received += len(chunk)
+                    if budget is not None and received > budget:
+                        process.kill()
+                        self._close(conn)
+                        return
+                    self._throttle(len(chunk))
+                    process.stdin.write(chunk)
+                    process.stdin.flush()
+                # like the real adb server : no half-close, the end of the client stream closes the whole stream
+                client_closed.set()
+            except OSError:
+                pass
+            try:
+                process.stdin.close()
+            except OSError:
+                pass
+
+        threading.Thread(target=feed, daemon=True).start()
+        sent = 0
+        while chunk := process.stdout.read1(chunk_size):
+            if client_closed.is_set(): # the output is lost
+                continue
+            if budget is not None and sent + len(chunk) > budget:
+                process.kill()
+                raise InjectedFailure()
+            self._send(conn, chunk)
+            sent += len(chunk)
+        process.wait()
+
+    def _shell_v2(self, conn, command:str):
+        """Shell v2 stream : stdin / stdout / stderr / exit packets"""
+
+        process = self._popen(command or "sh")
+        send_lock = threading.Lock()
+
+        def send_packet(packet_id:int, data:bytes):
+            with send_lock:
+                self._send(conn, bytes([packet_id]) + struct.pack("<I", len(data)) + data)
+
+        def pump(pipe, packet_id:int):
+            while chunk := pipe.read1(chunk_size):
+                send_packet(packet_id, chunk)
+
+        def feed():
+            budget, received = None, 0
+            try:
+                while True:
+                    header = self._recv(conn, 5)
+                    data = self._recv(conn, struct.unpack("<I", header[1:])[0])
+                    if header[0] == SHELL_ID_STDIN:
+                        # the drop budget is taken by the first shell stream receiving stdin
+                        if received == 0:
+                            budget = self._stream_budget()
+                        received += len(data)
+                        if budget is not None and received > budget:
+                            process.kill()
+                            self._close(conn)
+                            return
+                        self._throttle(len(data))
+                        process.stdin.write(data)
+                        process.stdin.flush()
+                    elif header[0] == SHELL_ID_CLOSE_STDIN:
+                        process.stdin.close()
+            except (EOFError, OSError, ValueError):
+                process.kill() # client gone
+
+        threading.Thread(target=feed, daemon=True).start()
+        pumps = [threading.Thread(target=pump, args=(process.stdout, SHELL_ID_STDOUT)), threading.Thread(target=pump, args=(process.stderr, SHELL_ID_STDERR))]
+        for thread in pumps:
+            thread.start()
+        for thread in pumps:
+            thread.join()
+        send_packet(SHELL_ID_EXIT, bytes([process.wait() & 0xFF]))
+
+    def _path(self, remote_path:str) -> str:
+        return os.path.join(self.root, remote_path.lstrip("/"))
+
+    def _sync(self, conn):
+        """Sync v1 requests (STAT, LIST, SEND, RECV, QUIT)"""
+
+        budget = self._stream_budget()
+        while True:
+            header = self._recv(conn, 8)
+            request, size = header[:4], struct.unpack("<I", header[4:])[0]
+            if request == b"QUIT":
+                return
+            argument = self._recv(conn, size).decode("utf-8")
+            if self.latency:
+                time.sleep(self.latency)
+
+            if request == b"STAT":
+                try:
+                    file_stat = os.stat(self._path(argument))
+                    conn.sendall(b"STAT" + struct.pack("<III", file_stat.st_mode, file_stat.st_size & 0xFFFFFFFF, int(file_stat.st_mtime)))
+                except OSError:
+                    conn.sendall(b"STAT" + struct.pack("<III", 0, 0, 0))
+
+            elif request == b"LIST":
+                path = self._path(argument)
+                for name in (os.listdir(path) if os.path.isdir(path) else []):
+                    entry_stat = os.lstat(os.path.join(path, name))
+                    encoded = name.encode("utf-8")
+                    conn.sendall(b"DENT" + struct.pack("<IIII", entry_stat.st_mode, entry_stat.st_size & 0xFFFFFFFF, int(entry_stat.st_mtime), len(encoded)) + encoded)
+                conn.sendall(b"DONE" + b"\0" * 16)
+
+            elif request == b"SEND":
+                path = self._path(argument.rsplit(",", 1)[0])
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                received = 0
+                with open(path, "wb") as file:
+                    while True:
+                        header = self._recv(conn, 8)
+                        size = struct.unpack("<I", header[4:])[0]
+                        if header[:4] == b"DONE":
+                            break
+                        file.write(self._recv(conn, size))
+                        received += size
+                        if budget is not None and received > budget:
+                            raise InjectedFailure()
+                if size: # mtime of the DONE packet
+                    os.utime(path, (size, size))
+                conn.sendall(b"OKAY" + b"\0" * 4)
+
+            elif request == b"RECV":
+                path = self._path(argument)
+                if not stat.S_ISREG(os.stat(path).st_mode if os.path.exists(path) else 0):
+                    message = f"remote object '{argument}' does not exist".encode("utf-8")
+                    conn.sendall(b"FAIL" + struct.pack("<I", len(message)) + message)
+                    continue
+                sent = 0
+                with open(path, "rb") as file:
+                    while chunk := file.read(chunk_size):
+                        if budget is not None and sent + len(chunk) > budget:
+                            raise InjectedFailure()
+                        self._send(conn, b"DATA" + struct.pack("<I", len(chunk)) + chunk)
+                        sent += len(chunk)
+                conn.sendall(b"DONE" + b"\0" * 4)
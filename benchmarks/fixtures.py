@@ -0,0 +1,237 @@
+#---------------------------------------------------------------------------------
+# -*- coding: utf-8 -*-
+# Python: 3.12.0
+# Author: Killian Nallet
+# Date: 17/10/2026
+#---------------------------------------------------------------------------------
+
+
+# imports
+import os
+import io
+import json
+import stat
+import struct
+import random
+import zipfile
+
+
+# define constants
+
+# fake device tools (installed in <device root>/system/bin)
+device_tools = {
+    "pm": """#!/bin/sh
+case "$1" in install-*) echo "$1" >> pm_sessions.log;; esac # session steps (checked by the tests)
+case "$1" in
+    install-create) echo "Success: created install session [1234]";;
+    install-write) size=$(head -c "$3" | wc -c); [ "$size" -eq "$3" ] && echo "Success: streamed $size bytes" || echo "Failure: short write";;
+    install-commit|install-abandon) echo "Success";;
+    list) if [ "$3" = --show-versioncode ]; then echo "package:com.example.app versionCode:42"; echo "package:com.android.settings versionCode:34"; else echo "package:com.example.app"; echo "package:com.android.settings"; fi;;
+    path) [ "$2" = com.example.app ] && echo "package:/data/app/com.example.app/base.apk";;
+    *) echo "pm $*";;
+esac
+""",
+    "cmd": """#!/bin/sh
+shift
+exec pm "$@"
+""",
+    "getprop": """#!/bin/sh
+case "$1" in
+    ro.product.cpu.abilist) echo "arm64-v8a,armeabi-v7a,armeabi";;
+    ro.build.version.sdk) echo 34;;
+    ro.sf.lcd_density) echo 440;;
+    persist.sys.locale) echo en-US;;
+    *) echo;;
+esac
+""",
+    "wm": """#!/bin/sh
+echo "Physical density: 440"
+""",
+    "input": """#!/bin/sh
+exit 0
+""",
+}
+
+# fake adb program (exec_cmd benchmarks), FAKE_ADB_ROOT is the device root, FAKE_ADB_DEVICES the devices list
+adb_program = """#!/bin/sh
+case "$1" in
+    devices) echo "List of devices attached"; cat "$FAKE_ADB_DEVICES"; echo;;
+    -s) shift 2; [ "$1" = shell ] && shift; cd "$FAKE_ADB_ROOT" && PATH="$FAKE_ADB_ROOT/system/bin:$PATH" sh -c "$*";;
+    *) exit 0;;
+esac
+"""
+
+# android:* attributes of the binary manifests (resource ids)
+manifest_attrs = {
+    "versionCode": 0x0101021b,
+    "versionName": 0x0101021c,
+    "minSdkVersion": 0x0101020c,
+    "targetSdkVersion": 0x01010270,
+    "name": 0x01010003,
+    "required": 0x0101028e,
+}
+android_ns = "http://schemas.android.com/apk/res/android"
+
+bundle_splits = [
+    # (split name, size, stored) ; the abi / density / language splits are selected by the device spec
+    ("base.apk", 6, False),
+    ("split_config.arm64_v8a.apk", 4, True),
+    ("split_config.armeabi_v7a.apk", 4, True),
+    ("split_config.x86_64.apk", 4, True),
+    ("split_config.xxhdpi.apk", 1, True),
+    ("split_config.mdpi.apk", 1, True),
+    ("split_config.en.apk", 0.25, True),
+    ("split_config.fr.apk", 0.25, True),
+]
+
+
+# define functions
+def _write_script(path:str, content:str):
+    """Write an executable shell script"""
+
+    with open(path, "w", newline="\n") as file:
+        file.write(content)
+    os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+
+
+def make_device_root(root:str) -> str:
+    """Create the sandbox folder of the fake device, return it"""
+
+    bin_dir = os.path.join(root, "system", "bin")
+    os.makedirs(bin_dir, exist_ok=True)
+    for name, content in device_tools.items():
+        _write_script(os.path.join(bin_dir, name), content)
+    return root
+
+
+def make_adb_program(bin_dir:str, device_root:str, devices:dict) -> str:
+    """Create the fake adb program, return the environment variables it needs"""
+
+    os.makedirs(bin_dir, exist_ok=True)
+    _write_script(os.path.join(bin_dir, "adb"), adb_program)
+
+    devices_path = os.path.join(bin_dir, "devices.txt")
+    with open(devices_path, "w") as file:
+        file.writelines(f"{serial}\t{state}\n" for serial, state in devices.items())
+
+    return {"FAKE_ADB_ROOT": device_root, "FAKE_ADB_DEVICES": devices_path}
+
+
+def _string_pool(strings:list, utf8=False) -> bytes:
+    """Return a string pool chunk"""
+
+    offsets, data = [], bytearray()
+    for string in strings:
+        offsets.append(len(data))
+        if utf8:
+            encoded = string.encode("utf-8")
+            data += bytes([len(string), len(encoded)]) + encoded + b"\x00"
+        else:
+            data += struct.pack("<H", len(string)) + string.encode("utf-16-le") + b"\x00\x00"
+    data += b"\x00" * (-len(data) % 4)
+
+    header_size = 28
+    strings_start = header_size + 4 * len(strings)
+    header = struct.pack("<HHIIIIII", 0x0001, header_size, strings_start + len(data), len(strings), 0, 0x100 if utf8 else 0, strings_start, 0)
+    return header + struct.pack(f"<{len(strings)}I", *offsets) + bytes(data)
+
+
+def make_manifest(package:str, version_code:int, split:str=None, min_sdk:int=21, target_sdk:int=34, features:dict=None, utf8=False) -> bytes:
+    """Return a binary AndroidManifest.xml (aapt2 layout : the android attributes names first, mapped to their resource ids)"""
+
+    # elements : (tag, [(android namespace, name, string value or None, int value)])
+    elements = [
+        ("manifest", [
+            (True, "versionCode", None, version_code),
+            (True, "versionName", f"{version_code}.0", None),
+            (False, "package", package, None),
+        ] + ([(False, "split", split, None)] if split is not None else [])),
+        ("uses-sdk", [(True, "minSdkVersion", None, min_sdk), (True, "targetSdkVersion", None, target_sdk)]),
+    ]
+    for name, required in (features or {}).items(): # feature name -> required
+        elements.append(("uses-feature", [(True, "name", name, None), (True, "required", None, bool(required))]))
+    elements.append(("application", []))
+
+    # string pool : attributes with a resource id, then the other strings
+    strings = list(manifest_attrs) + ["android", android_ns]
+    for tag, attributes in elements:
+        for _, name, value, _ in attributes:
+            strings += [string for string in (name, value) if string is not None and string not in strings]
+        if tag not in strings:
+            strings.append(tag)
+    index = {string: position for position, string in enumerate(strings)}
+
+    chunks = [_string_pool(strings, utf8)]
+    chunks.append(struct.pack("<HHI", 0x0180, 8, 8 + 4 * len(manifest_attrs)) + struct.pack(f"<{len(manifest_attrs)}I", *manifest_attrs.values()))
+    chunks.append(struct.pack("<HHIIIII", 0x0100, 16, 24, 1, 0xFFFFFFFF, index["android"], index[android_ns]))
+
+    for line, (tag, attributes) in enumerate(elements, 2):
+        attrs = bytearray()
+        for is_android, name, value, int_value in attributes:
+            namespace = index[android_ns] if is_android else 0xFFFFFFFF
+            if value is not None: # string
+                attrs += struct.pack("<IIIHBBI", namespace, index[name], index[value], 8, 0, 0x03, index[value])
+            elif isinstance(int_value, bool):
+                attrs += struct.pack("<IIIHBBI", namespace, index[name], 0xFFFFFFFF, 8, 0, 0x12, 0xFFFFFFFF if int_value else 0)
+            else: # decimal int
+                attrs += struct.pack("<IIIHBBI", namespace, index[name], 0xFFFFFFFF, 8, 0, 0x10, int_value)
+        ext = struct.pack("<IIHHHHHH", 0xFFFFFFFF, index[tag], 20, 20, len(attributes), 0, 0, 0)
+        chunks.append(struct.pack("<HHIII", 0x0102, 16, 16 + len(ext) + len(attrs), line, 0xFFFFFFFF) + ext + bytes(attrs))
+    for line, (tag, _) in reversed(list(enumerate(elements, 2))):
+        chunks.append(struct.pack("<HHIIIII", 0x0103, 16, 24, line, 0xFFFFFFFF, 0xFFFFFFFF, index[tag]))
+    chunks.append(struct.pack("<HHIIIII", 0x0101, 16, 24, 1, 0xFFFFFFFF, index["android"], index[android_ns]))
+
+    body = b"".join(chunks)
+    return struct.pack("<HHI", 0x0003, 8, 8 + len(body)) + body
+
+
+def _fake_apk(size:int, rnd:random.Random, manifest:bytes) -> bytes:
+    """Return an .apk file (zip) padded with incompressible data"""
+
+    data = io.BytesIO()
+    with zipfile.ZipFile(data, "w") as apk:
+        apk.writestr("AndroidManifest.xml", manifest)
+        apk.writestr("res/raw/blob", rnd.randbytes(size))
+    return data.getvalue()
+
+
+def make_bundle(path:str, size_mb:float=20, package:str="com.example.app", seed:int=0, version_code:int=42) -> str:
+    """Create an .apkm bundle of about size_mb MB (stored and deflated splits), return its path"""
+
+    rnd = random.Random(seed)
+    unit = size_mb * 1024 * 1024 / sum(size for _, size, _ in bundle_splits)
+
+    with zipfile.ZipFile(path, "w") as bundle:
+        bundle.writestr("info.json", json.dumps({"pname": package, "versioncode": str(version_code)}))
+        for name, size, stored in bundle_splits:
+            split = None if name == "base.apk" else name.removeprefix("split_").removesuffix(".apk")
+            apk = _fake_apk(int(unit * size), rnd, make_manifest(package, version_code, split))
+            bundle.writestr(name, apk, compress_type=zipfile.ZIP_STORED if stored else zipfile.ZIP_DEFLATED)
+    return path
+
+
+def make_tree(root:str, small_files:int=200, small_size:int=16 * 1024, big_files:int=2, big_size:int=8 * 1024 * 1024, seed:int=0) -> int:
+    """Create a folder of small and big random files, return its total size"""
+
+    rnd = random.Random(seed)
+    total = 0
+    for index in range(small_files):
+        folder = os.path.join(root, f"dir{index % 10}")
+        os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, f"small{index}.bin"), "wb") as file:
+            file.write(rnd.randbytes(small_size))
+        total += small_size
+    for index in range(big_files):
+        with open(os.path.join(root, f"big{index}.bin"), "wb") as file:
+            file.write(rnd.randbytes(big_size))
+        total += big_size
+    return total
+
+
+def make_log_file(path:str, size_mb:float=8) -> int:
+    """Create a compressible log file, return its size"""
+
+    line = "2026-10-17 12:00:00.000  1234  5678 I ActivityManager: Start proc com.example.app for activity\n"
+    with open(path, "w") as file:
+        file.write(line * int(size_mb * 1024 * 1024 / len(line)))
+    return os.path.getsize(path)
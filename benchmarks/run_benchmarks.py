@@ -0,0 +1,402 @@
+#---------------------------------------------------------------------------------
+# -*- coding: utf-8 -*-
+# Python: 3.12.0
+# Author: Killian Nallet
+# Date: 17/10/2026
+#---------------------------------------------------------------------------------
+
+
+# imports
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+from contextlib import contextmanager
+
+from fake_adb_server import FakeAdbServer
+from fixtures import make_adb_program, make_bundle, make_device_root, make_log_file, make_tree
+
+
+# define constants
+benchmarks_dir = os.path.dirname(os.path.abspath(__file__))
+repo_dir = os.path.dirname(benchmarks_dir)
+results_dir = os.path.join(benchmarks_dir, "results")
+
+serial = "10.0.0.2:5555"
+device_count = 200 # devices listed by the fake server (get_connected_devices parsing)
+
+
+# define classes
+class BenchContext:
+    """Fake server, work folders and repo modules shared by the benchmarks"""
+
+    def __init__(self, args, work_dir:str):
+        self.args = args
+        self.work_dir = work_dir
+        self.iterations = 10 if args.quick else args.iterations
+        self.size_scale = 0.25 if args.quick else 1.0
+
+        # fake device and adb server
+        self.device_root = make_device_root(os.path.join(work_dir, "device"))
+        devices = {serial: "device", **{f"emulator-{5554 + 2 * index}": "offline" for index in range(device_count - 1)}}
+        self.server = FakeAdbServer(
+            self.device_root, devices, latency=args.latency / 1000, bandwidth=args.bandwidth * 1e6 if args.bandwidth else None,
+            fail_rate=args.fail_rate, seed=0
+        )
+
+        # fake adb program (exec_cmd) and the repo modules, bound to the fake server
+        os.environ.update(make_adb_program(os.path.join(work_dir, "host_bin"), self.device_root, devices))
+        os.environ["PATH"] = os.path.join(work_dir, "host_bin") + os.pathsep + os.environ["PATH"]
+        os.environ["ADB_SERVER_HOST"], os.environ["ADB_SERVER_PORT"] = self.server.host, str(self.server.port)
+        sys.path.insert(0, repo_dir)
+
+        import adb_functions
+        self.adb = adb_functions
+        self.adb.configure_logger(os.path.join(work_dir, "bench.log"))
+
+        # the caches and state files of the fake device stay in the work folder (not in the user data)
+        self.adb.device_cache_path = os.path.join(work_dir, "device_cache.json")
+        self.adb.transfer_state_path = os.path.join(work_dir, "transfers_state.json")
+        self.adb.temp_extract_path = os.path.join(work_dir, "extract")
+        self.adb._device_cache = self.adb._extract_cache = None
+        self.adb.adb_fncts_set_conf({"ip": "10.0.0.2", "port": "5555", "compression": False})
+
+    def path(self, *names:str) -> str:
+        return os.path.join(self.work_dir, *names)
+
+    def close(self):
+        self.adb.get_adb_client().close_shell_session()
+        self.adb.get_adb_client().close_pool()
+        self.server.close()
+
+
+# define functions
+def measure(function, iterations:int, warmup:int=1) -> dict:
+    """Time iterations of a function, return the latency percentiles and the rate"""
+
+    from telemetry import Telemetry
+
+    for _ in range(warmup):
+        function()
+
+    telemetry = Telemetry()
+    for _ in range(iterations):
+        with telemetry.span("bench"):
+            function()
+
+    summary = telemetry.snapshot()["spans"]["bench"]
+    return {
+        "iterations": iterations,
+        "p50_ms": summary["p50_ms"],
+        "p95_ms": summary["p95_ms"],
+        "p99_ms": summary["p99_ms"],
+        "ops_per_s": round(iterations / summary["seconds"], 1) if summary["seconds"] else None,
+    }
+
+
+@contextmanager
+def unreachable_adb_server(ctx:BenchContext):
+    """Point the shared adb client to a closed port (the adb program is used instead)"""
+
+    import adb_client
+
+    client = adb_client.get_adb_client()
+    adb_client._client = adb_client.AdbClient(ctx.server.host, 1)
+    try:
+        yield
+    finally:
+        adb_client._client = client
+
+
+def bench_exec_latency(ctx:BenchContext) -> dict:
+    """Round trip of a shell command : adb program (exec_cmd) and persistent shell session"""
+
+    return {
+        "exec_cmd": measure(lambda: ctx.adb.exec_cmd(["adb", "-s", serial, "shell", "echo", "ok"]), ctx.iterations),
+        "shell_session": measure(lambda: ctx.adb.adb_shell_cmd(["echo", "ok"]), ctx.iterations * 10),
+    }
+
+
+def bench_input_injection(ctx:BenchContext) -> dict:
+    """Rate of the key and text injections"""
+
+    from keyevents import KeyMap
+
+    return {
+        "send_key": measure(lambda: ctx.adb.adb_send_key(KeyMap.dpad_down), ctx.iterations * 10),
+        "send_text": measure(lambda: ctx.adb.adb_send_text("hello world"), ctx.iterations * 10),
+        "send_cmd": measure(lambda: ctx.adb.adb_send_cmd("ls -la"), ctx.iterations * 10),
+    }
+
+
+def bench_connected_devices(ctx:BenchContext) -> dict:
+    """Devices list of the adb server (host:devices) and of the adb program output"""
+
+    assert ctx.adb.get_connected_devices() == [serial]
+    results = {"adb_server": measure(ctx.adb.get_connected_devices, ctx.iterations * 10)}
+    with unreachable_adb_server(ctx):
+        results["adb_program"] = measure(ctx.adb.get_connected_devices, ctx.iterations)
+    results["devices"] = device_count
+    return results
+
+
+def bench_apkm(ctx:BenchContext) -> dict:
+    """Extraction of an .apkm file (cold / cached) and streaming install of its splits"""
+
+    from extract_cache import ExtractCache
+    from telemetry import get_telemetry
+
+    size_mb = 20 * ctx.size_scale
+    bundle_path = make_bundle(ctx.path("app.apkm"), size_mb)
+    cache = ExtractCache(ctx.path("extract_cache"), 10 * 1024**3)
+
+    def extract_cold():
+        cache.clear()
+        cache.get(bundle_path)
+
+    results = {
+        "bundle_mb": round(os.path.getsize(bundle_path) / 1e6, 2),
+        "extract_cold": measure(extract_cold, max(3, ctx.iterations // 3)),
+        "extract_cached": measure(lambda: cache.get(bundle_path), ctx.iterations),
+    }
+    results["extract_cold"]["mb_per_s"] = round(results["bundle_mb"] / (results["extract_cold"]["p50_ms"] / 1000), 1)
+
+    # install : the splits of the device are streamed to pm (install.write spans)
+    get_telemetry().reset()
+    results["install"] = measure(lambda: ctx.adb.adb_install_package(bundle_path, True), max(3, ctx.iterations // 3))
+    write_stats = get_telemetry().snapshot()["spans"].get("install.write", {})
+    results["install"]["streamed_mb_per_s"] = write_stats.get("mb_per_s")
+    results["install"]["streamed_mb"] = round(write_stats.get("bytes", 0) / 1e6 / (results["install"]["iterations"] + 1), 2)
+    return results
+
+
+def bench_transfers(ctx:BenchContext) -> dict:
+    """Throughput of push / pull for a tree of small and big files, and of a compressible log file"""
+
+    from transfer import parallel_pull, parallel_push
+
+    tree_root = ctx.path("tree")
+    make_tree(tree_root, small_files=int(200 * ctx.size_scale), big_files=2, big_size=int(8 * 1024 * 1024 * ctx.size_scale))
+    log_path = ctx.path("app.log")
+    make_log_file(log_path, 8 * ctx.size_scale)
+
+    def transfer_stats(stats) -> dict:
+        seconds = stats.seconds or 1e-9
+        return {
+            "files": stats.files,
+            "mb": round(stats.bytes / 1e6, 2),
+            "seconds": round(stats.seconds, 3),
+            "mb_per_s": round(stats.bytes / 1e6 / seconds, 1),
+            "files_per_s": round(stats.files / seconds, 1),
+            "compression_ratio": round(stats.ratio, 2),
+        }
+
+    results = {}
+    for streams in (1, 4):
+        shutil.rmtree(os.path.join(ctx.device_root, "bench"), ignore_errors=True)
+        results[f"push_tree_{streams}_streams"] = transfer_stats(parallel_push(serial, tree_root, "bench/tree", streams))
+        shutil.rmtree(ctx.path("pulled"), ignore_errors=True)
+        results[f"pull_tree_{streams}_streams"] = transfer_stats(parallel_pull(serial, "bench/tree", ctx.path("pulled"), streams))
+
+    for compress in (False, True):
+        name = "gzip" if compress else "raw"
+        results[f"push_log_{name}"] = transfer_stats(parallel_push(serial, log_path, f"bench/app_{name}.log", 1, compress))
+        results[f"pull_log_{name}"] = transfer_stats(parallel_pull(serial, f"bench/app_{name}.log", ctx.path(f"app_{name}.log"), 1, compress))
+    return results
+
+
+def bench_resumable(ctx:BenchContext) -> dict:
+    """Push of a big file while the fake server drops the stream (failure injection)"""
+
+    import resumable
+
+    src = ctx.path("resumable.bin")
+    with open(src, "wb") as file:
+        file.write(os.urandom(int(16 * 1024 * 1024 * ctx.size_scale)))
+    state = resumable.TransferState(ctx.path("transfers_state.json"))
+
+    results = {}
+    for drops in (0, 2):
+        attempts = []
+
+        def wait_reconnect():
+            attempts.append(time.perf_counter())
+            if len(attempts) < drops:
+                ctx.server.drop_stream_after(1024 * 1024)
+
+        if drops:
+            ctx.server.drop_stream_after(1024 * 1024)
+        start = time.perf_counter()
+        size = resumable.resumable_push(serial, src, f"bench/resumable_{drops}.bin", state, wait_reconnect)
+        seconds = time.perf_counter() - start
+        results[f"drops_{drops}"] = {"retries": len(attempts), "seconds": round(seconds, 3), "mb_per_s": round(size / 1e6 / seconds, 1)}
+    return results
+
+
+def bench_reconnect(ctx:BenchContext) -> dict:
+    """Delay between a device state change and its detection (asyncio tracker task)"""
+
+    from device_tracker import track_devices_async
+    from telemetry import SpanStats
+
+    def detection(start_tracker, stop_tracker) -> dict:
+        events = {}
+        changed = threading.Condition()
+
+        def on_change(changed_serial:str, old_state:str, new_state:str):
+            if changed_serial == serial:
+                with changed:
+                    events[new_state] = time.perf_counter()
+                    changed.notify_all()
+
+        tracker = start_tracker(on_change)
+        with changed:
+            changed.wait_for(lambda: "device" in events, 5)
+
+        stats = SpanStats()
+        for index in range(ctx.iterations):
+            state = "offline" if index % 2 == 0 else "device"
+            with changed:
+                events.pop(state, None)
+            start = time.perf_counter()
+            ctx.server.set_state(serial, state)
+            with changed:
+                changed.wait_for(lambda: state in events, 5)
+            stats.samples.append(events.get(state, start + 5) - start)
+        ctx.server.set_state(serial, "device")
+        stop_tracker(tracker)
+
+        return {"iterations": ctx.iterations, "p50_ms": round(stats.percentile(50) * 1000, 3), "p95_ms": round(stats.percentile(95) * 1000, 3)}
+
+    def start_async(on_change):
+        loop = asyncio.new_event_loop()
+        task = loop.create_task(track_devices_async(on_change))
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+        return loop, task, thread
+
+    def stop_async(tracker):
+        loop, task, thread = tracker
+
+        async def cancel():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        asyncio.run_coroutine_threadsafe(cancel(), loop).result(5)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+    return {
+        "tracker_asyncio": detection(start_async, stop_async),
+    }
+
+
+benchmarks = {
+    "exec_latency": bench_exec_latency,
+    "input_injection": bench_input_injection,
+    "connected_devices": bench_connected_devices,
+    "apkm": bench_apkm,
+    "transfers": bench_transfers,
+    "resumable": bench_resumable,
+    "reconnect": bench_reconnect,
+}
+
+
+def git_commit() -> str:
+    """Return the current commit of the repo (None outside a git repo)"""
+
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=repo_dir, capture_output=True, text=True)
+        return result.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def flatten(results:dict, prefix:str="") -> dict:
+    """Return {'bench.case.metric': value} for the numeric values of the results"""
+
+    values = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            values.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[prefix + key] = value
+    return values
+
+
+def print_comparison(old_results:dict, new_results:dict):
+    """Print the metrics of two results files side by side"""
+
+    old_values, new_values = flatten(old_results["results"]), flatten(new_results["results"])
+    print(f"\n[*] compared with {old_results['meta'].get('commit')} ({old_results['meta'].get('date')})")
+    for name, new_value in new_values.items():
+        old_value = old_values.get(name)
+        if old_value is None:
+            continue
+        change = f"{(new_value - old_value) / old_value * 100:+7.1f}%" if old_value else f"{'':>8}"
+        print(f"  {name:<60} {old_value:>12} -> {new_value:<12} {change}")
+
+
+def main():
+    """Run the benchmarks against the fake adb server and write the results file"""
+
+    parser = argparse.ArgumentParser(description="adb-term benchmarks (local fake adb server, no device needed)")
+    parser.add_argument("benchmarks", nargs="*", help=f"benchmarks to run (default: all) : {', '.join(benchmarks)}")
+    parser.add_argument("--iterations", type=int, default=30, help="iterations of the latency benchmarks")
+    parser.add_argument("--quick", action="store_true", help="few iterations and smaller files")
+    parser.add_argument("--latency", type=float, default=0.0, help="latency added to each fake server answer (ms)")
+    parser.add_argument("--bandwidth", type=float, default=None, help="bandwidth of each fake stream (MB/s)")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="probability to drop a device service")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="previous results file to compare with")
+    args = parser.parse_args()
+    unknown = [name for name in args.benchmarks if name not in benchmarks]
+    if unknown:
+        parser.error(f"unknown benchmarks : {', '.join(unknown)}")
+
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "options": {"iterations": args.iterations, "quick": args.quick, "latency_ms": args.latency, "bandwidth_mb_s": args.bandwidth, "fail_rate": args.fail_rate},
+        },
+        "results": {},
+    }
+
+    work_dir = tempfile.mkdtemp(prefix="adb_term_bench_")
+    ctx = BenchContext(args, work_dir)
+    try:
+        for name in args.benchmarks or benchmarks:
+            print(f"[*] {name}")
+            results["results"][name] = benchmarks[name](ctx)
+            for metric, value in flatten(results["results"][name]).items():
+                print(f"  {metric:<50} {value}")
+    finally:
+        ctx.close()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    # write the results (machine readable, compared between commits)
+    output = args.output or os.path.join(results_dir, f"{results['meta']['commit'] or 'results'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as file:
+        json.dump(results, file, indent=4)
+    print(f"[+] results written to {output}")
+
+    if args.compare:
+        with open(args.compare, "r") as file:
+            print_comparison(json.load(file), results)
+
+
+# main
+if __name__ == "__main__":
+    main()
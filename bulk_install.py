@@ -0,0 +1,245 @@
+#---------------------------------------------------------------------------------
+# -*- coding: utf-8 -*-
+# Python: 3.12.0
+# Author: Killian Nallet
+# Date: 17/10/2026
+#---------------------------------------------------------------------------------
+
+
+# imports
+import os
+import time
+import zipfile
+import threading
+import contextvars
+from dataclasses import dataclass, asdict
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+from adb_client import JobCancelled, check_cancelled
+from adb_functions import ManifestError, adb_device_spec, adb_package_versions, bundle_exts, read_apk_info, read_bundle_info
+from fleet import install_prepared, prepare_bundle, release_prepared
+
+
+# define constants
+apk_exts = [".apk"] + bundle_exts
+default_install_workers = 2 # concurrent pm install sessions
+default_stage_ahead = 2 # packages extracted and checked before their install starts
+min_concurrent_sdk = 21 # install sessions, older devices install one package at a time
+info_workers = 4 # package metadata read in parallel
+
+# per-package status
+PACKAGE_INSTALLED = "installed"
+PACKAGE_UP_TO_DATE = "up-to-date"
+PACKAGE_FAILED = "failed"
+PACKAGE_MISSING = "missing"
+PACKAGE_CANCELLED = "cancelled"
+
+
+# define variables
+_print_lock = threading.Lock()
+
+
+# define classes
+@dataclass
+class BulkPackage:
+    """A package of a bulk install"""
+
+    name: str
+    path: str = None
+    package: str = None
+    version_code: int = None
+    sha256: str = None # from the catalog (the extract cache does not hash the file again)
+    installed: bool = False # already on the device (updated, data kept)
+    device_version: int = None
+    status: str = PACKAGE_CANCELLED
+    size: int = 0
+    stage_seconds: float = 0.0 # extraction and check
+    seconds: float = 0.0 # install
+    error: str = None
+
+
+# define functions
+def bulk_print(message:str):
+    """Print a progress message of a bulk install (from the worker threads)"""
+
+    with _print_lock:
+        print(message)
+
+
+def read_bulk_source(source:str, find_apk) -> list:
+    """Return the packages of a folder (its .apk / .apkm / .xapk files) or of a manifest (one apk path or catalog name per line)"""
+
+    if os.path.isdir(source):
+        names = sorted(name for name in os.listdir(source) if os.path.splitext(name)[1] in apk_exts)
+        return [BulkPackage(name, os.path.join(source, name)) for name in names]
+
+    with open(source, "r", encoding="utf-8") as file:
+        lines = [line.strip() for line in file.read().splitlines()]
+
+    packages = []
+    for line in lines:
+        if line == "" or line.startswith("#"):
+            continue
+
+        # relative paths are read from the manifest folder, other names from the apks catalog
+        local_path = os.path.join(os.path.dirname(source), line)
+        if os.path.isfile(local_path) and os.path.splitext(local_path)[1] in apk_exts:
+            packages.append(BulkPackage(line, local_path))
+        else:
+            apk_path, apk_filename = find_apk(line)
+            packages.append(BulkPackage(apk_filename if apk_path is not None else line, apk_path))
+    return packages
+
+
+def read_package_info(path:str, catalog=None) -> tuple:
+    """Return (package id, version code) of an apk file (from the catalog if it is indexed)"""
+
+    entry = catalog.get(path) if catalog is not None else None
+    if entry is not None and entry["package"] and entry["version_code"] is not None:
+        return entry["package"], entry["version_code"]
+
+    info = read_bundle_info(path) if os.path.splitext(path)[1] in bundle_exts else read_apk_info(path)
+    return info.package, info.version_code
+
+
+def plan_bulk_install(packages:list, catalog=None) -> list:
+    """Read the package versions (local and installed), mark the packages already installed at the same or a newer version, return the ones to install"""
+
+    with ThreadPoolExecutor(max_workers=info_workers) as pool:
+        # the device packages are read while the local files are parsed
+        device_future = pool.submit(contextvars.copy_context().run, adb_package_versions)
+
+        def read_info(package:BulkPackage):
+            if package.path is None:
+                return
+            try:
+                package.size = os.path.getsize(package.path)
+                package.package, package.version_code = read_package_info(package.path, catalog)
+                package.sha256 = catalog.file_hash(package.path) if catalog is not None else None
+            except (ManifestError, zipfile.BadZipFile, OSError) as e:
+                bulk_print(f"[!] cannot read the version of '{package.name}' ({e}), it is installed without check")
+
+        list(pool.map(read_info, packages))
+        device_versions = device_future.result()
+
+    to_install = []
+    for package in packages:
+        if package.path is None:
+            package.status, package.error = PACKAGE_MISSING, "apk not found"
+            continue
+        if package.package in device_versions:
+            package.installed, package.device_version = True, device_versions[package.package]
+            # unknown versions (android < 9) are updated
+            if package.device_version is not None and package.version_code is not None and package.device_version >= package.version_code:
+                package.status = PACKAGE_UP_TO_DATE
+                continue
+        to_install.append(package)
+    return to_install
+
+
+def bulk_install_workers(workers:int=default_install_workers) -> int:
+    """Return the number of concurrent installs the connected device allows"""
+
+    sdk = adb_device_spec().sdk
+    return 1 if sdk is not None and sdk < min_concurrent_sdk else max(1, workers)
+
+
+def _verify_archive(path:str):
+    """Check the central directory of an apk / bundle (the members are read once, by the transfer which fails on a corrupted one)"""
+
+    with zipfile.ZipFile(path, "r") as zip_ref:
+        if not zip_ref.infolist():
+            raise ValueError("empty archive")
+
+
+def run_bulk_install(packages:list, workers:int=default_install_workers, stage_ahead:int=default_stage_ahead, allow_downgrade=False) -> list:
+    """Install packages on the current device : the next packages are staged while the current ones are installed by a bounded pool"""
+
+    # packages staged and not installed yet (bounds the extracted files on disk)
+    slots = threading.Semaphore(workers + stage_ahead)
+    total = len(packages)
+
+    def stage(package:BulkPackage):
+        slots.acquire()
+        check_cancelled()
+        stage_start = time.time()
+        apk_files = prepare_bundle(package.path, package.sha256)
+        if apk_files is None or apk_files == [package.path]: # streamed from the archive
+            _verify_archive(package.path)
+        package.stage_seconds = round(time.time() - stage_start, 3)
+        return apk_files
+
+    def install(index:int, package:BulkPackage, staged):
+        apk_files = None
+        try:
+            apk_files = staged.result()
+            check_cancelled()
+            bulk_print(f"[*] [{index}/{total}] installing '{package.name}'" + (" (update)" if package.installed else ""))
+            install_start = time.time()
+            result = install_prepared(package.path, apk_files, True, allow_downgrade)
+            package.seconds = round(time.time() - install_start, 3)
+            if result.returncode == 0:
+                package.status = PACKAGE_INSTALLED
+                bulk_print(f"[+] [{index}/{total}] '{package.name}' installed in {package.seconds:.1f}s")
+            else:
+                package.status, package.error = PACKAGE_FAILED, result.stderr.strip().replace("\n", " ")
+        except (JobCancelled, CancelledError):
+            package.status, package.error = PACKAGE_CANCELLED, None
+        except Exception as e: # any error of a package (unsupported compression, encrypted member, ...) is a failed row
+            package.status, package.error = PACKAGE_FAILED, str(e) or type(e).__name__
+        finally:
+            release_prepared(apk_files) # the extracted files can be evicted again
+            slots.release()
+        if package.status == PACKAGE_FAILED:
+            bulk_print(f"[-] [{index}/{total}] '{package.name}' failed ({package.error})")
+
+    # one stage worker keeps the install order, the installs run in a copy of the caller context (cancel event of a job)
+    with ThreadPoolExecutor(max_workers=1) as stage_pool, ThreadPoolExecutor(max_workers=max(1, workers)) as install_pool:
+        staged = [stage_pool.submit(contextvars.copy_context().run, stage, package) for package in packages]
+        installs = [
+            install_pool.submit(contextvars.copy_context().run, install, index, package, staged[index - 1])
+            for index, package in enumerate(packages, 1)
+        ]
+        for future in installs:
+            future.result()
+    return packages
+
+
+def bulk_install(source:str, find_apk, catalog=None, workers:int=default_install_workers, stage_ahead:int=default_stage_ahead, allow_downgrade=False) -> dict:
+    """Install the packages of a folder or manifest on the current device (up to date packages are skipped), return the summary"""
+
+    bulk_start = time.time()
+    packages = read_bulk_source(source, find_apk)
+    to_install = plan_bulk_install(packages, catalog)
+    workers = bulk_install_workers(workers) if to_install else workers
+
+    print(f"[*] {len(to_install)}/{len(packages)} packages to install ({workers} concurrent installs)")
+    run_bulk_install(to_install, workers, stage_ahead, allow_downgrade)
+
+    return {
+        "source": source,
+        "seconds": round(time.time() - bulk_start, 3),
+        "bytes": sum(package.size for package in packages if package.status == PACKAGE_INSTALLED),
+        **{status: sum(package.status == status for package in packages) for status in (PACKAGE_INSTALLED, PACKAGE_UP_TO_DATE, PACKAGE_FAILED, PACKAGE_MISSING, PACKAGE_CANCELLED)},
+        "packages": [asdict(package) for package in packages],
+    }
+
+
+def print_bulk_summary(summary:dict):
+    """Print the outcome and timings of each package and the totals"""
+
+    print(f"  {'package':<40} {'version':>12} {'status':<11} {'stage':>7} {'install':>8} {'MB':>8}")
+    for package in summary["packages"]:
+        version = package["version_code"] if package["version_code"] is not None else "?"
+        print(
+            f"  {(package['package'] or package['name'])[:40]:<40} {version:>12} {package['status']:<11} "
+            f"{package['stage_seconds']:6.1f}s {package['seconds']:7.1f}s {package['size']/1e6:8.1f}"
+            + (f" ({package['error']})" if package["error"] else "")
+        )
+
+    ok = summary[PACKAGE_FAILED] == summary[PACKAGE_MISSING] == summary[PACKAGE_CANCELLED] == 0
+    print(
+        f"[{'+' if ok else '-'}] {summary[PACKAGE_INSTALLED]} installed, {summary[PACKAGE_UP_TO_DATE]} up to date, "
+        f"{summary[PACKAGE_FAILED] + summary[PACKAGE_MISSING]} failed in {summary['seconds']:.1f}s "
+        f"({summary['bytes']/1e6:.1f} MB, {summary['bytes']/1e6/max(summary['seconds'], 0.001):.1f} MB/s)"
+    )
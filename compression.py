@@ -0,0 +1,150 @@
+#---------------------------------------------------------------------------------
+# -*- coding: utf-8 -*-
+# Python: 3.12.0
+# Author: Killian Nallet
+# Date: 17/10/2026
+#---------------------------------------------------------------------------------
+
+
+# imports
+import os
+import math
+import stat
+import zlib
+import shlex
+import threading
+from collections import Counter
+
+from adb_client import AdbError, SYNC_DATA_MAX, check_cancelled
+from telemetry import timed
+
+
+# define constants
+min_compress_size = 64 * 1024 # smaller files : the exec stream setup costs more than it saves
+sample_size = 64 * 1024
+max_entropy = 7.5 # bits per byte, above this the data looks already compressed
+max_sample_ratio = 0.9 # compressed / raw size of the sample (repeated patterns with a flat byte histogram)
+compress_level = 6
+gzip_wbits = 31 # zlib wbits for the gzip format
+
+# already compressed formats
+skip_exts = {
+    ".jpg", ".jpeg", ".png", ".gif", ".webp", ".heic", ".avif",
+    ".mp4", ".mkv", ".webm", ".avi", ".mov", ".3gp", ".mp3", ".aac", ".m4a", ".ogg", ".opus", ".flac",
+    ".apk", ".apkm", ".xapk", ".aab", ".jar", ".zip", ".gz", ".tgz", ".xz", ".bz2", ".7z", ".zst", ".br", ".lz4", ".rar",
+}
+
+# formats which are always worth compressing
+text_exts = {
+    ".txt", ".log", ".csv", ".json", ".xml", ".html", ".md", ".sql", ".db", ".sqlite", ".sqlite3", ".db-wal",
+    ".py", ".sh", ".js", ".css", ".conf", ".ini", ".yaml", ".yml", ".tsv", ".trace", ".hprof",
+}
+
+
+# variables
+_gzip_support = {} # serial -> bool
+_gzip_lock = threading.Lock()
+
+
+# define functions
+def entropy(data:bytes) -> float:
+    """Return the shannon entropy of data (bits per byte)"""
+
+    if not data:
+        return 0.0
+    total = len(data)
+    return -sum(count / total * math.log2(count / total) for count in Counter(data).values())
+
+
+def should_compress(name:str, size:int, sample:bytes=None) -> bool:
+    """Choose if a file is compressed on the wire (file type, then entropy of a sample)"""
+
+    ext = os.path.splitext(name)[1].lower()
+    if size < min_compress_size or ext in skip_exts:
+        return False
+    if ext in text_exts or sample is None:
+        return ext in text_exts
+    return entropy(sample) < max_entropy or len(zlib.compress(sample, 1)) < len(sample) * max_sample_ratio
+
+
+def device_has_gzip(client, serial:str) -> bool:
+    """Check once if the device can decompress / compress gzip streams"""
+
+    with _gzip_lock:
+        if serial not in _gzip_support:
+            try:
+                # checked on the output : the legacy shell (fallback of the shell protocol) always returns 0
+                # the compressed push needs shell v2 (end of its stdin)
+                _gzip_support[serial] = "shell_v2" in client.features(serial) and client.shell(serial, "command -v gzip >/dev/null 2>&1 && echo ok").stdout.strip() == "ok"
+            except (OSError, AdbError):
+                return False
+        return _gzip_support[serial]
+
+
+class _GzipReader:
+    """File-like object compressing a file on the fly (gzip format), counts the compressed bytes"""
+
+    def __init__(self, file):
+        self.file = file
+        self.compressor = zlib.compressobj(compress_level, zlib.DEFLATED, gzip_wbits)
+        self.buffer = b""
+        self.eof = False
+        self.wire_bytes = 0
+
+    def read(self, size:int=SYNC_DATA_MAX) -> bytes:
+        while len(self.buffer) < size and not self.eof:
+            data = self.file.read(SYNC_DATA_MAX)
+            if data:
+                self.buffer += self.compressor.compress(data)
+            else:
+                self.buffer += self.compressor.flush()
+                self.eof = True
+
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        self.wire_bytes += len(data)
+        return data
+
+
+@timed("transfer.gzip_push", size=lambda result: result[0])
+def push_compressed(client, serial:str, local_path:str, remote_path:str):
+    """Push a file as a gzip stream decompressed by the device, return (bytes, wire bytes)"""
+
+    file_stat = os.stat(local_path)
+    mode, mtime = stat.S_IMODE(file_stat.st_mode), int(file_stat.st_mtime)
+    target = shlex.quote(remote_path)
+
+    # shell v2 stdin : the end of the stream is sent and the exit code of the whole command is read back
+    with open(local_path, "rb") as file:
+        reader = _GzipReader(file)
+        result = client.shell(
+            serial,
+            f"mkdir -p {shlex.quote(os.path.dirname(remote_path) or '.')} && gzip -d > {target} && chmod {mode:o} {target} && touch -m -d @{mtime} {target}",
+            stdin=reader
+        )
+
+    if result.returncode != 0:
+        raise AdbError(f"compressed push of {remote_path} failed ({(result.stderr or result.stdout).strip() or f'exit code {result.returncode}'})")
+    return file_stat.st_size, reader.wire_bytes
+
+
+@timed("transfer.gzip_pull", size=lambda result: result[0])
+def pull_compressed(client, serial:str, remote_path:str, local_path:str):
+    """Pull a file compressed by the device (gzip stream), return (bytes, wire bytes)"""
+
+    decompressor = zlib.decompressobj(gzip_wbits)
+    size = wire_bytes = 0
+
+    with open(local_path, "wb") as file, client.open_service(serial, f"exec:gzip -c {shlex.quote(remote_path)}") as conn:
+        while chunk := conn.sock.recv(SYNC_DATA_MAX):
+            check_cancelled()
+            wire_bytes += len(chunk)
+            data = decompressor.decompress(chunk)
+            file.write(data)
+            size += len(data)
+        data = decompressor.flush()
+        file.write(data)
+        size += len(data)
+
+    if not decompressor.eof:
+        raise AdbError(f"compressed pull of {remote_path} failed (truncated stream)")
+    return size, wire_bytes
@@ -11,6 +11,7 @@ import os
 import shutil
 import dotenv
 import logging
+import subprocess
 
 
 # define constants
@@ -32,20 +33,70 @@ dependencies_groups = [
         "tools": [
             "aapt", 
         ],
-        "env_key": "BUILDTOOLS_PATH"
+        "env_key": "BUILDTOOLS_PATH",
+        "optional": True # apk metadata are read natively, aapt is only a fallback
     }
 ]
 
 
 # define function
 def _recursive_search_tool(tool:str, search_folder:str):
-    """Recursively search a tool in a folder"""
+    """Recursively search a tool in a folder and return its absolute path (None if not found)"""
 
-    for path, _, _ in os.walk(search_folder):
-        if shutil.which(tool, path=path) != None:
-            return True
+    # most installs have the tool directly in the folder (no walk)
+    tool_path = shutil.which(tool, path=search_folder)
+    if tool_path is not None:
+        return os.path.abspath(tool_path)
 
-    return False
+    for path, _, _ in os.walk(search_folder):
+        tool_path = shutil.which(tool, path=path)
+        if tool_path is not None:
+            return os.path.abspath(tool_path)
+
+    return None
+
+def _tool_version(tool_path:str):
+    """Return the first line of '<tool> version' (empty if it cannot be run)"""
+
+    try:
+        result = subprocess.run([tool_path, "version"], capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return ""
+    lines = (result.stdout or result.stderr).strip().splitlines()
+    return lines[0].strip() if lines else ""
+
+def _cache_key(tool:str, field:str):
+    return f"{tool.upper()}_{field}"
+
+def resolve_tool(tool:str, search_folder:str=None):
+    """Return the absolute path and the version of a tool, cached in the .env file (None if not found)"""
+
+    # the cached path is reused while the binary exists (in the configured folder)
+    cached_path = os.getenv(_cache_key(tool, "BIN"))
+    if cached_path and os.path.isfile(cached_path) and (search_folder is None or cached_path.startswith(os.path.abspath(search_folder))):
+        tool_path = cached_path
+    elif search_folder is not None:
+        tool_path = _recursive_search_tool(tool, search_folder)
+    else:
+        tool_path = shutil.which(tool)
+        tool_path = os.path.abspath(tool_path) if tool_path is not None else None
+
+    if tool_path is None:
+        return None
+
+    # the version is run again only when the binary changed
+    mtime = str(int(os.path.getmtime(tool_path)))
+    version = os.getenv(_cache_key(tool, "VERSION"))
+    if tool_path != cached_path or os.getenv(_cache_key(tool, "MTIME")) != mtime or version is None:
+        version = _tool_version(tool_path)
+        for field, value in (("BIN", tool_path), ("VERSION", version), ("MTIME", mtime)):
+            os.environ[_cache_key(tool, field)] = value
+            try:
+                dotenv.set_key(env_file_path, _cache_key(tool, field), value)
+            except OSError:
+                pass # read-only install : resolved again at the next start
+
+    return tool_path, version
 
 def check_miss_dependencies(_deps_group:dict, search_folder:str=None):
     """Check if a group of dependencies are in the PATH (or in a folder path) and return a lidt of missing tools"""
@@ -59,7 +110,7 @@ def check_miss_dependencies(_deps_group:dict, search_folder:str=None):
 
         # search recursively the tool from the search_folder
         if search_folder != None:
-            if not _recursive_search_tool(required_tool, search_folder):
+            if _recursive_search_tool(required_tool, search_folder) is None:
                 missing_tools.append(required_tool)
 
         # search the tool is in the PATH
@@ -70,32 +121,41 @@ def check_miss_dependencies(_deps_group:dict, search_folder:str=None):
     return missing_tools
 
 def check_dependencies_groups(log:logging.Logger):
-    """Check the dependensies of this tool and add the tools paths to the PATH"""
+    """Check the dependensies of this tool, add the tools folders to the PATH and return the resolved tools ({tool: (path, version)})"""
 
     print("[*] Checking dependencies")
 
     # check tools in each dependencies groups
     all_miss_deps = []
+    resolved_tools = {}
     for deps_group in dependencies_groups:
 
-        # check a group (in the same folder)
+        # resolve the tools of a group (from the cache, the group folder or the PATH)
         deps_group_folder = os.getenv(deps_group["env_key"])
-        miss_deps = check_miss_dependencies(deps_group, deps_group_folder)
+        group_tools = {tool: resolve_tool(tool, deps_group_folder) for tool in deps_group["tools"]}
+        miss_deps = [tool for tool, resolved in group_tools.items() if resolved is None]
+
+        # optional tools : only log them
+        if miss_deps != [] and deps_group.get("optional", False):
+            log.warning(f"{", ".join(miss_deps)} (optional) not found")
 
         # add missing tools to a global list
-        if miss_deps != []:
+        elif miss_deps != []:
             all_miss_deps += miss_deps
 
-        # add it to the PATH
+        # add their folders to the PATH
         else:
-            # if program are already in the path, deps_group_folder is None
-            if deps_group_folder is None:
-                deps_group_folder = "the PATH"
-            else:
-                os.environ["PATH"] += ";"+deps_group_folder
+            resolved_tools.update(group_tools)
+            path_folders = os.environ.get("PATH", "").split(os.pathsep)
+            for tool_path, version in group_tools.values():
+                tool_folder = os.path.dirname(tool_path)
+                if tool_folder not in path_folders:
+                    os.environ["PATH"] += os.pathsep + tool_folder
+                    path_folders.append(tool_folder)
 
             # log found tools
-            log.info(f"{", ".join(deps_group["tools"])} found in {deps_group_folder}")
+            for tool, (tool_path, version) in group_tools.items():
+                log.info(f"{tool} found : {tool_path} ({version or "unknown version"})")
 
     # if some tools are missing
     if all_miss_deps != []:
@@ -107,6 +167,8 @@ def check_dependencies_groups(log:logging.Logger):
         print(f"[-] {", ".join(all_miss_deps)} : not found on your computer, check your .env file")
         exit()
 
+    return resolved_tools
+
 
 # main function
 def main():
@@ -133,13 +195,18 @@ def main():
 
         else:
             # give the path (folder)
+            is_optional = deps_group.get("optional", False)
             while True:
                 try:
-                    folder_path = input(f"[?] Enter the path of {deps_group["name"]} folder{used_tools_txt}: ")
+                    folder_path = input(f"[?] Enter the path of {deps_group["name"]} folder{used_tools_txt}{" (optional, empty=skip)" if is_optional else ""}: ")
                 except KeyboardInterrupt:
                     print("\n[!] Program exit")
                     exit()
 
+                # skip an optional group
+                if is_optional and folder_path == "":
+                    break
+
                 # check if the path exists
                 if os.path.exists(folder_path):
 
@@ -0,0 +1,118 @@
+#---------------------------------------------------------------------------------
+# -*- coding: utf-8 -*-
+# Python: 3.12.0
+# Author: Killian Nallet
+# Date: 17/10/2026
+#---------------------------------------------------------------------------------
+
+
+# imports
+import os
+import re
+import json
+import time
+import threading
+
+
+# define constants
+
+# device fields : shell command reading them (all the expired fields are read in one shell call)
+field_commands = {
+    "props": "getprop",
+    "density": "wm density",
+    "packages": "pm list packages --show-versioncode 2>/dev/null || pm list packages", # version codes since android 9
+    "input_method": "settings get secure default_input_method",
+}
+device_fields = list(field_commands)
+
+# seconds before a field is read again (conf 'device_cache_ttl' overrides them)
+default_ttls = {
+    "props": 24 * 3600, # build props (abi, sdk, model) only change with an update
+    "density": 3600,
+    "packages": 300, # also invalidated after each install
+    "input_method": 300,
+}
+
+prop_line = re.compile(r"^\[(.*?)\]: \[(.*)\]$")
+package_line = re.compile(r"^package:(\S+)(?: versionCode:(\d+))?")
+
+
+# define classes
+class DeviceCache:
+    """Properties of the devices kept in memory and in a json file (keyed by serial), each field expires after its ttl"""
+
+    def __init__(self, cache_path:str, ttls:dict=None):
+        self.cache_path = cache_path
+        self.ttls = dict(default_ttls, **(ttls or {}))
+        self._lock = threading.Lock()
+        self._devices = self._load() # serial -> {field: {"value": ..., "time": ...}}
+
+    def _load(self) -> dict:
+        try:
+            with open(self.cache_path, "r") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+            with open(self.cache_path, "w") as file:
+                json.dump(self._devices, file)
+        except OSError:
+            pass # the memory cache still works
+
+    def get(self, serial:str, field:str):
+        """Return a field of a device (None if it is not cached or expired)"""
+
+        with self._lock:
+            entry = self._devices.get(serial, {}).get(field)
+        if entry is None or time.time() - entry["time"] > self.ttls.get(field, 0):
+            return None
+        return entry["value"]
+
+    def set(self, serial:str, fields:dict):
+        """Store fields of a device"""
+
+        now = time.time()
+        with self._lock:
+            device = self._devices.setdefault(serial, {})
+            for field, value in fields.items():
+                device[field] = {"value": value, "time": now}
+            self._save()
+
+    def invalidate(self, serial:str=None, *fields:str):
+        """Forget fields of a device (all its fields without fields, all the devices without serial)"""
+
+        with self._lock:
+            if serial is None:
+                self._devices.clear()
+            elif not fields:
+                self._devices.pop(serial, None)
+            else:
+                for field in fields:
+                    self._devices.get(serial, {}).pop(field, None)
+            self._save()
+
+
+# define functions
+def parse_field(field:str, output:str):
+    """Return the value of a device field from the output of its command"""
+
+    if field == "props":
+        props = {}
+        for line in output.splitlines():
+            match = prop_line.match(line.strip())
+            if match is not None:
+                props[match.group(1)] = match.group(2)
+        return props
+
+    if field == "packages": # package -> version code (None if the device does not show it)
+        packages = {}
+        for line in output.splitlines():
+            match = package_line.match(line.strip())
+            if match is not None:
+                packages[match.group(1)] = int(match.group(2)) if match.group(2) else None
+        return dict(sorted(packages.items()))
+
+    return output.strip()
@@ -0,0 +1,97 @@
+#---------------------------------------------------------------------------------
+# -*- coding: utf-8 -*-
+# Python: 3.12.0
+# Author: Killian Nallet
+# Date: 17/10/2026
+#---------------------------------------------------------------------------------
+
+
+# imports
+import asyncio
+
+from adb_client import AdbError, get_adb_client
+
+
+# define classes
+class Backoff:
+    """Bounded exponential backoff delays"""
+
+    def __init__(self, initial:float=0.5, factor:float=2.0, maximum:float=10.0):
+        self.initial = initial
+        self.factor = factor
+        self.maximum = maximum
+        self.delay = initial
+
+    def next(self) -> float:
+        """Return the next delay to wait"""
+
+        delay = self.delay
+        self.delay = min(self.delay * self.factor, self.maximum)
+        return delay
+
+    def reset(self):
+        """Restart from the initial delay"""
+
+        self.delay = self.initial
+
+
+# define functions
+def parse_devices(snapshot:str) -> dict:
+    """Parse a host:track-devices snapshot, return {serial: state}"""
+
+    devices = {}
+    for line in snapshot.splitlines():
+        if "\t" in line:
+            serial, state = line.split("\t", 1)
+            devices[serial] = state
+    return devices
+
+
+def notify_changes(old_states:dict, new_states:dict, on_change=None):
+    """Call on_change(serial, old_state, new_state) for each device which changed between two snapshots"""
+
+    if on_change is None:
+        return
+    for serial in set(old_states) | set(new_states):
+        old_state, new_state = old_states.get(serial), new_states.get(serial)
+        if old_state != new_state:
+            on_change(serial, old_state, new_state)
+
+
+async def track_devices_async(on_change, client=None):
+    """Watch the devices states in an asyncio task (host:track-devices stream), never returns"""
+
+    client = client or get_adb_client()
+    service = b"host:track-devices"
+    backoff = Backoff()
+    states = {}
+
+    while True:
+        writer = None
+        try:
+            reader, writer = await asyncio.open_connection(client.host, client.port)
+            writer.write(b"%04x" % len(service) + service)
+            await writer.drain()
+
+            status = await reader.readexactly(4)
+            if status != b"OKAY":
+                raise AdbError(f"track-devices refused ({status!r})")
+            backoff.reset()
+
+            # each message is a full snapshot of the devices list
+            while True:
+                size = int(await reader.readexactly(4), 16)
+                new_states = parse_devices((await reader.readexactly(size)).decode("utf-8", errors="replace"))
+                states, old_states = new_states, states
+                notify_changes(old_states, new_states, on_change)
+
+        except (OSError, AdbError, ValueError, asyncio.IncompleteReadError):
+            # adb server lost : all devices are gone until the stream is back
+            states, old_states = {}, states
+            notify_changes(old_states, states, on_change)
+
+        finally:
+            if writer is not None:
+                writer.close()
+
+        await asyncio.sleep(backoff.next())
@@ -0,0 +1,140 @@
+#---------------------------------------------------------------------------------
+# -*- coding: utf-8 -*-
+# Python: 3.12.0
+# Author: Killian Nallet
+# Date: 17/10/2026
+#---------------------------------------------------------------------------------
+
+
+# imports
+import os
+import shutil
+import zipfile
+import threading
+
+from apk_catalog import file_sha256
+from telemetry import timed
+
+
+# define constants
+partial_suffix = ".partial"
+
+
+# define classes
+class ExtractCache:
+    """Cache of extracted .apkm / .xapk archives, keyed by archive content hash (LRU eviction)"""
+
+    def __init__(self, root:str, max_size:int):
+        self.root = root
+        self.max_size = max_size # bytes
+
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._pins = {} # key -> number of users of the entry (not evicted)
+
+        # clean entries left by an interrupted extraction
+        os.makedirs(self.root, exist_ok=True)
+        for name in os.listdir(self.root):
+            if name.endswith(partial_suffix):
+                shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+
+    def _key_lock(self, key:str) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    @staticmethod
+    def _list_apks(entry_dir:str) -> list:
+        return sorted(
+            os.path.join(dir_path, file)
+            for dir_path, _, files in os.walk(entry_dir) for file in files if file.endswith(".apk")
+        )
+
+    def _pin(self, key:str, count:int):
+        with self._lock:
+            self._pins[key] = self._pins.get(key, 0) + count
+            if self._pins[key] <= 0:
+                del self._pins[key]
+
+    def unpin(self, apk_files:list):
+        """Release the entry of .apk files returned by get(pin=True), it can be evicted again"""
+
+        if not apk_files:
+            return
+        rel_path = os.path.relpath(os.path.abspath(apk_files[0]), os.path.abspath(self.root))
+        if not rel_path.startswith(os.pardir): # in the cache
+            self._pin(rel_path.split(os.sep)[0], -1)
+
+    @timed("parse.extract")
+    def get(self, archive_path:str, sha256:str=None, pin=False) -> list:
+        """Return the .apk files of an archive, extract it only if it is not in the cache (a pinned entry is kept until unpin)"""
+
+        key = sha256 or file_sha256(archive_path)
+        entry_dir = os.path.join(self.root, key)
+
+        with self._key_lock(key):
+            if pin:
+                self._pin(key, 1)
+
+            # cache hit : mark the entry as recently used
+            if os.path.isdir(entry_dir):
+                os.utime(entry_dir)
+                return self._list_apks(entry_dir)
+
+            # extract the .apk members in a partial dir, then publish it
+            partial_dir = entry_dir + partial_suffix
+            shutil.rmtree(partial_dir, ignore_errors=True)
+            try:
+                with zipfile.ZipFile(archive_path, "r") as zip_ref:
+                    zip_ref.extractall(partial_dir, [name for name in zip_ref.namelist() if name.endswith(".apk")])
+                os.replace(partial_dir, entry_dir)
+            except Exception:
+                if pin:
+                    self._pin(key, -1)
+                raise
+
+        self.evict(keep=key)
+        return self._list_apks(entry_dir)
+
+    def _entries(self) -> list:
+        """Return (last use, size, key) of each cache entry"""
+
+        entries = []
+        for key in os.listdir(self.root):
+            entry_dir = os.path.join(self.root, key)
+            if key.endswith(partial_suffix) or not os.path.isdir(entry_dir):
+                continue
+            size = sum(
+                os.path.getsize(os.path.join(dir_path, file))
+                for dir_path, _, files in os.walk(entry_dir) for file in files
+            )
+            entries.append((os.path.getmtime(entry_dir), size, key))
+        return entries
+
+    def size(self) -> int:
+        """Return the size of the cache (bytes)"""
+
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self, keep:str=None):
+        """Remove the least recently used entries until the cache fits in its size budget"""
+
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+
+        for _, size, key in entries:
+            if total <= self.max_size:
+                break
+            with self._lock:
+                pinned = key in self._pins
+            if key == keep or pinned: # in use (staged for an install)
+                continue
+            with self._key_lock(key):
+                shutil.rmtree(os.path.join(self.root, key), ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        """Remove all entries"""
+
+        for _, _, key in self._entries():
+            with self._key_lock(key):
+                shutil.rmtree(os.path.join(self.root, key), ignore_errors=True)
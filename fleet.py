@@ -0,0 +1,148 @@
+#---------------------------------------------------------------------------------
+# -*- coding: utf-8 -*-
+# Python: 3.12.0
+# Author: Killian Nallet
+# Date: 17/10/2026
+#---------------------------------------------------------------------------------
+
+
+# imports
+import os
+import time
+import zipfile
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from adb_functions import (
+    bundle_exts, using_device, get_connected_devices, check_and_extract_apk, release_extracted, adb_is_installed,
+    adb_install_apk, adb_install_bundle, adb_install_split_files, adb_push_path
+)
+
+
+# define constants
+default_fleet_workers = 4
+
+# per-device result codes
+FLEET_OK = "ok"
+FLEET_FAILED = "failed"
+FLEET_DOWNGRADE = "downgrade"
+FLEET_OFFLINE = "offline"
+
+
+# define variables
+_print_lock = threading.Lock()
+
+
+# define functions
+def fleet_print(serial:str, message:str):
+    """Print a progress message of a device"""
+
+    with _print_lock:
+        print(f"[{serial}] {message}")
+
+
+def _fleet_run(serials:list, task, workers:int=default_fleet_workers) -> dict:
+    """Run task(serial) on each device with a bounded pool of workers, return {serial: task result}"""
+
+    connected = set(get_connected_devices())
+
+    def run_device(serial):
+        if serial not in connected:
+            fleet_print(serial, "not connected")
+            return FLEET_OFFLINE, None
+        with using_device(serial):
+            try:
+                return task(serial)
+            except Exception as e: # one device must not lose the results of the others
+                fleet_print(serial, f"error ({e or type(e).__name__})")
+                return FLEET_FAILED, str(e) or type(e).__name__
+
+    # each device runs in a copy of the caller context (cancel event of a background job)
+    with ThreadPoolExecutor(max_workers=min(workers, len(serials) or 1)) as pool:
+        futures = [pool.submit(contextvars.copy_context().run, run_device, serial) for serial in serials]
+        return dict(zip(serials, (future.result() for future in futures)))
+
+
+def prepare_bundle(apk_path:str, sha256:str=None) -> list:
+    """Prepare a package once for several devices, return the .apk files to install (None to stream the archive)"""
+
+    if os.path.splitext(apk_path)[1] not in bundle_exts:
+        return [apk_path]
+
+    # stored splits are streamed from the archive, compressed ones are extracted once (shared extraction)
+    with zipfile.ZipFile(apk_path, "r") as zip_ref:
+        if all(info.compress_type == zipfile.ZIP_STORED for info in zip_ref.infolist() if info.filename.endswith(".apk")):
+            return None
+    return check_and_extract_apk(apk_path, sha256, pin=True) # kept in the extract cache until release_prepared
+
+
+def release_prepared(apk_files:list):
+    """Release the files of prepare_bundle once their installs are done"""
+
+    if apk_files:
+        release_extracted(apk_files)
+
+
+def install_prepared(apk_path:str, apk_files:list, replace_apk=False, allow_downgrade=False):
+    """Install a package prepared by prepare_bundle on the current device"""
+
+    if apk_files is None:
+        return adb_install_bundle(apk_path, replace_apk, allow_downgrade)
+    elif len(apk_files) > 1:
+        return adb_install_split_files(apk_files, replace_apk, allow_downgrade)
+    else:
+        return adb_install_apk(apk_files, replace_apk, allow_downgrade)
+
+
+def fleet_install(serials:list, apk_path:str, apk_id:str=None, replace_apk=False, allow_downgrade=False, workers:int=default_fleet_workers, sha256:str=None) -> dict:
+    """Install a package on several devices in parallel, return {serial: (result code, message)}"""
+
+    apk_files = prepare_bundle(apk_path, sha256)
+
+    def install(serial):
+        start = time.time()
+        installed = apk_id is not None and adb_is_installed(apk_id)
+        replace = replace_apk and (installed or apk_id is None)
+        fleet_print(serial, f"installing{' (update)' if installed else ''}")
+
+        result = install_prepared(apk_path, apk_files, replace, allow_downgrade)
+
+        # result code
+        err = result.stderr.strip().replace("\n", " ")
+        if result.returncode == 0:
+            fleet_print(serial, f"installed in {time.time()-start:.1f}s")
+            return FLEET_OK, None
+        if "INSTALL_FAILED_VERSION_DOWNGRADE" in err:
+            fleet_print(serial, "downgrade detected")
+            return FLEET_DOWNGRADE, err
+        fleet_print(serial, f"install failed ({err})")
+        return FLEET_FAILED, err
+
+    try:
+        return _fleet_run(serials, install, workers)
+    finally:
+        release_prepared(apk_files)
+
+
+def fleet_push(serials:list, src:str, trg:str, workers:int=default_fleet_workers) -> dict:
+    """Push a path on several devices in parallel, return {serial: (result code, message)}"""
+
+    def push(serial):
+        start = time.time()
+        if adb_push_path(src, trg):
+            fleet_print(serial, f"pushed in {time.time()-start:.1f}s")
+            return FLEET_OK, None
+        fleet_print(serial, "push failed")
+        return FLEET_FAILED, "push failed"
+
+    return _fleet_run(serials, push, workers)
+
+
+def print_fleet_results(results:dict):
+    """Print a summary of the fleet results"""
+
+    for serial, (code, message) in results.items():
+        print(f"  {serial:<24} {code:<10} {message or ''}")
+    nb_ok = sum(code == FLEET_OK for code, _ in results.values())
+    print(f"[{'+' if nb_ok == len(results) else '-'}] {nb_ok}/{len(results)} devices ok")
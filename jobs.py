@@ -0,0 +1,127 @@
+#---------------------------------------------------------------------------------
+# -*- coding: utf-8 -*-
+# Python: 3.12.0
+# Author: Killian Nallet
+# Date: 17/10/2026
+#---------------------------------------------------------------------------------
+
+
+# imports
+import time
+import asyncio
+import threading
+from dataclasses import dataclass, field
+
+from adb_client import cancel_event
+
+
+# define constants
+max_finished_jobs = 20 # finished jobs kept in the jobs list
+
+JOB_RUNNING = "running"
+JOB_CANCELLING = "cancelling"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+
+# define classes
+@dataclass
+class Job:
+    """A blocking operation (install, transfer, ...) running in a worker thread"""
+
+    id: int
+    name: str
+    background: bool = False
+    started: float = field(default_factory=time.time)
+    ended: float = None
+    result: object = None
+    error: str = None
+    task: asyncio.Task = None
+    cancel_event: threading.Event = field(default_factory=threading.Event)
+
+    @property
+    def status(self) -> str:
+        if self.ended is None:
+            return JOB_CANCELLING if self.cancel_event.is_set() else JOB_RUNNING
+        if self.cancel_event.is_set():
+            return JOB_CANCELLED
+        return JOB_FAILED if self.error is not None else JOB_DONE
+
+    @property
+    def duration(self) -> float:
+        return (self.ended or time.time()) - self.started
+
+
+class JobManager:
+    """Run blocking operations as asyncio tasks, list and cancel them"""
+
+    def __init__(self, on_done=None):
+        self.on_done = on_done # callback(job) when a job ends
+        self.jobs = {}
+        self._next_id = 1
+
+    def start(self, name:str, function, *args, background=False) -> Job:
+        """Start function(*args) in a worker thread, return its job"""
+
+        job = Job(self._next_id, name, background)
+        self._next_id += 1
+        self.jobs[job.id] = job
+        job.task = asyncio.create_task(self._run(job, function, args))
+        self._prune()
+        return job
+
+    async def _run(self, job:Job, function, args):
+        # the worker thread (and the threads it starts) see the cancel event of the job
+        cancel_event.set(job.cancel_event)
+        try:
+            job.result = await asyncio.to_thread(function, *args)
+        except Exception as e:
+            job.error = str(e) or type(e).__name__
+        finally:
+            job.ended = time.time()
+            if self.on_done is not None:
+                self.on_done(job)
+        return job.result
+
+    async def wait(self, job:Job):
+        """Wait the end of a job (the job continues if the waiter is cancelled), return its result"""
+
+        return await asyncio.shield(job.task)
+
+    def cancel(self, job_id:int) -> bool:
+        """Ask a running job to stop (checked between the blocks of its streams)"""
+
+        job = self.jobs.get(job_id)
+        if job is None or job.ended is not None:
+            return False
+        job.cancel_event.set()
+        return True
+
+    def cancel_all(self) -> int:
+        """Ask all the running jobs to stop, return their number"""
+
+        return sum(self.cancel(job.id) for job in self.running())
+
+    def running(self) -> list:
+        """Return the jobs which are not finished"""
+
+        return [job for job in self.jobs.values() if job.ended is None]
+
+    def _prune(self):
+        """Forget the oldest finished jobs"""
+
+        finished = [job for job in self.jobs.values() if job.ended is not None]
+        for job in finished[:max(0, len(finished) - max_finished_jobs)]:
+            del self.jobs[job.id]
+
+
+# define functions
+def print_jobs(jobs:list):
+    """Print a table of jobs"""
+
+    if not jobs:
+        print("[*] no jobs")
+        return
+    for job in jobs:
+        print(f"  [{job.id}] {job.status:<10} {job.duration:7.1f}s  {job.name}" + (f" ({job.error})" if job.error else ""))
@@ -0,0 +1,123 @@
+#---------------------------------------------------------------------------------
+# -*- coding: utf-8 -*-
+# Python: 3.12.0
+# Author: Killian Nallet
+# Date: 17/10/2026
+#---------------------------------------------------------------------------------
+
+
+# imports
+import os
+import gzip
+import copy
+import json
+import time
+import queue
+import shutil
+import atexit
+import logging
+import logging.handlers
+
+
+# define constants
+default_max_mb = 10 # size of a log segment
+default_max_age_hours = 24 # age of a log segment
+default_backups = 5 # compressed old segments kept (log.1.gz is the newest)
+
+text_format = "%(asctime)s %(levelname)s %(message)s"
+record_fields = ["command", "seconds", "returncode", "bytes"] # structured fields (extra) written by the json format
+
+
+# define variables
+_listener = None
+
+
+# define classes
+class RotatingCompressedHandler(logging.handlers.RotatingFileHandler):
+    """Log file rotated by size or by age, the old segments are compressed with gzip"""
+
+    def __init__(self, filename:str, max_bytes:int, max_age:float, backups:int):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backups, encoding="utf-8", delay=True)
+        self.max_age = max_age # seconds
+        self.namer = lambda name: name + ".gz"
+        self.rotator = self._compress
+        self._opened = time.time()
+        if os.path.exists(filename): # age of the current segment (creation time if the platform has it)
+            file_stat = os.stat(filename)
+            self._opened = getattr(file_stat, "st_birthtime", file_stat.st_mtime)
+
+    def shouldRollover(self, record) -> bool:
+        if self.max_age and time.time() - self._opened >= self.max_age and os.path.exists(self.baseFilename) and os.path.getsize(self.baseFilename) > 0:
+            return True
+        return bool(super().shouldRollover(record))
+
+    def doRollover(self):
+        super().doRollover()
+        self._opened = time.time()
+
+    @staticmethod
+    def _compress(source:str, dest:str):
+        with open(source, "rb") as file_in, gzip.open(dest, "wb") as file_out:
+            shutil.copyfileobj(file_in, file_out)
+        os.remove(source)
+
+
+class JsonFormatter(logging.Formatter):
+    """One json object per line : time, level, message and the structured fields of the record"""
+
+    def format(self, record) -> str:
+        line = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "msg": record.getMessage(),
+        }
+        for field in record_fields:
+            if hasattr(record, field):
+                line[field] = getattr(record, field)
+        if record.exc_info:
+            line["exc"] = self.formatException(record.exc_info)
+        return json.dumps(line, default=str)
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler leaving the formatting of the records to the log thread (QueueHandler.prepare formats in the caller)"""
+
+    def prepare(self, record):
+        return copy.copy(record) # message, args and traceback are formatted by the file handler (same process queue)
+
+
+# define functions
+def start_log_pipeline(logger:logging.Logger, log_path:str, json_format=False, max_mb:float=default_max_mb, max_age_hours:float=default_max_age_hours, backups:int=default_backups):
+    """Send the records of a logger through a queue, a background thread writes them to a rotating file"""
+
+    global _listener
+    stop_log_pipeline()
+
+    os.makedirs(os.path.dirname(log_path) or ".", exist_ok=True)
+    file_handler = RotatingCompressedHandler(log_path, int(max_mb * 1024 * 1024), max_age_hours * 3600, backups)
+    file_handler.setFormatter(JsonFormatter() if json_format else logging.Formatter(text_format))
+
+    # the callers only put the records in the queue (no disk io on the command path)
+    log_queue = queue.SimpleQueue()
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    logger.addHandler(DeferredQueueHandler(log_queue))
+    logger.propagate = False
+
+    _listener = logging.handlers.QueueListener(log_queue, file_handler)
+    _listener.start()
+    return _listener
+
+
+def stop_log_pipeline():
+    """Write the queued records and stop the background thread"""
+
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(stop_log_pipeline)
@@ -0,0 +1,139 @@
+#---------------------------------------------------------------------------------
+# -*- coding: utf-8 -*-
+# Python: 3.12.0
+# Author: Killian Nallet
+# Date: 17/10/2026
+#---------------------------------------------------------------------------------
+
+
+# imports
+import time
+
+from keyevents import KeyMap
+
+
+# define constants
+max_macro_depth = 8 # nested @macro references
+min_recorded_delay = 0.1 # shorter pauses between recorded keys are not replayed
+
+# key sequence actions
+ACTION_KEYS = "keys"
+ACTION_COMBINATION = "combination"
+ACTION_SLEEP = "sleep"
+
+
+# define classes
+class MacroError(ValueError):
+    """Invalid key sequence or unknown macro"""
+
+    pass
+
+
+class MacroRecorder:
+    """Record the keys sent in the terminal as a key sequence (with the pauses between them)"""
+
+    def __init__(self, name:str, delays=False):
+        self.name = name
+        self.delays = delays
+        self.tokens = []
+        self._last = None
+
+    def add(self, sequence:str):
+        """Add a key sequence sent by the user"""
+
+        now = time.monotonic()
+        if self.delays and self._last is not None and now - self._last >= min_recorded_delay:
+            self.tokens.append(f"sleep:{now - self._last:.2f}")
+        self._last = now
+        self.tokens += sequence.split()
+
+    def sequence(self) -> str:
+        return " ".join(self.tokens)
+
+
+# define functions
+def key_code(name:str) -> str:
+    """Return the keycode of a KeyMap name (dpad_down, KEYCODE_DPAD_DOWN) or of a numeric keycode"""
+
+    if name.isdigit():
+        return name
+    name = name.lower().removeprefix("keycode_")
+    code = vars(KeyMap).get(name)
+    if name.startswith("_") or not isinstance(code, str):
+        raise MacroError(f"unknown key '{name}'")
+    return code
+
+
+def parse_sequence(sequence:str, macros:dict=None, depth:int=0) -> list:
+    """Parse a key sequence into (action, value) : 'dpad_down*5 ctrl_left+c sleep:0.5 @macro' """
+
+    if depth > max_macro_depth:
+        raise MacroError("too many nested macros")
+
+    actions = []
+    for token in sequence.split():
+
+        # pause on the device
+        if token.startswith("sleep:"):
+            try:
+                seconds = float(token[len("sleep:"):])
+            except ValueError:
+                raise MacroError(f"invalid delay '{token}'")
+            actions.append((ACTION_SLEEP, seconds))
+            continue
+
+        # repeat count
+        token, _, count = token.partition("*")
+        if count and not count.isdigit():
+            raise MacroError(f"invalid repeat count '{count}'")
+        count = int(count) if count else 1
+
+        # named macro
+        if token.startswith("@"):
+            if token[1:] not in (macros or {}):
+                raise MacroError(f"unknown macro '{token[1:]}'")
+            actions += parse_sequence(macros[token[1:]], macros, depth + 1) * count
+
+        # keys pressed together
+        elif "+" in token:
+            codes = [key_code(name) for name in token.split("+")]
+            if len(codes) < 2 or "" in token.split("+"):
+                raise MacroError(f"invalid key combination '{token}'")
+            actions += [(ACTION_COMBINATION, codes)] * count
+
+        else:
+            actions.append((ACTION_KEYS, [key_code(token)] * count))
+
+    return actions
+
+
+def compile_sequence(actions:list) -> str:
+    """Return one shell script sending the actions (the following keys are sent in one 'input keyevent' call)"""
+
+    commands = []
+    keys = []
+    for action, value in actions:
+        if action == ACTION_KEYS:
+            keys += value
+            continue
+
+        if keys:
+            commands.append(f"input keyevent {' '.join(keys)}")
+            keys = []
+        if action == ACTION_COMBINATION:
+            commands.append(f"input keycombination {' '.join(value)}")
+        elif action == ACTION_SLEEP:
+            commands.append(f"sleep {value:g}")
+
+    if keys:
+        commands.append(f"input keyevent {' '.join(keys)}")
+    return " && ".join(commands)
+
+
+def compile_macro(sequence:str, macros:dict=None) -> str:
+    """Return the shell script of a key sequence (raise MacroError if it is invalid)"""
+
+    script = compile_sequence(parse_sequence(sequence, macros))
+    if script == "":
+        raise MacroError("empty key sequence")
+    return script
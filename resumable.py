@@ -0,0 +1,199 @@
+#---------------------------------------------------------------------------------
+# -*- coding: utf-8 -*-
+# Python: 3.12.0
+# Author: Killian Nallet
+# Date: 17/10/2026
+#---------------------------------------------------------------------------------
+
+
+# imports
+import os
+import json
+import time
+import shlex
+import hashlib
+import threading
+
+from adb_client import AdbError, JobCancelled, check_cancelled, get_adb_client
+from device_tracker import Backoff
+from telemetry import timed
+from transfer import remote_file_size
+
+
+# define constants
+partial_suffix = ".adbpart"
+segment_size = 8 * 1024 * 1024 # bytes confirmed by each push segment
+hash_chunk_size = 1024 * 1024
+default_retries = 5
+
+
+# define classes
+class _Segment:
+    """File-like object reading at most size bytes of a file (from its current position)"""
+
+    def __init__(self, file, size:int):
+        self.file = file
+        self.left = size
+
+    def read(self, size:int=-1) -> bytes:
+        if self.left <= 0:
+            return b""
+        data = self.file.read(self.left if size < 0 else min(size, self.left))
+        self.left -= len(data)
+        return data
+
+
+class TransferState:
+    """Confirmed offsets of the interrupted transfers (json file)"""
+
+    def __init__(self, state_path:str):
+        self.state_path = state_path
+        self._lock = threading.Lock()
+
+    def _load(self) -> dict:
+        try:
+            with open(self.state_path, "r") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, key:str) -> dict:
+        with self._lock:
+            return self._load().get(key)
+
+    def set(self, key:str, value:dict=None):
+        with self._lock:
+            states = self._load()
+            if value is None:
+                states.pop(key, None)
+            else:
+                states[key] = value
+            os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+            with open(self.state_path, "w") as file:
+                json.dump(states, file, indent=4)
+
+
+# define functions
+def _local_prefix_md5(path:str, size:int) -> str:
+    """Return the md5 of the first size bytes of a local file"""
+
+    digest = hashlib.md5()
+    with open(path, "rb") as file:
+        while size > 0:
+            chunk = file.read(min(hash_chunk_size, size))
+            if not chunk:
+                break
+            digest.update(chunk)
+            size -= len(chunk)
+    return digest.hexdigest()
+
+
+def _remote_md5(serial:str, command:str) -> str:
+    """Return the md5 printed by a md5sum shell command"""
+
+    return get_adb_client().shell(serial, command).stdout.split(" ")[0].strip()
+
+
+def _retry(transfer, wait_reconnect=None, retries:int=default_retries):
+    """Run a transfer step until it succeeds, wait the device between the attempts"""
+
+    backoff = Backoff()
+    for attempt in range(retries + 1):
+        try:
+            return transfer()
+        except JobCancelled:
+            raise
+        except (OSError, AdbError):
+            if attempt == retries:
+                raise
+
+        # wait the device (reconnect detected by the device tracker) or a backoff delay
+        if wait_reconnect is not None:
+            wait_reconnect()
+        else:
+            time.sleep(backoff.next())
+
+
+@timed("transfer.resumable_push", size=lambda size: size)
+def resumable_push(serial:str, src:str, trg:str, state:TransferState, wait_reconnect=None, retries:int=default_retries) -> int:
+    """Push a big file through a remote partial file, resume from the confirmed offset after a failure"""
+
+    client = get_adb_client()
+    file_stat = os.stat(src)
+    part = trg + partial_suffix
+    key = f"push:{serial}:{os.path.abspath(src)}:{trg}"
+
+    def confirmed_offset() -> int:
+        """Remote partial size, if it is a prefix of the same source file"""
+
+        record = state.get(key)
+        if record is None or record["size"] != file_stat.st_size or record["mtime"] != int(file_stat.st_mtime):
+            return 0
+        size = remote_file_size(serial, part)
+        if size is None or size > file_stat.st_size:
+            return 0
+        if size and _remote_md5(serial, f"md5sum {shlex.quote(part)}") != _local_prefix_md5(src, size):
+            return 0
+        return size
+
+    def push():
+        offset = confirmed_offset()
+        if offset == 0:
+            client.shell(serial, f"mkdir -p {shlex.quote(os.path.dirname(trg) or '.')}; rm -f {shlex.quote(part)}; : > {shlex.quote(part)}")
+            state.set(key, {"size": file_stat.st_size, "mtime": int(file_stat.st_mtime), "offset": 0})
+
+        # append the segments to the remote partial file
+        with open(src, "rb") as file:
+            file.seek(offset)
+            while offset < file_stat.st_size:
+                size = min(segment_size, file_stat.st_size - offset)
+                # shell v2 stdin : the segment is appended when the command returns (adb streams have no half-close)
+                result = client.shell(serial, f"cat >> {shlex.quote(part)}", stdin=_Segment(file, size))
+                if result.returncode != 0:
+                    raise AdbError(f"append to {part} failed ({result.stderr.strip() or f'exit code {result.returncode}'})")
+                offset += size
+                state.set(key, {"size": file_stat.st_size, "mtime": int(file_stat.st_mtime), "offset": offset})
+
+        # check the final size and publish the file
+        remote_size = remote_file_size(serial, part)
+        if remote_size != file_stat.st_size:
+            raise AdbError(f"size mismatch after push ({remote_size}/{file_stat.st_size})")
+        client.shell(serial, f"mv -f {shlex.quote(part)} {shlex.quote(trg)}")
+
+    _retry(push, wait_reconnect, retries)
+    state.set(key, None)
+    return file_stat.st_size
+
+
+@timed("transfer.resumable_pull", size=lambda size: size)
+def resumable_pull(serial:str, src:str, trg:str, wait_reconnect=None, retries:int=default_retries) -> int:
+    """Pull a big file into a local partial file, resume from its size after a failure"""
+
+    client = get_adb_client()
+    part = trg + partial_suffix
+
+    remote_size = remote_file_size(serial, src)
+    if remote_size is None:
+        raise AdbError(f"remote object '{src}' does not exist")
+
+    def pull():
+        # validate the local prefix with the remote file
+        offset = os.path.getsize(part) if os.path.exists(part) else 0
+        if offset and _remote_md5(serial, f"head -c {offset} {shlex.quote(src)} | md5sum") != _local_prefix_md5(part, offset):
+            offset = 0
+
+        # stream the rest of the file at the end of the partial file
+        with open(part, "ab" if offset else "wb") as file:
+            conn = client.open_service(serial, f"exec:tail -c +{offset + 1} {shlex.quote(src)}")
+            with conn:
+                while chunk := conn.sock.recv(hash_chunk_size):
+                    check_cancelled()
+                    file.write(chunk)
+
+        size = os.path.getsize(part)
+        if size != remote_size:
+            raise AdbError(f"size mismatch after pull ({size}/{remote_size})")
+        os.replace(part, trg)
+        return size
+
+    return _retry(pull, wait_reconnect, retries)
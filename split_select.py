@@ -0,0 +1,135 @@
+#---------------------------------------------------------------------------------
+# -*- coding: utf-8 -*-
+# Python: 3.12.0
+# Author: Killian Nallet
+# Date: 17/10/2026
+#---------------------------------------------------------------------------------
+
+
+# imports
+import os
+from dataclasses import dataclass, field
+
+
+# define constants
+abis = ["arm64_v8a", "armeabi_v7a", "armeabi", "x86_64", "x86", "mips64", "mips"]
+
+densities = {
+    "ldpi": 120,
+    "mdpi": 160,
+    "tvdpi": 213,
+    "hdpi": 240,
+    "xhdpi": 320,
+    "xxhdpi": 480,
+    "xxxhdpi": 640,
+}
+
+
+# define classes
+@dataclass
+class DeviceSpec:
+    """Device properties used to choose the splits of an app bundle"""
+
+    abis: list = field(default_factory=list) # preferred abi first (arm64-v8a, ...)
+    sdk: int = None
+    density: int = None
+    locales: list = field(default_factory=list) # en-US, fr-FR, ...
+
+    @property
+    def languages(self) -> set:
+        return {locale.replace("_", "-").split("-")[0].lower() for locale in self.locales if locale}
+
+
+# define functions
+def parse_device_spec(props:dict, wm_density:str="") -> DeviceSpec:
+    """Build a DeviceSpec from getprop values and the output of 'wm density'"""
+
+    spec = DeviceSpec()
+
+    # abis (ro.product.cpu.abilist exists since android 5)
+    abilist = props.get("ro.product.cpu.abilist") or ",".join(
+        filter(None, [props.get("ro.product.cpu.abi"), props.get("ro.product.cpu.abi2")])
+    )
+    spec.abis = [abi.strip() for abi in abilist.split(",") if abi.strip()]
+
+    try:
+        spec.sdk = int(props.get("ro.build.version.sdk", ""))
+    except ValueError:
+        pass
+
+    # density (the override density of wm is the one used by the device)
+    wm_values = {}
+    for line in wm_density.splitlines():
+        if ":" in line:
+            key, value = line.split(":", 1)
+            wm_values[key.strip().split(" ")[0].lower()] = value.strip()
+    for density in (wm_values.get("override"), wm_values.get("physical"), props.get("ro.sf.lcd_density")):
+        if density and density.isdigit():
+            spec.density = int(density)
+            break
+
+    # locales
+    locales = props.get("persist.sys.locale") or props.get("ro.product.locale")
+    if not locales and props.get("persist.sys.language"):
+        locales = f"{props['persist.sys.language']}-{props.get('persist.sys.country', '')}"
+    spec.locales = [locale for locale in (locales or "").split(",") if locale]
+
+    return spec
+
+
+def split_qualifier(apk_name:str):
+    """Return the config qualifier of a split file name (None for a base or feature split)"""
+
+    name = os.path.splitext(os.path.basename(apk_name))[0]
+    for prefix in ("split_config.", "config."):
+        if name.startswith(prefix):
+            return name[len(prefix):]
+    return None
+
+
+def select_splits(splits:list, spec:DeviceSpec):
+    """Choose the splits needed by a device from a list of (name, size), return (selected names, skipped bytes)"""
+
+    abi_splits, density_splits, language_splits = {}, {}, {}
+    selected = []
+
+    # sort splits by config type
+    for name, _ in splits:
+        qualifier = split_qualifier(name)
+        if qualifier is None:
+            selected.append(name) # base and feature splits
+
+        elif qualifier in abis:
+            abi_splits[qualifier] = name
+        elif qualifier in densities:
+            density_splits[qualifier] = name
+        elif qualifier.isalpha() and 2 <= len(qualifier) <= 3:
+            language_splits[qualifier.lower()] = name
+        else:
+            selected.append(name) # unknown config : keep it
+
+    # abi : the first device abi with a split
+    device_abis = [abi.replace("-", "_") for abi in spec.abis]
+    matching_abis = [abi for abi in device_abis if abi in abi_splits]
+    if matching_abis:
+        selected.append(abi_splits[matching_abis[0]])
+    elif not device_abis:
+        selected += abi_splits.values() # unknown device : keep all
+
+    # density : the smallest density >= device density (else the biggest one)
+    if density_splits:
+        if spec.density is None:
+            selected += density_splits.values()
+        else:
+            by_density = sorted(density_splits, key=lambda qualifier: densities[qualifier])
+            higher = [qualifier for qualifier in by_density if densities[qualifier] >= spec.density]
+            selected.append(density_splits[higher[0] if higher else by_density[-1]])
+
+    # languages : device languages only (default strings are in the base apk)
+    if spec.locales:
+        selected += [name for language, name in language_splits.items() if language in spec.languages]
+    else:
+        selected += language_splits.values()
+
+    skipped = sum(size for name, size in splits if name not in selected)
+    return [name for name, _ in splits if name in selected], skipped
@@ -0,0 +1,232 @@
+#---------------------------------------------------------------------------------
+# -*- coding: utf-8 -*-
+# Python: 3.12.0
+# Author: Killian Nallet
+# Date: 17/10/2026
+#---------------------------------------------------------------------------------
+
+
+# imports
+import os
+import math
+import json
+import time
+import queue
+import atexit
+import functools
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+
+# define constants
+max_samples = 4096 # latest durations kept per span name (percentiles)
+
+
+# define classes
+class Span:
+    """A timed operation, the bytes transferred can be set while it runs"""
+
+    def __init__(self, name:str):
+        self.name = name
+        self.bytes = 0
+        self.error = False
+
+
+class SpanStats:
+    """Aggregated durations and bytes of the spans with the same name"""
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.bytes = 0
+        self.samples = deque(maxlen=max_samples)
+
+    def percentile(self, percent:float) -> float:
+        """Return a duration percentile (nearest rank) of the latest samples"""
+
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered), max(1, math.ceil(percent / 100 * len(ordered)))) - 1]
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "seconds": round(self.seconds, 6),
+            "p50_ms": round(self.percentile(50) * 1000, 3),
+            "p95_ms": round(self.percentile(95) * 1000, 3),
+            "p99_ms": round(self.percentile(99) * 1000, 3),
+            "bytes": self.bytes,
+            "mb_per_s": round(self.bytes / 1e6 / self.seconds, 3) if self.bytes and self.seconds else None,
+        }
+
+
+class Telemetry:
+    """In-memory timing spans (category.operation names) and counters"""
+
+    def __init__(self):
+        self.spans = {} # name -> SpanStats
+        self.counters = {}
+        self.sink_path = None # json lines file receiving each span
+        self._lock = threading.Lock()
+        self._sink_queue = None
+        self._sink_thread = None
+
+    def set_sink(self, sink_path:str=None):
+        """Write each span to a json lines file from a background thread (None to stop)"""
+
+        self.close_sink()
+        if not sink_path:
+            return
+        os.makedirs(os.path.dirname(sink_path) or ".", exist_ok=True)
+
+        # the spans are only queued by the callers (no disk io under the lock or on the command path)
+        self.sink_path = sink_path
+        self._sink_queue = queue.SimpleQueue()
+        self._sink_thread = threading.Thread(target=self._write_sink, args=(sink_path, self._sink_queue), daemon=True)
+        self._sink_thread.start()
+
+    def close_sink(self):
+        """Write the queued spans and stop the sink thread"""
+
+        if self._sink_thread is not None:
+            self._sink_queue.put(None)
+            self._sink_thread.join()
+        self.sink_path = self._sink_queue = self._sink_thread = None
+
+    @staticmethod
+    def _write_sink(sink_path:str, sink_queue:queue.SimpleQueue):
+        """Append the queued spans to the sink file (one write per batch) until the stop marker"""
+
+        while True:
+            lines = [sink_queue.get()]
+            while not sink_queue.empty():
+                lines.append(sink_queue.get())
+            stop = None in lines
+            try:
+                with open(sink_path, "a") as file:
+                    file.write("".join(json.dumps(line) + "\n" for line in lines if line is not None))
+            except OSError:
+                pass # the spans stay in the in-memory stats
+            if stop:
+                return
+
+    @contextmanager
+    def span(self, name:str):
+        """Time an operation (the errors are counted)"""
+
+        span = Span(name)
+        start = time.perf_counter()
+        try:
+            yield span
+        except BaseException:
+            span.error = True
+            raise
+        finally:
+            self.record(name, time.perf_counter() - start, span.bytes, span.error)
+
+    def record(self, name:str, seconds:float, size:int=0, error=False):
+        """Add a finished span"""
+
+        with self._lock:
+            stats = self.spans.get(name)
+            if stats is None:
+                stats = self.spans[name] = SpanStats()
+            stats.count += 1
+            stats.errors += error
+            stats.seconds += seconds
+            stats.bytes += size
+            stats.samples.append(seconds)
+
+        sink_queue = self._sink_queue
+        if sink_queue is not None:
+            sink_queue.put({"ts": round(time.time(), 3), "span": name, "seconds": round(seconds, 6), "bytes": size, "error": error})
+
+    def count(self, name:str, value:int=1):
+        """Increment a counter"""
+
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def snapshot(self) -> dict:
+        """Return the summaries of the spans and the counters"""
+
+        with self._lock:
+            return {
+                "spans": {name: stats.summary() for name, stats in sorted(self.spans.items())},
+                "counters": dict(sorted(self.counters.items())),
+            }
+
+    def reset(self):
+        """Forget all the spans and counters"""
+
+        with self._lock:
+            self.spans.clear()
+            self.counters.clear()
+
+    def export_jsonl(self, path:str) -> int:
+        """Append the summaries to a json lines file (one line per span / counter), return the lines written"""
+
+        snapshot = self.snapshot()
+        now = round(time.time(), 3)
+        lines = [{"ts": now, "span": name, **summary} for name, summary in snapshot["spans"].items()]
+        lines += [{"ts": now, "counter": name, "value": value} for name, value in snapshot["counters"].items()]
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "a") as file:
+            for line in lines:
+                file.write(json.dumps(line) + "\n")
+        return len(lines)
+
+
+# define functions
+_telemetry = None
+
+def get_telemetry() -> Telemetry:
+    """Return the shared telemetry"""
+
+    global _telemetry
+    if _telemetry is None:
+        _telemetry = Telemetry()
+        atexit.register(_telemetry.close_sink)
+    return _telemetry
+
+
+def timed(name:str, size=None):
+    """Decorator timing each call of a function as a span (size(result) returns the bytes transferred)"""
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with get_telemetry().span(name) as span:
+                result = function(*args, **kwargs)
+                if size is not None:
+                    span.bytes = size(result)
+                return result
+        return wrapper
+    return decorator
+
+
+def print_stats(snapshot:dict):
+    """Print the latency / throughput table of the spans and the counters"""
+
+    if not snapshot["spans"] and not snapshot["counters"]:
+        print("[*] no stats")
+        return
+
+    if snapshot["spans"]:
+        print(f"{'span':<28} {'count':>7} {'err':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'total s':>9} {'MB/s':>8}")
+        for name, summary in snapshot["spans"].items():
+            throughput = f"{summary['mb_per_s']:8.1f}" if summary["mb_per_s"] is not None else f"{'':>8}"
+            print(
+                f"{name:<28} {summary['count']:>7} {summary['errors']:>5} {summary['p50_ms']:>9.1f} "
+                f"{summary['p95_ms']:>9.1f} {summary['p99_ms']:>9.1f} {summary['seconds']:>9.2f} {throughput}"
+            )
+
+    if snapshot["counters"]:
+        print()
+        for name, value in snapshot["counters"].items():
+            print(f"{name:<28} {value:>7}")
@@ -0,0 +1,63 @@
+#---------------------------------------------------------------------------------
+# -*- coding: utf-8 -*-
+# Python: 3.12.0
+# Author: Killian Nallet
+# Date: 17/10/2026
+#---------------------------------------------------------------------------------
+
+
+# imports
+import os
+import sys
+import logging
+
+import pytest
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [root_dir, os.path.join(root_dir, "benchmarks")]
+
+from adb_client import AdbClient
+from fake_adb_server import FakeAdbServer
+from fixtures import make_device_root
+
+
+# define constants
+serial = "10.0.0.2:5555" # device of the fake server
+
+
+# define fixtures
+@pytest.fixture
+def server(tmp_path):
+    """Fake adb server with one device (its files are in tmp_path/device)"""
+
+    fake_server = FakeAdbServer(make_device_root(str(tmp_path / "device")))
+    yield fake_server
+    fake_server.close()
+
+
+@pytest.fixture
+def client(server):
+    """Adb client connected to the fake server"""
+
+    adb_client = AdbClient(server.host, server.port, timeout=10)
+    yield adb_client
+    adb_client.close_pool()
+    adb_client.close_shell_session()
+
+
+@pytest.fixture
+def device(client, tmp_path, monkeypatch):
+    """adb_functions using the fake device (shared client, conf, caches and state files in tmp_path)"""
+
+    import adb_client
+    import adb_functions
+
+    monkeypatch.setattr(adb_client, "_client", client)
+    monkeypatch.setattr(adb_functions, "_conf", {"ip": "10.0.0.2", "port": "5555"})
+    monkeypatch.setattr(adb_functions, "_log", logging.getLogger("adb_term.tests"))
+    monkeypatch.setattr(adb_functions, "device_cache_path", str(tmp_path / "device_cache.json"))
+    monkeypatch.setattr(adb_functions, "transfer_state_path", str(tmp_path / "transfers_state.json"))
+    monkeypatch.setattr(adb_functions, "temp_extract_path", str(tmp_path / "extract"))
+    monkeypatch.setattr(adb_functions, "_device_cache", None)
+    monkeypatch.setattr(adb_functions, "_extract_cache", None)
+    return adb_functions
@@ -0,0 +1,93 @@
+#---------------------------------------------------------------------------------
+# -*- coding: utf-8 -*-
+# Python: 3.12.0
+# Author: Killian Nallet
+# Date: 17/10/2026
+#---------------------------------------------------------------------------------
+
+
+# imports
+import io
+import socket
+
+import pytest
+
+from adb_client import AdbError, ShellNotSent
+from conftest import serial
+
+
+# define tests
+def test_fail_response_raises_server_message(client):
+    with client.connect() as conn:
+        with pytest.raises(AdbError, match="unknown host service"):
+            conn.request("host:nothing")
+
+
+def test_unknown_device_transport(client):
+    with pytest.raises(AdbError, match="device 'nope' not found"):
+        client.device_connect("nope")
+
+
+def test_closed_transport(server, client):
+    server.fail_next()
+    with pytest.raises(AdbError, match="connection closed"):
+        client.open_service(serial, "shell,v2,raw:true")
+
+
+def test_shell_v2_exit_code(client):
+    result = client.shell(serial, "echo out; echo err >&2; exit 3")
+    assert (result.returncode, result.stdout, result.stderr) == (3, "out\n", "err\n")
+
+
+def test_sync_stat_missing_path(client):
+    with client.sync(serial) as sync_conn:
+        assert sync_conn.stat("/missing")[0] == 0
+
+
+def test_sync_fail_packet(client):
+    with pytest.raises(AdbError, match="does not exist"):
+        with client.sync(serial) as sync_conn:
+            sync_conn.pull_stream("/missing", io.BytesIO())
+    assert client._pool.get(serial, []) == [] # broken connections are not reused
+
+
+def test_sync_stream_dropped(server, client, tmp_path):
+    (tmp_path / "device" / "big.bin").write_bytes(b"x" * 500_000)
+    server.drop_stream_after(100_000)
+    with pytest.raises((AdbError, OSError)):
+        client.pull_file(serial, "/big.bin", str(tmp_path / "big.bin"))
+
+
+def test_sync_round_trip(client, tmp_path):
+    (tmp_path / "local.txt").write_bytes(b"hello")
+    assert client.push_file(serial, str(tmp_path / "local.txt"), "/sdcard/local.txt") == 5
+    assert client.pull_file(serial, "/sdcard/local.txt", str(tmp_path / "back.txt")) == 5
+    assert (tmp_path / "back.txt").read_bytes() == b"hello"
+
+
+def test_session_reopened_after_idle_drop(client):
+    session = client.shell_session(serial)
+    assert session.run("echo one").stdout == "one\n"
+    session.conn.sock.shutdown(socket.SHUT_RD) # stream closed while idle
+    assert session.run("echo two").stdout == "two\n"
+
+
+def test_session_command_not_sent_twice(client, tmp_path):
+    session = client.shell_session(serial)
+    with pytest.raises(AdbError) as error:
+        session.run("echo run >> runs.txt; kill -9 $PPID") # the session dies after the command
+    assert not isinstance(error.value, ShellNotSent)
+    assert (tmp_path / "device" / "runs.txt").read_text() == "run\n"
+
+
+def test_session_not_opened(client):
+    with pytest.raises(ShellNotSent):
+        client.shell_session("nope").run("true")
+
+
+def test_sync_connection_closed_on_any_error(client):
+    with pytest.raises(KeyboardInterrupt):
+        with client.sync(serial) as sync_conn:
+            raise KeyboardInterrupt()
+    assert sync_conn.conn.sock.fileno() == -1 # closed, not given back to the pool
+    assert client._pool.get(serial, []) == []
@@ -0,0 +1,43 @@
+#---------------------------------------------------------------------------------
+# -*- coding: utf-8 -*-
+# Python: 3.12.0
+# Author: Killian Nallet
+# Date: 17/10/2026
+#---------------------------------------------------------------------------------
+
+
+# imports
+import os
+
+from adb_sync import plan_sync
+from conftest import serial
+
+
+# define functions
+def _write(root:str, rel_path:str, data:bytes, mtime:int=1700000000):
+    path = os.path.join(root, *rel_path.split("/"))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as file:
+        file.write(data)
+    os.utime(path, (mtime, mtime))
+
+
+# define tests
+def test_plan_sync(server, device, tmp_path):
+    local_root, remote_root = str(tmp_path / "local"), os.path.join(server.root, "data", "tree")
+    for root in (local_root, remote_root):
+        _write(root, "same.txt", b"same")
+        _write(root, "sub/touched.txt", b"content", 1700000000 if root == local_root else 1700000500)
+    _write(local_root, "new.txt", b"new")
+    _write(local_root, "sub/changed.txt", b"longer content")
+    _write(remote_root, "sub/changed.txt", b"content")
+    _write(local_root, "edited.txt", b"aaaa", 1700000000)
+    _write(remote_root, "edited.txt", b"bbbb", 1700000100)
+    _write(remote_root, "old.txt", b"old")
+
+    plan = plan_sync(serial, local_root, "data/tree", delete=True)
+    assert plan == {"add": ["new.txt"], "update": ["edited.txt", "sub/changed.txt", "sub/touched.txt"], "delete": ["old.txt"], "unchanged": 1}
+
+    # with hashes, only the files with a different content are updated
+    plan = plan_sync(serial, local_root, "data/tree", use_hash=True)
+    assert plan == {"add": ["new.txt"], "update": ["sub/changed.txt", "edited.txt"], "delete": [], "unchanged": 2}
@@ -0,0 +1,59 @@
+#---------------------------------------------------------------------------------
+# -*- coding: utf-8 -*-
+# Python: 3.12.0
+# Author: Killian Nallet
+# Date: 17/10/2026
+#---------------------------------------------------------------------------------
+
+
+# imports
+import io
+import zipfile
+
+import pytest
+
+from apk_manifest import ManifestError, parse_manifest, read_apk_info, read_bundle_info
+from fixtures import make_bundle, make_manifest
+
+
+# define tests
+@pytest.mark.parametrize("utf8", [False, True])
+def test_parse_base_manifest(utf8):
+    manifest = make_manifest("com.example.app", 1234, min_sdk=24, target_sdk=34, features={"android.hardware.camera": False, "android.hardware.wifi": True}, utf8=utf8)
+    info = parse_manifest(manifest)
+
+    assert (info.package, info.version_code, info.version_name, info.split) == ("com.example.app", 1234, "1234.0", None)
+    assert (info.min_sdk, info.target_sdk) == (24, 34)
+    assert info.features == ["android.hardware.wifi"] # required features only
+
+
+def test_parse_split_manifest():
+    info = parse_manifest(make_manifest("com.example.app", 7, split="config.arm64_v8a"))
+    assert (info.package, info.version_code, info.split) == ("com.example.app", 7, "config.arm64_v8a")
+
+
+def test_invalid_manifest():
+    with pytest.raises(ManifestError):
+        parse_manifest(b"<manifest/>")
+
+
+def test_read_apk_info_native_abis():
+    data = io.BytesIO()
+    with zipfile.ZipFile(data, "w") as apk:
+        apk.writestr("AndroidManifest.xml", make_manifest("com.example.native", 3))
+        apk.writestr("lib/arm64-v8a/libnative.so", b"")
+        apk.writestr("lib/x86_64/libnative.so", b"")
+
+    info = read_apk_info(data)
+    assert (info.package, info.version_code, info.native_abis) == ("com.example.native", 3, ["arm64-v8a", "x86_64"])
+
+
+def test_read_bundle_info_base_split(tmp_path):
+    bundle_path = make_bundle(str(tmp_path / "app.apkm"), size_mb=0.1, package="com.example.bundle", version_code=99)
+    info = read_bundle_info(bundle_path)
+    assert (info.package, info.version_code, info.split) == ("com.example.bundle", 99, None)
+
+
+def test_read_bundle_info_abis_from_config_splits(tmp_path):
+    bundle_path = make_bundle(str(tmp_path / "app.apkm"), size_mb=0.1)
+    assert read_bundle_info(bundle_path).native_abis == ["arm64-v8a", "armeabi-v7a", "x86_64"]
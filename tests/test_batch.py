@@ -0,0 +1,41 @@
+#---------------------------------------------------------------------------------
+# -*- coding: utf-8 -*-
+# Python: 3.12.0
+# Author: Killian Nallet
+# Date: 17/10/2026
+#---------------------------------------------------------------------------------
+
+
+# imports
+import io
+import json
+import zipfile
+
+import batch
+from batch import ON_ERROR_CONTINUE, STEP_FAILED, STEP_OK, BatchRunner, Step, write_batch_summary
+
+
+# define tests
+def test_prepare_error_fails_its_step(monkeypatch):
+    monkeypatch.setattr(batch, "device_serial", lambda: "10.0.0.2:5555")
+    runner = BatchRunner(lambda name: (None, name), {}, "/sdcard", ".", ON_ERROR_CONTINUE)
+    ran = []
+
+    def prepare(args):
+        if args[0] == "bad.apkm":
+            raise zipfile.BadZipFile("File is not a zip file")
+        return args[0]
+
+    runner.commands[".install"] = (prepare, lambda args, prepared: ran.append(prepared))
+    steps = [Step(1, ".install bad.apkm"), Step(2, ".install good.apkm")]
+    summary = runner.run(steps)
+
+    assert [step.status for step in steps] == [STEP_FAILED, STEP_OK]
+    assert steps[0].error == "File is not a zip file" and ran == ["good.apkm"]
+    assert summary[STEP_FAILED] == 1
+
+
+def test_summary_on_its_own_output():
+    output = io.StringIO()
+    write_batch_summary({"ok": 1, "steps": []}, "-", output)
+    assert json.loads(output.getvalue()) == {"ok": 1, "steps": []}
@@ -0,0 +1,46 @@
+#---------------------------------------------------------------------------------
+# -*- coding: utf-8 -*-
+# Python: 3.12.0
+# Author: Killian Nallet
+# Date: 17/10/2026
+#---------------------------------------------------------------------------------
+
+
+# imports
+import zipfile
+from subprocess import CompletedProcess
+
+import pytest
+
+import bulk_install
+from bulk_install import PACKAGE_FAILED, PACKAGE_INSTALLED, BulkPackage, _verify_archive
+from fixtures import make_bundle
+
+
+# define tests
+def test_verify_reads_the_central_directory_only(tmp_path, monkeypatch):
+    bundle_path = make_bundle(str(tmp_path / "app.apkm"), size_mb=0.2)
+    monkeypatch.setattr(zipfile.ZipFile, "testzip", lambda self: 1 / 0)
+    monkeypatch.setattr(zipfile.ZipFile, "read", lambda self, name, pwd=None: 1 / 0)
+    _verify_archive(bundle_path)
+
+    with open(bundle_path, "r+b") as file: # central directory lost
+        file.truncate(1000)
+    with pytest.raises(zipfile.BadZipFile):
+        _verify_archive(bundle_path)
+
+
+def test_package_error_is_a_failed_row(monkeypatch):
+    def install_prepared(apk_path, apk_files, replace_apk, allow_downgrade):
+        if apk_path == "b.apkm":
+            raise NotImplementedError("That compression method is not supported")
+        return CompletedProcess(apk_path, 0, "Success", "")
+
+    monkeypatch.setattr(bulk_install, "prepare_bundle", lambda path, sha256=None: [path])
+    monkeypatch.setattr(bulk_install, "_verify_archive", lambda path: None)
+    monkeypatch.setattr(bulk_install, "install_prepared", install_prepared)
+    monkeypatch.setattr(bulk_install, "release_prepared", lambda apk_files: None)
+
+    packages = bulk_install.run_bulk_install([BulkPackage(name, name) for name in ("a.apkm", "b.apkm", "c.apkm")], workers=2)
+    assert [package.status for package in packages] == [PACKAGE_INSTALLED, PACKAGE_FAILED, PACKAGE_INSTALLED]
+    assert packages[1].error == "That compression method is not supported"
@@ -0,0 +1,39 @@
+#---------------------------------------------------------------------------------
+# -*- coding: utf-8 -*-
+# Python: 3.12.0
+# Author: Killian Nallet
+# Date: 17/10/2026
+#---------------------------------------------------------------------------------
+
+
+# imports
+import os
+import stat
+from subprocess import CompletedProcess
+
+import compression
+from compression import device_has_gzip, push_compressed
+from conftest import serial
+
+
+# define tests
+def test_gzip_probe_reads_the_output(client, monkeypatch):
+    monkeypatch.setattr(compression, "_gzip_support", {})
+    assert device_has_gzip(client, serial)
+
+    # the legacy shell returns 0 even when gzip is missing
+    monkeypatch.setattr(compression, "_gzip_support", {})
+    monkeypatch.setattr(client, "shell", lambda serial, command: CompletedProcess(command, 0, "", ""))
+    assert not device_has_gzip(client, serial)
+
+
+def test_compressed_push_keeps_the_mode(server, client, tmp_path):
+    local_path = tmp_path / "run.sh"
+    local_path.write_bytes(b"echo hello\n" * 10000)
+    os.chmod(local_path, 0o750)
+
+    size, wire_bytes = push_compressed(client, serial, str(local_path), "data/run.sh")
+    remote_stat = os.stat(os.path.join(server.root, "data", "run.sh"))
+    assert size == remote_stat.st_size == 110000 and wire_bytes < size
+    assert stat.S_IMODE(remote_stat.st_mode) == 0o750
+    assert int(remote_stat.st_mtime) == int(os.path.getmtime(local_path))
@@ -0,0 +1,48 @@
+#---------------------------------------------------------------------------------
+# -*- coding: utf-8 -*-
+# Python: 3.12.0
+# Author: Killian Nallet
+# Date: 17/10/2026
+#---------------------------------------------------------------------------------
+
+
+# imports
+import device_cache
+from device_cache import DeviceCache, parse_field
+
+
+# define tests
+def test_parse_fields():
+    assert parse_field("props", "[ro.build.version.sdk]: [34]\n[ro.product.cpu.abilist]: [arm64-v8a,armeabi-v7a]\ngarbage\n[empty]: []") == {
+        "ro.build.version.sdk": "34", "ro.product.cpu.abilist": "arm64-v8a,armeabi-v7a", "empty": ""
+    }
+    assert parse_field("packages", "package:com.b versionCode:7\npackage:com.a\nerror: x\n") == {"com.a": None, "com.b": 7}
+    assert parse_field("density", "Physical density: 440\n") == "Physical density: 440"
+
+
+def test_fields_expire_after_their_ttl(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(device_cache.time, "time", lambda: now[0])
+    cache = DeviceCache(str(tmp_path / "device_cache.json"), {"packages": 10})
+    cache.set("a", {"props": {"ro.build.version.sdk": "34"}, "packages": {"com.a": 1}})
+
+    now[0] += 11
+    assert cache.get("a", "packages") is None # custom ttl
+    assert cache.get("a", "props") == {"ro.build.version.sdk": "34"} # default ttl (24 h)
+    assert cache.get("b", "props") is None
+
+
+def test_invalidation_and_persistence(tmp_path):
+    cache_path = str(tmp_path / "device_cache.json")
+    cache = DeviceCache(cache_path)
+    cache.set("a", {"props": {}, "packages": {}})
+    cache.set("b", {"props": {}})
+
+    cache.invalidate("a", "packages")
+    reloaded = DeviceCache(cache_path)
+    assert reloaded.get("a", "packages") is None and reloaded.get("a", "props") == {}
+
+    reloaded.invalidate("a")
+    assert reloaded.get("a", "props") is None and reloaded.get("b", "props") == {}
+    reloaded.invalidate()
+    assert DeviceCache(cache_path).get("b", "props") is None
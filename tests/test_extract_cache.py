@@ -0,0 +1,49 @@
+#---------------------------------------------------------------------------------
+# -*- coding: utf-8 -*-
+# Python: 3.12.0
+# Author: Killian Nallet
+# Date: 17/10/2026
+#---------------------------------------------------------------------------------
+
+
+# imports
+import os
+
+import extract_cache
+from apk_catalog import ApkCatalog, file_sha256
+from extract_cache import ExtractCache
+from fixtures import make_bundle
+
+
+# define tests
+def test_known_hash_is_not_computed_again(tmp_path, monkeypatch):
+    bundle_path = make_bundle(str(tmp_path / "app.apkm"), size_mb=0.2)
+    cache = ExtractCache(str(tmp_path / "cache"), 100 * 1024 * 1024)
+
+    monkeypatch.setattr(extract_cache, "file_sha256", lambda path: 1 / 0)
+    apk_files = cache.get(bundle_path, "f" * 64)
+    assert os.path.basename(os.path.dirname(apk_files[0])) == "f" * 64
+
+
+def test_pinned_entries_are_not_evicted(tmp_path):
+    cache = ExtractCache(str(tmp_path / "cache"), 1) # every other entry is over the budget
+    first = cache.get(make_bundle(str(tmp_path / "a.apkm"), size_mb=0.2, seed=1), pin=True)
+    second = cache.get(make_bundle(str(tmp_path / "b.apkm"), size_mb=0.2, seed=2))
+    assert os.path.exists(first[0]) and os.path.exists(second[0])
+
+    cache.unpin(first)
+    cache.get(make_bundle(str(tmp_path / "c.apkm"), size_mb=0.2, seed=3))
+    assert not os.path.exists(first[0]) and not os.path.exists(second[0])
+
+
+def test_catalog_hash_of_changed_file(tmp_path):
+    os.makedirs(tmp_path / "apks")
+    bundle_path = make_bundle(str(tmp_path / "apks" / "app.apkm"), size_mb=0.1)
+    catalog = ApkCatalog(str(tmp_path / "catalog.db"), str(tmp_path / "apks"))
+    catalog.refresh()
+    assert catalog.file_hash(bundle_path) == file_sha256(bundle_path)
+
+    with open(bundle_path, "ab") as file:
+        file.write(b"\0")
+    assert catalog.file_hash(bundle_path) is None
+    catalog.close()
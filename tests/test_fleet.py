@@ -0,0 +1,26 @@
+#---------------------------------------------------------------------------------
+# -*- coding: utf-8 -*-
+# Python: 3.12.0
+# Author: Killian Nallet
+# Date: 17/10/2026
+#---------------------------------------------------------------------------------
+
+
+# imports
+import zipfile
+
+import fleet
+from fleet import FLEET_FAILED, FLEET_OFFLINE, FLEET_OK
+
+
+# define tests
+def test_device_error_keeps_other_results(monkeypatch):
+    monkeypatch.setattr(fleet, "get_connected_devices", lambda: ["a", "b", "c"])
+
+    def task(serial):
+        if serial == "b":
+            raise zipfile.BadZipFile("bad bundle")
+        return FLEET_OK, None
+
+    results = fleet._fleet_run(["a", "b", "c", "d"], task)
+    assert results == {"a": (FLEET_OK, None), "b": (FLEET_FAILED, "bad bundle"), "c": (FLEET_OK, None), "d": (FLEET_OFFLINE, None)}
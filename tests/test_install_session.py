@@ -0,0 +1,52 @@
+#---------------------------------------------------------------------------------
+# -*- coding: utf-8 -*-
+# Python: 3.12.0
+# Author: Killian Nallet
+# Date: 17/10/2026
+#---------------------------------------------------------------------------------
+
+
+# imports
+import io
+import os
+
+import pytest
+
+from fixtures import make_bundle
+
+
+# define functions
+def _session_steps(server) -> list:
+    with open(os.path.join(server.root, "pm_sessions.log")) as file:
+        return file.read().split()
+
+
+# define tests
+def test_bundle_streamed_in_a_session(server, device, tmp_path):
+    bundle_path = make_bundle(str(tmp_path / "app.apkm"), size_mb=0.5)
+    result = device.adb_install_bundle(bundle_path, replace_apk=True)
+
+    assert result.returncode == 0, result.stderr
+    steps = _session_steps(server)
+    assert steps[0] == "install-create" and steps[-1] == "install-commit" and "install-write" in steps
+
+
+def test_session_abandoned_on_a_split_error(server, device):
+    def bad_split():
+        raise RuntimeError("encrypted member")
+
+    splits = [("base.apk", 4, lambda: io.BytesIO(b"base")), ("split_config.en.apk", 4, bad_split)]
+    with pytest.raises(RuntimeError):
+        device._install_session("app", splits)
+    assert _session_steps(server) == ["install-create", "install-write", "install-abandon"]
+
+
+def test_session_abandoned_without_fallback_on_a_dropped_stream(server, device, tmp_path, monkeypatch):
+    monkeypatch.setattr(device, "adb_install_apk", lambda *args: 1 / 0) # no install with the adb cli
+    apk_path = tmp_path / "base.apk"
+    apk_path.write_bytes(os.urandom(256 * 1024))
+
+    server.drop_stream_after(64 * 1024)
+    result = device.adb_install_split_files([str(apk_path)])
+    assert result.returncode == 1
+    assert _session_steps(server)[-1] == "install-abandon"
@@ -0,0 +1,41 @@
+#---------------------------------------------------------------------------------
+# -*- coding: utf-8 -*-
+# Python: 3.12.0
+# Author: Killian Nallet
+# Date: 17/10/2026
+#---------------------------------------------------------------------------------
+
+
+# imports
+import json
+import logging
+import threading
+
+from log_pipeline import start_log_pipeline, stop_log_pipeline
+
+
+# define tests
+def test_messages_are_formatted_by_the_log_thread(tmp_path):
+    logger = logging.getLogger("test_log_pipeline")
+    logger.setLevel(logging.INFO)
+    log_path = tmp_path / "adb_term.log"
+    start_log_pipeline(logger, str(log_path), json_format=True)
+
+    formatted_in = []
+
+    class Command:
+        def __str__(self):
+            formatted_in.append(threading.current_thread())
+            return "adb devices"
+
+    logger.info("exec %s -> %s", Command(), 0, extra={"command": "adb devices", "returncode": 0})
+    try:
+        1 / 0
+    except ZeroDivisionError:
+        logger.exception("failed")
+    stop_log_pipeline()
+
+    lines = [json.loads(line) for line in log_path.read_text().splitlines()]
+    assert lines[0]["msg"] == "exec adb devices -> 0" and lines[0]["command"] == "adb devices"
+    assert "ZeroDivisionError" in lines[1]["exc"]
+    assert formatted_in and threading.main_thread() not in formatted_in
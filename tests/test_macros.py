@@ -0,0 +1,40 @@
+#---------------------------------------------------------------------------------
+# -*- coding: utf-8 -*-
+# Python: 3.12.0
+# Author: Killian Nallet
+# Date: 17/10/2026
+#---------------------------------------------------------------------------------
+
+
+# imports
+import pytest
+
+from macros import MacroError, compile_macro, key_code
+
+
+# define tests
+def test_key_codes():
+    assert key_code("dpad_down") == key_code("KEYCODE_DPAD_DOWN") == "20"
+    assert key_code("187") == "187"
+    with pytest.raises(MacroError):
+        key_code("not_a_key")
+
+
+def test_keys_are_batched_in_one_call():
+    assert compile_macro("dpad_down*3 enter") == "input keyevent 20 20 20 66"
+    assert compile_macro("tab ctrl_left+a sleep:0.5 enter") == "input keyevent 61 && input keycombination 113 29 && sleep 0.5 && input keyevent 66"
+
+
+def test_nested_macros():
+    macros = {"down2": "dpad_down*2", "select": "@down2 enter", "loop": "@loop"}
+    assert compile_macro("@select*2", macros) == "input keyevent 20 20 66 20 20 66"
+    with pytest.raises(MacroError):
+        compile_macro("@loop", macros)
+    with pytest.raises(MacroError):
+        compile_macro("@missing", macros)
+
+
+@pytest.mark.parametrize("sequence", ["a+", "+a", "dpad_down*x", "sleep:soon", "", "a*0"])
+def test_invalid_sequences(sequence):
+    with pytest.raises(MacroError):
+        compile_macro(sequence)
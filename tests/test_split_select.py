@@ -0,0 +1,52 @@
+#---------------------------------------------------------------------------------
+# -*- coding: utf-8 -*-
+# Python: 3.12.0
+# Author: Killian Nallet
+# Date: 17/10/2026
+#---------------------------------------------------------------------------------
+
+
+# imports
+from split_select import DeviceSpec, parse_device_spec, select_splits, split_qualifier
+
+
+# define constants
+splits = [
+    ("base.apk", 100), ("split_feature_camera.apk", 10),
+    ("split_config.arm64_v8a.apk", 50), ("split_config.armeabi_v7a.apk", 40), ("split_config.x86_64.apk", 45),
+    ("split_config.mdpi.apk", 5), ("split_config.xhdpi.apk", 6), ("split_config.xxhdpi.apk", 7),
+    ("split_config.en.apk", 1), ("split_config.fr.apk", 1), ("split_config.de.apk", 1),
+]
+
+
+# define tests
+def test_parse_device_spec():
+    props = {"ro.product.cpu.abilist": "arm64-v8a,armeabi-v7a,armeabi", "ro.build.version.sdk": "34", "ro.sf.lcd_density": "420", "persist.sys.locale": "fr-FR"}
+    spec = parse_device_spec(props, "Physical density: 440\nOverride density: 480")
+    assert spec == DeviceSpec(["arm64-v8a", "armeabi-v7a", "armeabi"], 34, 480, ["fr-FR"])
+    assert spec.languages == {"fr"}
+
+    old_spec = parse_device_spec({"ro.product.cpu.abi": "armeabi-v7a", "ro.product.cpu.abi2": "armeabi", "persist.sys.language": "de", "persist.sys.country": "AT"})
+    assert old_spec.abis == ["armeabi-v7a", "armeabi"] and old_spec.sdk is None and old_spec.languages == {"de"}
+
+
+def test_split_qualifier():
+    assert split_qualifier("split_config.arm64_v8a.apk") == "arm64_v8a"
+    assert split_qualifier("bundle/config.xxhdpi.apk") == "xxhdpi"
+    assert split_qualifier("base.apk") is None and split_qualifier("split_feature_camera.apk") is None
+
+
+def test_select_splits_for_a_device():
+    selected, skipped = select_splits(splits, DeviceSpec(["arm64-v8a", "armeabi-v7a"], 34, 440, ["fr-FR"]))
+    assert selected == ["base.apk", "split_feature_camera.apk", "split_config.arm64_v8a.apk", "split_config.xxhdpi.apk", "split_config.fr.apk"]
+    assert skipped == 40 + 45 + 5 + 6 + 1 + 1
+
+
+def test_select_splits_fallbacks():
+    # density above every split : the biggest one, abi without split : none
+    selected, _ = select_splits(splits, DeviceSpec(["mips"], 34, 640, ["en-US"]))
+    assert "split_config.xxhdpi.apk" in selected and not any("_v7a" in name or "v8a" in name or "x86" in name for name in selected)
+
+    # unknown device : everything is kept
+    selected, skipped = select_splits(splits, DeviceSpec())
+    assert selected == [name for name, _ in splits] and skipped == 0
@@ -0,0 +1,29 @@
+#---------------------------------------------------------------------------------
+# -*- coding: utf-8 -*-
+# Python: 3.12.0
+# Author: Killian Nallet
+# Date: 17/10/2026
+#---------------------------------------------------------------------------------
+
+
+# imports
+import json
+
+from telemetry import Telemetry
+
+
+# define tests
+def test_spans_are_written_by_the_sink_thread(tmp_path):
+    sink_path = tmp_path / "stats" / "spans.jsonl"
+    telemetry = Telemetry()
+    telemetry.set_sink(str(sink_path))
+    for index in range(100):
+        telemetry.record("shell.exec", 0.001, index)
+    telemetry.close_sink()
+
+    lines = [json.loads(line) for line in sink_path.read_text().splitlines()]
+    assert [line["bytes"] for line in lines] == list(range(100))
+    assert telemetry.snapshot()["spans"]["shell.exec"]["count"] == 100
+
+    telemetry.record("shell.exec", 0.001) # no sink : in-memory only
+    assert len(sink_path.read_text().splitlines()) == 100
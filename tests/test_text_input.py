@@ -0,0 +1,43 @@
+#---------------------------------------------------------------------------------
+# -*- coding: utf-8 -*-
+# Python: 3.12.0
+# Author: Killian Nallet
+# Date: 17/10/2026
+#---------------------------------------------------------------------------------
+
+
+# imports
+import base64
+
+import pytest
+
+from keyevents import KeyMap
+from text_input import HELPER_ADBKEYBOARD, HELPER_CLIPPER, is_typable, max_typed_text, text_input_script, typed_text_commands
+
+
+# define tests
+def test_typed_text_escaping():
+    assert typed_text_commands("ls -la 'my dir'") == ["input text 'ls%s-la%s'\"'\"'my%sdir'\"'\"''"]
+    assert typed_text_commands("a%sb") == ["input text a", "input text %", f"input keyevent {KeyMap.s}", "input text b"]
+    assert typed_text_commands("a\tb\nc") == ["input text a", f"input keyevent {KeyMap.tab}", "input text b", f"input keyevent {KeyMap.enter}", "input text c"]
+    with pytest.raises(ValueError):
+        typed_text_commands("café")
+
+
+def test_typable_texts():
+    assert is_typable("echo $HOME; ls | grep x")
+    assert not is_typable("100%s") and not is_typable("héllo") and not is_typable("a\tb")
+
+
+def test_helper_choice():
+    # short ascii texts are typed even with a helper, with ENTER at the end
+    assert text_input_script("ls", HELPER_ADBKEYBOARD, enter=True) == f"input text ls && input keyevent {KeyMap.enter}"
+
+    # non ascii or long texts use the helper (one event)
+    script = text_input_script("café", HELPER_ADBKEYBOARD)
+    assert script == f"am broadcast -a ADB_INPUT_B64 --es msg {base64.b64encode('café'.encode('utf-8')).decode('ascii')} >/dev/null"
+    long_text = "x" * (max_typed_text + 1)
+    assert text_input_script(long_text, HELPER_CLIPPER) == f"am broadcast -a clipper.set -e text {long_text} >/dev/null && input keyevent {KeyMap.paste}"
+
+    # no helper : typed with one 'input text' per chunk
+    assert text_input_script(long_text).startswith("input text xxx")
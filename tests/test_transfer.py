@@ -0,0 +1,42 @@
+#---------------------------------------------------------------------------------
+# -*- coding: utf-8 -*-
+# Python: 3.12.0
+# Author: Killian Nallet
+# Date: 17/10/2026
+#---------------------------------------------------------------------------------
+
+
+# imports
+import os
+
+import resumable
+import transfer
+from conftest import serial
+
+
+# define tests
+def test_remote_sizes_over_4gib(server, client, monkeypatch):
+    monkeypatch.setattr(transfer, "get_adb_client", lambda: client)
+    os.makedirs(os.path.join(server.root, "big"))
+    with open(os.path.join(server.root, "big", "small.bin"), "wb") as file:
+        file.write(b"x" * 100)
+    with open(os.path.join(server.root, "big", "huge.bin"), "wb") as file:
+        file.truncate(5 * 1024**3 + 100) # sparse, its sync size is 1 GiB + 100
+
+    files = transfer.list_remote_tree(serial, "big")
+    assert files["small.bin"][0] == 100
+    assert files["huge.bin"][0] == 5 * 1024**3 + 100
+    assert transfer.remote_file_size(serial, "big/huge.bin") == 5 * 1024**3 + 100
+
+
+def test_resumable_push_appends_through_shell_stdin(server, client, tmp_path, monkeypatch):
+    monkeypatch.setattr(transfer, "get_adb_client", lambda: client)
+    monkeypatch.setattr(resumable, "get_adb_client", lambda: client)
+    monkeypatch.setattr(resumable, "segment_size", 300 * 1024)
+    src = tmp_path / "big.bin"
+    src.write_bytes(os.urandom(1024 * 1024))
+
+    size = resumable.resumable_push(serial, str(src), "data/big.bin", resumable.TransferState(str(tmp_path / "state.json")))
+    assert size == 1024 * 1024
+    with open(os.path.join(server.root, "data", "big.bin"), "rb") as file:
+        assert file.read() == src.read_bytes()
@@ -0,0 +1,37 @@
+#---------------------------------------------------------------------------------
+# -*- coding: utf-8 -*-
+# Python: 3.12.0
+# Author: Killian Nallet
+# Date: 17/10/2026
+#---------------------------------------------------------------------------------
+
+
+# imports
+import os
+import socket
+
+import adb_client
+from adb_client import AdbClient
+
+
+# define tests
+def test_dropped_push_is_not_restarted_with_the_adb_program(server, device, tmp_path, monkeypatch):
+    monkeypatch.setattr(device, "exec_cmd", lambda *args, **kwargs: 1 / 0)
+    src = tmp_path / "photo.bin"
+    src.write_bytes(os.urandom(512 * 1024))
+
+    server.drop_stream_after(64 * 1024)
+    assert device.adb_push_path(str(src), "data/photo.bin") is False
+
+
+def test_unreachable_server_uses_the_adb_program(device, tmp_path, monkeypatch):
+    with socket.socket() as sock: # free port : connection refused
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    monkeypatch.setattr(adb_client, "_client", AdbClient("127.0.0.1", port, timeout=2))
+    commands = []
+    monkeypatch.setattr(device, "exec_cmd", lambda command, *args, **kwargs: commands.append(command) or True)
+
+    assert device.adb_push_path(str(tmp_path), "data/") is True
+    assert device.adb_pull_path("data/photo.bin", str(tmp_path)) is True
+    assert [command[-3] for command in commands] == ["push", "pull"]
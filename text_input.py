@@ -0,0 +1,105 @@
+#---------------------------------------------------------------------------------
+# -*- coding: utf-8 -*-
+# Python: 3.12.0
+# Author: Killian Nallet
+# Date: 17/10/2026
+#---------------------------------------------------------------------------------
+
+
+# imports
+import base64
+import shlex
+
+from keyevents import KeyMap
+
+
+# define constants
+max_typed_text = 100 # longer texts are sent in one event by a text helper (if the device has one)
+typed_text_chunk = 1024 # characters per 'input text' call
+helper_text_chunk = 16 * 1024 # bytes per helper broadcast
+
+# on-device text helpers : ADBKeyBoard (input method, types the text in one commit) or Clipper (clipboard, then paste)
+HELPER_ADBKEYBOARD = "adbkeyboard"
+HELPER_CLIPPER = "clipper"
+adbkeyboard_ime = "com.android.adbkeyboard/.AdbIME"
+clipper_package = "ca.zgrs.clipper"
+
+
+# define functions
+def is_typable(text:str) -> bool:
+    """Check if 'input text' can type a text (printable ascii, no literal '%s' which is read as a space)"""
+
+    return all(" " <= char <= "~" for char in text) and "%s" not in text
+
+
+def _input_text(text:str) -> str:
+    """Return the shell command typing a printable ascii text"""
+
+    return f"input text {shlex.quote(text.replace(' ', '%s'))}"
+
+
+def typed_text_commands(text:str) -> list:
+    """Return the 'input text' / 'input keyevent' commands typing a text (one key event per character on the device)"""
+
+    commands = []
+    for line_index, line in enumerate(text.split("\n")):
+        if line_index > 0:
+            commands.append(f"input keyevent {KeyMap.enter}")
+
+        for part_index, part in enumerate(line.split("%s")):
+            if part_index > 0: # literal '%s' : '%' then the 's' key
+                commands += ["input text %", f"input keyevent {KeyMap.s}"]
+
+            for tab_index, chunk in enumerate(part.split("\t")):
+                if tab_index > 0:
+                    commands.append(f"input keyevent {KeyMap.tab}")
+                if not all(" " <= char <= "~" for char in chunk):
+                    raise ValueError("non ascii text needs a text helper on the device (ADBKeyBoard or Clipper)")
+                commands += [_input_text(chunk[index:index + typed_text_chunk]) for index in range(0, len(chunk), typed_text_chunk)]
+
+    return commands
+
+
+def _utf8_chunks(text:str, size:int) -> list:
+    """Split a text in chunks of at most size utf-8 bytes (characters are not cut)"""
+
+    chunks, chunk, chunk_size = [], [], 0
+    for char in text:
+        char_size = len(char.encode("utf-8"))
+        if chunk and chunk_size + char_size > size:
+            chunks.append("".join(chunk))
+            chunk, chunk_size = [], 0
+        chunk.append(char)
+        chunk_size += char_size
+    if chunk:
+        chunks.append("".join(chunk))
+    return chunks
+
+
+def helper_text_commands(text:str, helper:str) -> list:
+    """Return the broadcast commands sending a text with a text helper (one event per chunk)"""
+
+    commands = []
+    for chunk in _utf8_chunks(text, helper_text_chunk):
+        if helper == HELPER_ADBKEYBOARD:
+            encoded = base64.b64encode(chunk.encode("utf-8")).decode("ascii")
+            commands.append(f"am broadcast -a ADB_INPUT_B64 --es msg {encoded} >/dev/null")
+        elif helper == HELPER_CLIPPER:
+            commands.append(f"am broadcast -a clipper.set -e text {shlex.quote(chunk)} >/dev/null")
+            commands.append(f"input keyevent {KeyMap.paste}")
+        else:
+            raise ValueError(f"unknown text helper '{helper}'")
+    return commands
+
+
+def text_input_script(text:str, helper:str=None, enter=False) -> str:
+    """Return the shell script sending a text (typed if it is short and ascii, else with the helper), and ENTER"""
+
+    if helper is not None and text != "" and (len(text) > max_typed_text or not is_typable(text)):
+        commands = helper_text_commands(text, helper)
+    else:
+        commands = typed_text_commands(text)
+
+    if enter:
+        commands.append(f"input keyevent {KeyMap.enter}")
+    return " && ".join(commands)
@@ -0,0 +1,226 @@
+#---------------------------------------------------------------------------------
+# -*- coding: utf-8 -*-
+# Python: 3.12.0
+# Author: Killian Nallet
+# Date: 17/10/2026
+#---------------------------------------------------------------------------------
+
+
+# imports
+import os
+import stat
+import shlex
+import time
+import queue
+import threading
+import contextvars
+from dataclasses import dataclass
+
+from adb_client import AdbError, check_cancelled, get_adb_client
+from compression import device_has_gzip, pull_compressed, push_compressed, sample_size, should_compress
+
+
+# define constants
+default_transfer_streams = 4
+
+PUSH = "push"
+PULL = "pull"
+
+max_sync_size = 0xFFFFFFFF # sync v1 sizes are 32 bits (bigger files are reported modulo 4 GiB)
+
+
+# define classes
+@dataclass
+class TransferStats:
+    """Aggregate result of a transfer"""
+
+    files: int = 0
+    bytes: int = 0
+    seconds: float = 0.0
+    streams: int = 1
+    compressed: int = 0 # files sent as a gzip stream
+    wire_bytes: int = 0 # bytes on the adb link
+
+    @property
+    def ratio(self) -> float:
+        return self.bytes / self.wire_bytes if self.wire_bytes else 1.0
+
+    def __str__(self):
+        seconds = self.seconds or 1e-9
+        text = (
+            f"{self.files} files, {self.bytes/1e6:.1f} MB in {self.seconds:.1f}s "
+            f"({self.bytes/1e6/seconds:.1f} MB/s, {self.files/seconds:.1f} files/s, {self.streams} streams)"
+        )
+        if self.compressed:
+            text += f", {self.compressed} compressed (ratio x{self.ratio:.1f}, {self.wire_bytes/1e6:.1f} MB sent)"
+        return text
+
+
+# define functions
+def list_local_tree(local_root:str) -> dict:
+    """Return {relative path: (size, mtime)} of the files of a local folder"""
+
+    files = {}
+    for dir_path, _, file_names in os.walk(local_root):
+        for file_name in file_names:
+            path = os.path.join(dir_path, file_name)
+            file_stat = os.stat(path)
+            rel_path = os.path.relpath(path, local_root).replace(os.sep, "/")
+            files[rel_path] = (file_stat.st_size, int(file_stat.st_mtime))
+    return files
+
+
+def remote_file_size(serial:str, remote_path:str):
+    """Return the exact size of a remote file (sync stat sizes are 32 bits), None if it don't exists"""
+
+    result = get_adb_client().shell(serial, f"stat -c %s {shlex.quote(remote_path)}")
+    try:
+        return int(result.stdout.strip()) if result.returncode == 0 else None
+    except ValueError:
+        return None
+
+
+def _remote_big_files(serial:str, remote_root:str) -> dict:
+    """Return {relative path: exact size} of the files of a remote folder too big for a sync size (one find command)"""
+
+    root = remote_root.rstrip("/")
+    result = get_adb_client().shell(serial, f"find {shlex.quote(root + '/')} -type f -size +{max_sync_size // 1024}k -exec stat -c '%s %n' {{}} +")
+
+    sizes = {}
+    for line in result.stdout.splitlines():
+        size, _, path = line.partition(" ")
+        if size.isdigit() and path.startswith(root + "/"):
+            sizes[path[len(root) + 1:]] = int(size)
+    return sizes
+
+
+def list_remote_tree(serial:str, remote_root:str) -> dict:
+    """Return {relative path: (size, mtime)} of the files of a remote folder (sync LIST, exact sizes of the files over 4 GiB)"""
+
+    files = {}
+    with get_adb_client().sync(serial) as sync_conn:
+        if not stat.S_ISDIR(sync_conn.stat(remote_root)[0]):
+            return files
+
+        to_list = [""]
+        while to_list:
+            rel_dir = to_list.pop()
+            remote_dir = remote_root.rstrip("/") + ("/" + rel_dir if rel_dir else "")
+            for name, mode, size, mtime in sync_conn.list(remote_dir):
+                rel_path = f"{rel_dir}/{name}" if rel_dir else name
+                if stat.S_ISDIR(mode):
+                    to_list.append(rel_path)
+                elif stat.S_ISREG(mode):
+                    files[rel_path] = (size, mtime)
+
+    for rel_path, size in _remote_big_files(serial, remote_root).items():
+        if rel_path in files:
+            files[rel_path] = (size, files[rel_path][1])
+    return files
+
+
+def _compress_job(local_path:str, remote_path:str, size:int, direction:str) -> bool:
+    """Choose if a file is compressed (a sample of the local file is checked on push)"""
+
+    if direction == PULL:
+        return should_compress(remote_path, size)
+    with open(local_path, "rb") as file:
+        return should_compress(local_path, size, file.read(sample_size))
+
+
+def parallel_transfer(serial:str, jobs:list, direction:str, streams:int=default_transfer_streams, compress=False) -> TransferStats:
+    """Transfer files over several sync connections, jobs are (local path, remote path, size)"""
+
+    client = get_adb_client()
+    stats = TransferStats(streams=max(1, min(streams, len(jobs))))
+    compress = compress and bool(jobs) and device_has_gzip(client, serial)
+    stats_lock = threading.Lock()
+    errors = []
+
+    # biggest files first : the small files fill the gaps at the end (balanced streams)
+    job_queue = queue.Queue()
+    for job in sorted(jobs, key=lambda job: job[2], reverse=True):
+        job_queue.put(job)
+
+    def worker():
+        try:
+            with client.sync(serial) as sync_conn:
+                while not errors:
+                    check_cancelled()
+                    try:
+                        local_path, remote_path, job_size = job_queue.get_nowait()
+                    except queue.Empty:
+                        return
+
+                    compressed = compress and _compress_job(local_path, remote_path, job_size, direction)
+                    wire_bytes = None
+
+                    if compressed and direction == PUSH:
+                        size, wire_bytes = push_compressed(client, serial, local_path, remote_path)
+                    elif compressed:
+                        os.makedirs(os.path.dirname(local_path) or ".", exist_ok=True)
+                        size, wire_bytes = pull_compressed(client, serial, remote_path, local_path)
+                    elif direction == PUSH:
+                        file_stat = os.stat(local_path)
+                        with open(local_path, "rb") as file:
+                            size = sync_conn.push_stream(file, remote_path, stat.S_IMODE(file_stat.st_mode), int(file_stat.st_mtime))
+                    else:
+                        os.makedirs(os.path.dirname(local_path) or ".", exist_ok=True)
+                        with open(local_path, "wb") as file:
+                            size = sync_conn.pull_stream(remote_path, file)
+
+                    with stats_lock:
+                        stats.files += 1
+                        stats.bytes += size
+                        stats.wire_bytes += size if wire_bytes is None else wire_bytes
+                        stats.compressed += compressed
+        except Exception as e:
+            errors.append(e)
+
+    start = time.perf_counter()
+    # the workers share the context of the caller (cancel event of a background job)
+    threads = [threading.Thread(target=contextvars.copy_context().run, args=(worker,), daemon=True) for _ in range(stats.streams)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats.seconds = time.perf_counter() - start
+
+    if errors:
+        raise errors[0]
+    return stats
+
+
+def parallel_push(serial:str, local_path:str, remote_path:str, streams:int=default_transfer_streams, compress=False) -> TransferStats:
+    """Push a file or a directory tree with several sync connections"""
+
+    if not os.path.isdir(local_path):
+        jobs = [(local_path, remote_path, os.path.getsize(local_path))]
+    else:
+        remote_path = remote_path.rstrip("/")
+        jobs = [
+            (os.path.join(local_path, rel_path), f"{remote_path}/{rel_path}", size)
+            for rel_path, (size, _) in list_local_tree(local_path).items()
+        ]
+    return parallel_transfer(serial, jobs, PUSH, streams, compress)
+
+
+def parallel_pull(serial:str, remote_path:str, local_path:str, streams:int=default_transfer_streams, compress=False) -> TransferStats:
+    """Pull a remote file or directory tree with several sync connections"""
+
+    client = get_adb_client()
+    with client.sync(serial) as sync_conn:
+        mode, size, _ = sync_conn.stat(remote_path)
+
+    if mode == 0:
+        raise AdbError(f"remote object '{remote_path}' does not exist")
+    if not stat.S_ISDIR(mode):
+        jobs = [(local_path, remote_path, remote_file_size(serial, remote_path) or size)]
+    else:
+        os.makedirs(local_path, exist_ok=True)
+        remote_path = remote_path.rstrip("/")
+        jobs = [
+            (os.path.join(local_path, *rel_path.split("/")), f"{remote_path}/{rel_path}", size)
+            for rel_path, (size, _) in list_remote_tree(serial, remote_path).items()
+        ]
+    return parallel_transfer(serial, jobs, PULL, streams, compress)